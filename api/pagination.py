@@ -0,0 +1,55 @@
+"""
+Keyset pagination for the REST API.
+
+Wraps ``blood_management.pagination.KeysetPaginator``: each viewset names an
+index-backed ``keyset_ordering`` ending in a unique field, and pages are
+selected by an opaque ``cursor`` parameter. A page is one query (plus one
+per prefetch) whatever its size or depth.
+"""
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from blood_management.pagination import CURSOR_PARAM, DEFAULT_PER_PAGE, KeysetPaginator
+
+
+class KeysetCursorPagination(BasePagination):
+    page_size = DEFAULT_PER_PAGE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        paginator = KeysetPaginator(queryset, view.keyset_ordering, self.get_page_size(request))
+        self.page = paginator.get_page(request.query_params.get(CURSOR_PARAM))
+        return list(self.page)
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), CURSOR_PARAM, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self._link(self.page.next_cursor),
+            'previous': self._link(self.page.previous_cursor),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
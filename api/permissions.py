@@ -0,0 +1,20 @@
+from rest_framework.permissions import SAFE_METHODS, BasePermission
+
+
+def is_admin(user):
+    return user.is_authenticated and user.user_type == 'admin'
+
+
+class IsAdmin(BasePermission):
+    message = 'Admins only.'
+
+    def has_permission(self, request, view):
+        return is_admin(request.user)
+
+
+class IsAdminOrReadOnly(BasePermission):
+    """Anyone signed in may read; only admins may write"""
+    message = 'Admins only.'
+
+    def has_permission(self, request, view):
+        return request.method in SAFE_METHODS or is_admin(request.user)
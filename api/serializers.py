@@ -0,0 +1,110 @@
+from rest_framework import serializers
+
+from blood_banks.models import BloodBank, BloodInventory
+from blood_requests.models import BloodRequest
+from donors.models import DonorProfile, DonationHistory
+
+
+class DonorProfileSerializer(serializers.ModelSerializer):
+    username = serializers.CharField(source='user.username', read_only=True)
+    full_name = serializers.CharField(source='user.get_full_name', read_only=True)
+    email = serializers.EmailField(source='user.email', read_only=True)
+
+    class Meta:
+        model = DonorProfile
+        fields = [
+            'id', 'user', 'username', 'full_name', 'email', 'blood_group', 'date_of_birth', 'gender', 'address',
+            'city', 'state', 'zip_code', 'latitude', 'longitude', 'is_available', 'last_donation_date',
+            'next_eligible_date', 'donation_count', 'approved_units', 'last_approved_date', 'medical_conditions',
+            'created_at', 'updated_at',
+        ]
+        # Donation dates and counters move with approved donations only
+        read_only_fields = ['user', 'last_donation_date']
+
+
+class DonationHistorySerializer(serializers.ModelSerializer):
+    donor_name = serializers.CharField(source='donor.user.get_full_name', read_only=True)
+    blood_group = serializers.CharField(source='donor.blood_group', read_only=True)
+    blood_bank_name = serializers.CharField(source='blood_bank.name', read_only=True, default=None)
+
+    class Meta:
+        model = DonationHistory
+        fields = [
+            'id', 'donor', 'donor_name', 'blood_group', 'blood_bank', 'blood_bank_name', 'donation_date', 'units',
+            'status', 'notes', 'approved_by', 'created_at', 'updated_at',
+        ]
+        # Status changes go through the approve and reject actions
+        read_only_fields = ['donor', 'status', 'approved_by']
+
+
+class BloodRequestSerializer(serializers.ModelSerializer):
+    requester_username = serializers.CharField(source='requester.username', read_only=True)
+    fulfilled_from_name = serializers.CharField(source='fulfilled_from.name', read_only=True, default=None)
+
+    class Meta:
+        model = BloodRequest
+        fields = [
+            'id', 'requester', 'requester_username', 'patient_name', 'blood_group', 'units_required', 'urgency',
+            'hospital_name', 'hospital_address', 'city', 'contact_number', 'reason', 'required_by_date', 'status',
+            'requested_date', 'approved_by', 'approved_date', 'fulfilled_from', 'fulfilled_from_name',
+            'rejection_reason', 'notes', 'priority_score',
+        ]
+        read_only_fields = [
+            'requester', 'status', 'approved_by', 'approved_date', 'fulfilled_from', 'rejection_reason', 'notes',
+        ]
+
+
+class BloodRequestUpdateSerializer(BloodRequestSerializer):
+    """Admin review of a request: the fields of ``BloodRequestUpdateForm``"""
+
+    class Meta(BloodRequestSerializer.Meta):
+        read_only_fields = [
+            name for name in BloodRequestSerializer.Meta.fields
+            if name not in ('status', 'fulfilled_from', 'rejection_reason', 'notes')
+        ]
+
+    def validate(self, attrs):
+        status = attrs.get('status', self.instance.status)
+        fulfilled_from = attrs.get('fulfilled_from', self.instance.fulfilled_from)
+        if status == 'fulfilled' and not fulfilled_from:
+            raise serializers.ValidationError({'fulfilled_from': 'Choose the blood bank that supplied the units.'})
+        return attrs
+
+
+class InventoryLevelSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BloodInventory
+        fields = ['id', 'blood_group', 'units_available', 'last_updated']
+
+
+class BloodBankSerializer(serializers.ModelSerializer):
+    inventory = InventoryLevelSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = BloodBank
+        fields = [
+            'id', 'name', 'address', 'city', 'state', 'zip_code', 'latitude', 'longitude', 'phone_number', 'email',
+            'is_active', 'donation_count', 'approved_units', 'last_approved_date', 'inventory', 'created_at',
+            'updated_at',
+        ]
+
+
+class BloodInventorySerializer(serializers.ModelSerializer):
+    blood_bank_name = serializers.CharField(source='blood_bank.name', read_only=True)
+    units_available = serializers.DecimalField(max_digits=6, decimal_places=2, min_value=0)
+
+    class Meta:
+        model = BloodInventory
+        fields = ['id', 'blood_bank', 'blood_bank_name', 'blood_group', 'units_available', 'last_updated']
+
+
+class InventoryAdjustmentSerializer(BloodInventorySerializer):
+    """
+    Set the units of an inventory row. Saved as a ledger adjustment of the
+    difference to the stored units, like ``InventoryAdjustmentForm``.
+    """
+    note = serializers.CharField(max_length=255, required=False, allow_blank=True, write_only=True)
+
+    class Meta(BloodInventorySerializer.Meta):
+        fields = BloodInventorySerializer.Meta.fields + ['note']
+        read_only_fields = ['blood_bank', 'blood_group']
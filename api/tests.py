@@ -0,0 +1,283 @@
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+from accounts.models import User
+from blood_banks.models import BloodBank, BloodInventory, InventoryTransaction
+from blood_banks.ledger import record_transaction
+from blood_management.testing import QueryPlanAssertionsMixin
+from blood_requests.models import BloodRequest
+from donors.models import DonorProfile, DonationHistory
+from notifications.models import OutboxMessage
+
+
+ROWS = 30
+GROUPS = ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']
+
+
+class ApiTestData:
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='pass', user_type='admin'
+        )
+        cls.banks = [
+            BloodBank.objects.create(
+                name=f'Bank {i:02d}', address='1 Road', city='Dhaka', phone_number='1', email=f'bank{i}@example.com',
+            )
+            for i in range(ROWS)
+        ]
+        for bank in cls.banks[:4]:
+            for group in GROUPS:
+                record_transaction(bank.pk, group, 10, 'balance')
+        cls.donors = []
+        for i in range(ROWS):
+            user = User.objects.create_user(
+                username=f'donor{i}', email=f'donor{i}@example.com', first_name='Donor', last_name=str(i)
+            )
+            cls.donors.append(DonorProfile.objects.create(
+                user=user, blood_group=GROUPS[i % 8], date_of_birth=date(1990, 1, 1), gender='male',
+                address='1 Road', city='Dhaka',
+            ))
+        cls.donor = cls.donors[0]
+        for i, donor in enumerate(cls.donors):
+            DonationHistory.objects.create(
+                donor=donor, blood_bank=cls.banks[i % 3], donation_date=timezone.localdate() - timedelta(days=i % 5),
+                units=Decimal('1.00'),
+            )
+            BloodRequest.objects.create(
+                requester=donor.user, patient_name=f'Patient {i}', blood_group=GROUPS[i % 8], units_required=2,
+                urgency='medium', hospital_name='General', hospital_address='2 Road', city='Dhaka',
+                contact_number='1', reason='Surgery', required_by_date=timezone.localdate() + timedelta(days=7),
+            )
+
+
+class ApiQueryCountTests(ApiTestData, QueryPlanAssertionsMixin, TestCase):
+    """A list page costs the same fixed number of queries whatever its size"""
+
+    # Session and user lookups, then the page (and one query per prefetch)
+    LIST_QUERIES = {
+        '/api/donors/': 3,
+        '/api/donations/': 3,
+        '/api/requests/': 3,
+        '/api/blood-banks/': 4,
+        '/api/inventory/': 3,
+    }
+    MODELS = {
+        '/api/donors/': DonorProfile,
+        '/api/donations/': DonationHistory,
+        '/api/requests/': BloodRequest,
+        '/api/blood-banks/': BloodBank,
+        '/api/inventory/': BloodInventory,
+    }
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_list_query_counts_do_not_depend_on_page_size(self):
+        for url, expected in self.LIST_QUERIES.items():
+            total = self.MODELS[url].objects.count()
+            for page_size in (1, 10, 100):
+                with self.subTest(url=url, page_size=page_size), self.assertNumQueries(expected):
+                    response = self.client.get(url, {'page_size': page_size})
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(len(response.json()['results']), min(page_size, total))
+
+    def test_deep_pages_cost_the_same(self):
+        for url, expected in self.LIST_QUERIES.items():
+            next_url = f'{url}?page_size=7'
+            while next_url:
+                with self.subTest(url=next_url), self.assertNumQueries(expected):
+                    next_url = self.client.get(next_url).json()['next']
+
+    def test_list_pages_use_indexes(self):
+        for url in self.LIST_QUERIES:
+            first = self.assertNoFullScans(self.client, f'{url}?page_size=5')
+            self.assertNoFullScans(self.client, first.json()['next'])
+
+
+class ApiPaginationTests(ApiTestData, TestCase):
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def collect(self, url):
+        ids, next_url = [], url
+        while next_url:
+            page = self.client.get(next_url).json()
+            ids.extend(row['id'] for row in page['results'])
+            next_url = page['next']
+        return ids
+
+    def test_cursor_walk_returns_every_row_once(self):
+        self.assertEqual(
+            self.collect('/api/donations/?page_size=4'),
+            list(DonationHistory.objects.order_by('-created_at', '-id').values_list('pk', flat=True)),
+        )
+        self.assertEqual(
+            self.collect('/api/inventory/?page_size=5'),
+            list(BloodInventory.objects.order_by('blood_bank_id', 'blood_group').values_list('pk', flat=True)),
+        )
+
+    def test_previous_link_returns_the_page_before(self):
+        first = self.client.get('/api/requests/', {'page_size': 5}).json()
+        second = self.client.get(first['next']).json()
+        self.assertEqual(self.client.get(second['previous']).json()['results'], first['results'])
+
+    def test_page_size_is_capped(self):
+        response = self.client.get('/api/blood-banks/', {'page_size': 10000})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), ROWS)
+
+
+class ApiPermissionTests(ApiTestData, TestCase):
+    def setUp(self):
+        self.client.force_login(self.donor.user)
+
+    def test_anonymous_requests_are_refused(self):
+        self.client.logout()
+        self.assertEqual(self.client.get('/api/donors/').status_code, 403)
+
+    def test_donors_only_see_their_own_records(self):
+        self.assertEqual([row['id'] for row in self.client.get('/api/donors/').json()['results']], [self.donor.pk])
+        donations = self.client.get('/api/donations/').json()['results']
+        self.assertEqual({row['donor'] for row in donations}, {self.donor.pk})
+        requests = self.client.get('/api/requests/').json()['results']
+        self.assertEqual({row['requester'] for row in requests}, {self.donor.user_id})
+        self.assertEqual(self.client.get(f'/api/donors/{self.donors[1].pk}/').status_code, 404)
+
+    def test_donors_only_see_active_blood_banks(self):
+        BloodBank.objects.filter(pk=self.banks[0].pk).update(is_active=False)
+        ids = [row['id'] for row in self.client.get('/api/blood-banks/', {'page_size': 100}).json()['results']]
+        self.assertNotIn(self.banks[0].pk, ids)
+        self.assertEqual(len(ids), ROWS - 1)
+
+    def test_donors_cannot_write_admin_resources(self):
+        inventory = BloodInventory.objects.first()
+        self.assertEqual(self.client.patch(
+            f'/api/inventory/{inventory.pk}/', {'units_available': '99'}, content_type='application/json'
+        ).status_code, 403)
+        self.assertEqual(self.client.post('/api/blood-banks/', {'name': 'Mine'}).status_code, 403)
+        donation = self.donor.donations.get()
+        self.assertEqual(self.client.post(f'/api/donations/{donation.pk}/approve/').status_code, 403)
+        blood_request = BloodRequest.objects.filter(requester=self.donor.user).get()
+        self.assertEqual(self.client.patch(
+            f'/api/requests/{blood_request.pk}/', {'status': 'approved'}, content_type='application/json'
+        ).status_code, 403)
+
+
+class ApiWriteTests(ApiTestData, TestCase):
+    def test_donor_submits_a_pending_donation(self):
+        self.client.force_login(self.donor.user)
+        response = self.client.post('/api/donations/', {
+            'blood_bank': self.banks[0].pk, 'donation_date': str(timezone.localdate()), 'units': '1.00',
+            'status': 'approved',
+        })
+        self.assertEqual(response.status_code, 201)
+        donation = DonationHistory.objects.get(pk=response.json()['id'])
+        self.assertEqual((donation.donor, donation.status), (self.donor, 'pending'))
+
+    def test_admin_approves_a_donation_through_the_ledger(self):
+        self.client.force_login(self.admin)
+        donation = self.donor.donations.get()
+        inventory = BloodInventory.objects.get(blood_bank=donation.blood_bank, blood_group=self.donor.blood_group)
+        response = self.client.post(f'/api/donations/{donation.pk}/approve/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'approved')
+        inventory.refresh_from_db()
+        self.assertEqual(inventory.units_available, Decimal('11.00'))
+        self.donor.refresh_from_db()
+        self.assertEqual(self.donor.donation_count, 1)
+        self.assertEqual(self.client.post(f'/api/donations/{donation.pk}/approve/').status_code, 409)
+
+    def test_admin_rejects_a_donation(self):
+        self.client.force_login(self.admin)
+        donation = self.donor.donations.get()
+        response = self.client.post(f'/api/donations/{donation.pk}/reject/', {'notes': 'Low haemoglobin'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['status'], response.json()['notes']), ('rejected', 'Low haemoglobin'))
+
+    def test_request_creation_queues_the_admin_email(self):
+        self.client.force_login(self.donor.user)
+        response = self.client.post('/api/requests/', {
+            'patient_name': 'New', 'blood_group': 'O-', 'units_required': '1.00', 'urgency': 'low',
+            'hospital_name': 'General', 'hospital_address': '2 Road', 'city': 'Dhaka', 'contact_number': '1',
+            'reason': 'Anaemia', 'required_by_date': str(timezone.localdate() + timedelta(days=3)),
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['requester'], self.donor.user_id)
+        self.assertTrue(OutboxMessage.objects.filter(subject='New Blood Request').exists())
+
+    def test_fulfilling_a_request_takes_stock(self):
+        self.client.force_login(self.admin)
+        blood_request = BloodRequest.objects.filter(blood_group='A+').first()
+        url = f'/api/requests/{blood_request.pk}/'
+        response = self.client.patch(url, {'status': 'fulfilled'}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fulfilled_from', response.json())
+        response = self.client.patch(
+            url, {'status': 'fulfilled', 'fulfilled_from': self.banks[0].pk}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            BloodInventory.objects.get(blood_bank=self.banks[0], blood_group='A+').units_available, Decimal('8.00')
+        )
+
+    def test_failed_fulfilment_leaves_the_request_unchanged(self):
+        self.client.force_login(self.admin)
+        blood_request = BloodRequest.objects.filter(blood_group='A+').first()
+        response = self.client.patch(
+            f'/api/requests/{blood_request.pk}/', {'status': 'fulfilled', 'fulfilled_from': self.banks[5].pk},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+        blood_request.refresh_from_db()
+        self.assertEqual(blood_request.status, 'pending')
+
+    def test_inventory_writes_are_ledger_entries(self):
+        self.client.force_login(self.admin)
+        response = self.client.post('/api/inventory/', {
+            'blood_bank': self.banks[10].pk, 'blood_group': 'B+', 'units_available': '4.50',
+        })
+        self.assertEqual(response.status_code, 201)
+        url = f"/api/inventory/{response.json()['id']}/"
+        response = self.client.patch(url, {'units_available': '3.00', 'note': 'Count'}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['units_available'], '3.00')
+        self.assertEqual(
+            list(InventoryTransaction.objects.filter(blood_bank=self.banks[10]).order_by('id').values_list('reason', 'change')),
+            [('balance', Decimal('4.50')), ('adjustment', Decimal('-1.50'))],
+        )
+        self.assertEqual(self.client.delete(url).status_code, 405)
+
+    def test_duplicate_inventory_rows_are_refused(self):
+        self.client.force_login(self.admin)
+        response = self.client.post('/api/inventory/', {
+            'blood_bank': self.banks[0].pk, 'blood_group': 'A+', 'units_available': '1',
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_ingest_streams_json_lines(self):
+        self.client.force_login(self.admin)
+        body = '\n'.join([
+            json.dumps({'donor_email': 'donor3@example.com', 'donation_date': '2026-10-01', 'units': '1.00'}),
+            json.dumps({
+                'donor': self.donors[4].pk, 'donation_date': '2026-10-02', 'units': 2, 'blood_bank': self.banks[1].pk,
+            }),
+            '{"donor": 0',
+        ])
+        response = self.client.post('/api/donations/ingest/', body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual((report['lines'], report['created'], report['failed']), (3, 2, 1))
+        self.assertEqual(report['errors'][0]['line'], 3)
+        self.assertEqual(self.donors[4].donations.filter(status='pending').count(), 2)
+        # Sent again, nothing new is recorded
+        report = self.client.post('/api/donations/ingest/', body, content_type='application/x-ndjson').json()
+        self.assertEqual((report['created'], report['duplicates'], report['failed']), (0, 2, 1))
+
+    def test_ingest_is_admin_only(self):
+        self.client.force_login(self.donor.user)
+        response = self.client.post('/api/donations/ingest/', '{}', content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,15 @@
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
+
+from . import views
+
+router = DefaultRouter()
+router.register('donors', views.DonorProfileViewSet, basename='api-donor')
+router.register('donations', views.DonationHistoryViewSet, basename='api-donation')
+router.register('requests', views.BloodRequestViewSet, basename='api-request')
+router.register('blood-banks', views.BloodBankViewSet, basename='api-blood-bank')
+router.register('inventory', views.BloodInventoryViewSet, basename='api-inventory')
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
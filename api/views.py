@@ -0,0 +1,220 @@
+"""
+REST API over donors, donations, blood requests, blood banks and inventory.
+
+Admins see and edit everything. Donors see their own profile, donations and
+requests and the active blood banks; they may submit donations and requests
+but not review them. Writes go through the same paths as the HTML views:
+stock only moves through the inventory ledger, donation reviews through
+``approve_donations``/``reject_donations``, and notifications through the
+outbox. Every list selects or prefetches its related rows, so a page costs
+the same number of queries whatever its size.
+"""
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from blood_banks.approvals import approve_donations, reject_donations
+from blood_banks.ledger import AlreadyRecorded, InsufficientInventory, adjust_inventory, fulfil_request, record_transaction
+from blood_banks.models import BloodBank, BloodInventory
+from blood_requests.approvals import status_email
+from blood_requests.models import BloodRequest
+from donors.ingest import ingest_donations
+from donors.models import DonorProfile, DonationHistory
+from notifications.fanout import start_fanout
+from notifications.outbox import admin_email, queue_email
+from .pagination import KeysetCursorPagination
+from .permissions import IsAdmin, IsAdminOrReadOnly, is_admin
+from .serializers import (
+    BloodBankSerializer, BloodInventorySerializer, BloodRequestSerializer, BloodRequestUpdateSerializer,
+    DonationHistorySerializer, DonorProfileSerializer, InventoryAdjustmentSerializer,
+)
+
+
+class ApiViewSet(viewsets.GenericViewSet):
+    pagination_class = KeysetCursorPagination
+    # Index-backed ordering ending in a unique field, used for the cursors
+    keyset_ordering = ('-id',)
+
+
+class DonorProfileViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.CreateModelMixin,
+                          mixins.UpdateModelMixin, ApiViewSet):
+    """Donor profiles; donors only see and create their own"""
+    serializer_class = DonorProfileSerializer
+    keyset_ordering = ('-created_at', '-id')
+
+    def get_queryset(self):
+        donors = DonorProfile.objects.select_related('user')
+        if is_admin(self.request.user):
+            return donors
+        return donors.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        if self.request.user.user_type != 'donor':
+            raise PermissionDenied('Donors only.')
+        if DonorProfile.objects.filter(user=self.request.user).exists():
+            raise ValidationError('Profile already exists. You can update it.')
+        serializer.save(user=self.request.user)
+
+
+class DonationHistoryViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.CreateModelMixin, ApiViewSet):
+    """Donation records; donors submit their own, admins approve or reject them"""
+    serializer_class = DonationHistorySerializer
+    keyset_ordering = ('-created_at', '-id')
+
+    def get_queryset(self):
+        donations = DonationHistory.objects.select_related('donor__user', 'blood_bank')
+        if is_admin(self.request.user):
+            return donations
+        return donations.filter(donor__user=self.request.user)
+
+    def perform_create(self, serializer):
+        if self.request.user.user_type != 'donor':
+            raise PermissionDenied('Donors only.')
+        try:
+            donor_profile = self.request.user.donor_profile
+        except DonorProfile.DoesNotExist:
+            raise ValidationError('Please create your profile first.')
+        serializer.save(donor=donor_profile)
+
+    def _reviewed(self, pk, reviewed, error):
+        if not reviewed:
+            return Response({'detail': error}, status=status.HTTP_409_CONFLICT)
+        return Response(self.get_serializer(self.get_queryset().get(pk=pk)).data)
+
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated, IsAdmin])
+    def approve(self, request, pk=None):
+        """Approve a pending or rejected donation and credit its stock"""
+        donation = self.get_object()
+        try:
+            approved = approve_donations([donation.pk], request.user)
+        except AlreadyRecorded:
+            approved = []
+        return self._reviewed(donation.pk, approved, 'Only pending or rejected donations can be approved.')
+
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated, IsAdmin])
+    def reject(self, request, pk=None):
+        """Reject a pending donation; ``notes`` gives the reason"""
+        donation = self.get_object()
+        rejected = reject_donations([donation.pk], request.user, notes=request.data.get('notes', ''))
+        return self._reviewed(donation.pk, rejected, 'Only pending donations can be rejected.')
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated, IsAdmin])
+    def ingest(self, request):
+        """
+        Add pending donations from a JSON lines body (see ``donors.ingest``).
+        The body is read line by line as it arrives, never parsed as a whole.
+        """
+        result = ingest_donations(request.stream or [])
+        return Response({
+            'lines': result.lines, 'created': result.created, 'duplicates': result.duplicates,
+            'failed': result.failed, 'errors': result.errors,
+        })
+
+
+class BloodRequestViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.CreateModelMixin,
+                          mixins.UpdateModelMixin, mixins.DestroyModelMixin, ApiViewSet):
+    """Blood requests; anyone may submit and withdraw their own, admins review them"""
+    keyset_ordering = ('-requested_date', '-id')
+
+    def get_queryset(self):
+        requests = BloodRequest.objects.select_related('requester', 'fulfilled_from')
+        if is_admin(self.request.user):
+            return requests
+        return requests.filter(requester=self.request.user)
+
+    def get_permissions(self):
+        if self.action in ('update', 'partial_update'):
+            return [IsAuthenticated(), IsAdmin()]
+        return super().get_permissions()
+
+    def get_serializer_class(self):
+        if self.action in ('update', 'partial_update'):
+            return BloodRequestUpdateSerializer
+        return BloodRequestSerializer
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            blood_request = serializer.save(requester=self.request.user)
+            # Email the admins once the request is committed (sent by send_outbox)
+            queue_email(
+                'New Blood Request',
+                f'A new blood request for {blood_request.blood_group} has been submitted by {self.request.user.username}.',
+                admin_email(),
+            )
+            # Critical and high urgency: alert compatible donors (fan_out_donor_alerts)
+            start_fanout(blood_request)
+
+    def perform_update(self, serializer):
+        previous_status = serializer.instance.status
+        changes = {}
+        if serializer.validated_data.get('status', previous_status) in ['approved', 'rejected']:
+            changes = {'approved_by': self.request.user, 'approved_date': timezone.now()}
+        with transaction.atomic():
+            blood_request = serializer.save(**changes)
+            # Take the units out of the supplying bank's stock in the same transaction
+            if blood_request.status == 'fulfilled' and previous_status != 'fulfilled':
+                try:
+                    fulfil_request(blood_request, blood_request.fulfilled_from, user=self.request.user)
+                except InsufficientInventory:
+                    raise ValidationError({'fulfilled_from': 'This blood bank does not have enough units in stock.'})
+                except AlreadyRecorded:
+                    raise ValidationError({'status': 'This request has already been fulfilled from inventory.'})
+            # Notify the requester (sent by send_outbox)
+            queue_email(*status_email(blood_request))
+
+
+class BloodBankViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.CreateModelMixin,
+                       mixins.UpdateModelMixin, mixins.DestroyModelMixin, ApiViewSet):
+    """Blood banks with their inventory levels; donors see the active ones"""
+    serializer_class = BloodBankSerializer
+    permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
+    keyset_ordering = ('name', 'id')
+
+    def get_queryset(self):
+        banks = BloodBank.objects.prefetch_related(
+            Prefetch('inventory', queryset=BloodInventory.objects.order_by('blood_group'))
+        )
+        if is_admin(self.request.user):
+            return banks
+        return banks.filter(is_active=True)
+
+
+class BloodInventoryViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.CreateModelMixin,
+                            mixins.UpdateModelMixin, ApiViewSet):
+    """
+    Inventory rows. Writes are ledger entries: a new row is an opening
+    balance, an update is an adjustment of the difference.
+    """
+    queryset = BloodInventory.objects.select_related('blood_bank')
+    permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
+    keyset_ordering = ('blood_bank_id', 'blood_group')
+
+    def get_serializer_class(self):
+        if self.action in ('update', 'partial_update'):
+            return InventoryAdjustmentSerializer
+        return BloodInventorySerializer
+
+    def perform_create(self, serializer):
+        data = serializer.validated_data
+        # The row is created by the ledger entry for its opening units
+        record_transaction(
+            data['blood_bank'].pk, data['blood_group'], data['units_available'], 'balance',
+            user=self.request.user, note='Opening balance',
+        )
+        serializer.instance = self.queryset.get(blood_bank=data['blood_bank'], blood_group=data['blood_group'])
+
+    def perform_update(self, serializer):
+        inventory = serializer.instance
+        units = serializer.validated_data.get('units_available', inventory.units_available)
+        change = units - inventory.units_available
+        if change:
+            try:
+                adjust_inventory(inventory, change, user=self.request.user, note=serializer.validated_data.get('note', ''))
+            except InsufficientInventory:
+                raise ValidationError('Units were taken out of this inventory in the meantime; please review the current value.')
+        serializer.instance = self.queryset.get(pk=inventory.pk)
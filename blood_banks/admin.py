@@ -1,17 +1,21 @@
 from django.contrib import admin
-from .models import BloodBank, BloodInventory
+from search.admin import FullTextSearchAdminMixin
+from .models import BloodBank, BloodInventory, BloodUnit, DashboardStat, InventorySnapshot, InventoryTransaction
 
 
 class BloodInventoryInline(admin.TabularInline):
     model = BloodInventory
     extra = 1
+    # Stock only moves through the inventory ledger
+    readonly_fields = ['units_available']
 
 
 @admin.register(BloodBank)
-class BloodBankAdmin(admin.ModelAdmin):
-    list_display = ['name', 'city', 'phone_number', 'email', 'is_active']
+class BloodBankAdmin(FullTextSearchAdminMixin, admin.ModelAdmin):
+    list_display = ['name', 'city', 'phone_number', 'email', 'is_active', 'donation_count', 'approved_units']
     list_filter = ['is_active', 'city']
-    search_fields = ['name', 'city', 'email']
+    search_fields = ['name', 'city', 'address', 'email']
+    readonly_fields = ['donation_count', 'approved_units', 'last_approved_date']
     inlines = [BloodInventoryInline]
     
     fieldsets = (
@@ -22,7 +26,10 @@ class BloodBankAdmin(admin.ModelAdmin):
             'fields': ('phone_number', 'email')
         }),
         ('Address', {
-            'fields': ('address', 'city', 'state', 'zip_code')
+            'fields': ('address', 'city', 'state', 'zip_code', 'latitude', 'longitude')
+        }),
+        ('Donations', {
+            'fields': ('donation_count', 'approved_units', 'last_approved_date')
         }),
     )
 
@@ -32,3 +39,50 @@ class BloodInventoryAdmin(admin.ModelAdmin):
     list_display = ['blood_bank', 'blood_group', 'units_available', 'last_updated']
     list_filter = ['blood_group', 'blood_bank']
     search_fields = ['blood_bank__name']
+    readonly_fields = ['units_available']
+
+
+@admin.register(DashboardStat)
+class DashboardStatAdmin(admin.ModelAdmin):
+    list_display = ['metric', 'key', 'value', 'updated_at']
+    list_filter = ['metric']
+    readonly_fields = ['metric', 'key', 'value', 'updated_at']
+
+
+@admin.register(InventorySnapshot)
+class InventorySnapshotAdmin(admin.ModelAdmin):
+    list_display = ['blood_bank', 'blood_group', 'period', 'period_start', 'units', 'min_units', 'max_units', 'avg_units']
+    list_filter = ['period', 'blood_group', 'blood_bank']
+    date_hierarchy = 'period_start'
+
+
+@admin.register(InventoryTransaction)
+class InventoryTransactionAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'blood_bank', 'blood_group', 'change', 'reason', 'created_by', 'note']
+    list_filter = ['reason', 'blood_group', 'blood_bank']
+    raw_id_fields = ['donation', 'blood_request']
+    
+    # The ledger is append-only
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(BloodUnit)
+class BloodUnitAdmin(admin.ModelAdmin):
+    list_display = ['id', 'blood_bank', 'blood_group', 'component', 'units', 'collection_date', 'expiry_date', 'status', 'issued_to']
+    list_filter = ['status', 'component', 'blood_group', 'blood_bank']
+    raw_id_fields = ['donation', 'issued_to']
+    date_hierarchy = 'expiry_date'
+    
+    # Bags are received, issued and expired through the inventory ledger
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,117 @@
+"""
+Bulk donation approval and rejection.
+
+The selected donations are updated with ``bulk_update`` in one transaction.
+Their stock is credited through ``credit_donations``, the donors' last
+donation and next eligible dates are moved with a second ``bulk_update``,
+and the counters and dashboard statistics that the save signals would have
+maintained get the summed changes. The donors' notifications are written to
+the outbox in the same transaction. Approving a page of donations therefore costs a few dozen queries
+however many rows are selected.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from blood_management.fragment_cache import bump_after_write
+from donors.counters import add_donations
+from donors.models import DonorProfile, DonationHistory, compute_next_eligible_date
+from notifications.outbox import queue_emails
+from .ledger import credit_donations
+from .stats import apply_deltas, change_deltas
+
+BATCH_SIZE = 500
+# Expired donations are past the blood's shelf life and cannot be stocked
+APPROVABLE_STATUSES = ('pending', 'rejected')
+
+
+def _status_deltas(old_statuses, new_status):
+    deltas = defaultdict(Decimal)
+    for status in old_statuses:
+        for stat, amount in change_deltas(DonationHistory, (status,), (new_status,)).items():
+            deltas[stat] += amount
+    return deltas
+
+
+def _locked_donations(ids, statuses):
+    return list(
+        DonationHistory.objects.select_for_update().filter(pk__in=ids, status__in=statuses)
+        .select_related('donor__user').order_by('pk')
+    )
+
+
+def approve_donations(ids, user):
+    """
+    Approve the donations in ``ids`` that are pending or were rejected,
+    credit their stock and move their donors' dates. Returns the approved donations.
+    """
+    with transaction.atomic():
+        donations = _locked_donations(ids, APPROVABLE_STATUSES)
+        if not donations:
+            return []
+        old_statuses = [donation.status for donation in donations]
+        now = timezone.now()
+        for donation in donations:
+            donation.status = 'approved'
+            donation.approved_by = user
+            donation.updated_at = now
+        DonationHistory.objects.bulk_update(donations, ['status', 'approved_by', 'updated_at'], batch_size=BATCH_SIZE)
+        credit_donations(donations, user=user)
+
+        latest = {}
+        for donation in donations:
+            latest[donation.donor_id] = max(latest.get(donation.donor_id, donation.donation_date), donation.donation_date)
+        donors = []
+        for donor in DonorProfile.objects.select_for_update().filter(pk__in=latest).only(
+            'pk', 'last_donation_date'
+        ):
+            if donor.last_donation_date and donor.last_donation_date >= latest[donor.pk]:
+                continue
+            donor.last_donation_date = latest[donor.pk]
+            donor.next_eligible_date = compute_next_eligible_date(donor.last_donation_date)
+            donor.updated_at = now
+            donors.append(donor)
+        DonorProfile.objects.bulk_update(
+            donors, ['last_donation_date', 'next_eligible_date', 'updated_at'], batch_size=BATCH_SIZE
+        )
+
+        add_donations([
+            (donation.donor_id, donation.blood_bank_id, donation.units, donation.donation_date) for donation in donations
+        ])
+        apply_deltas(_status_deltas(old_statuses, 'approved'))
+        bump_after_write(DonationHistory, DonorProfile)
+        queue_emails([
+            ('Donation Approved', f'Your donation on {donation.donation_date} has been approved.', donation.donor.user.email)
+            for donation in donations
+        ])
+    return donations
+
+
+def reject_donations(ids, user, notes=''):
+    """Reject the pending donations in ``ids``. Returns the rejected donations."""
+    with transaction.atomic():
+        donations = _locked_donations(ids, ['pending'])
+        if not donations:
+            return []
+        now = timezone.now()
+        for donation in donations:
+            donation.status = 'rejected'
+            donation.approved_by = user
+            donation.notes = notes
+            donation.updated_at = now
+        DonationHistory.objects.bulk_update(
+            donations, ['status', 'approved_by', 'notes', 'updated_at'], batch_size=BATCH_SIZE
+        )
+        apply_deltas(_status_deltas(['pending'] * len(donations), 'rejected'))
+        bump_after_write(DonationHistory)
+        queue_emails([
+            (
+                'Donation Rejected',
+                f'Your donation on {donation.donation_date} has been rejected. Reason: {notes}',
+                donation.donor.user.email,
+            )
+            for donation in donations
+        ])
+    return donations
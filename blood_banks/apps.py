@@ -4,3 +4,17 @@ from django.apps import AppConfig
 class BloodBanksConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blood_banks'
+
+    def ready(self):
+        from blood_management.fragment_cache import track_models
+        from . import signals  # noqa: F401
+
+        # Models the cached dashboard and inventory fragments are rendered from
+        track_models(
+            'accounts.User',
+            'blood_banks.BloodBank',
+            'blood_banks.BloodInventory',
+            'blood_requests.BloodRequest',
+            'donors.DonorProfile',
+            'donors.DonationHistory',
+        )
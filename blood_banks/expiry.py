@@ -0,0 +1,73 @@
+"""
+Expiry sweep for stale pending records.
+
+Blood requests still pending after their required-by date, and donations
+still pending once their blood would be past its shelf life, are moved to
+``expired``. The ``expire_stale_records`` command runs the sweep: rows are
+read oldest first through the ``(status, date, id)`` indexes and moved
+``batch_size`` at a time, one transaction per batch. The update repeats the
+``pending`` condition, so a row approved in the meantime is left alone and
+two sweepers never count a row twice. All state is in the rows themselves:
+an interrupted run simply continues on the next one, and a run with nothing
+to do costs one index probe per table.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from blood_management.events import publish_on_commit
+from blood_management.fragment_cache import bump_after_write
+from blood_requests.models import BloodRequest
+from donors.models import DonationHistory
+from .models import BloodUnit
+from .stats import apply_deltas, change_deltas
+
+
+BATCH_SIZE = 500
+
+
+def _expire_batches(model, overdue, ordering, batch_size, max_batches, on_expired=None, **changes):
+    expired = batches = 0
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            ids = list(overdue.order_by(*ordering).values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            moved = model.objects.filter(pk__in=ids, status='pending').update(status='expired', **changes)
+            apply_deltas({
+                stat: amount * moved for stat, amount in change_deltas(model, ('pending',), ('expired',)).items()
+            })
+            bump_after_write(model)
+            if on_expired:
+                on_expired(ids)
+        expired += moved
+        batches += 1
+    return expired
+
+
+def _publish_expired_requests(ids):
+    for pk in BloodRequest.objects.filter(pk__in=ids, status='expired').values_list('pk', flat=True):
+        publish_on_commit('requests', {'id': pk, 'created': False, 'status': 'expired', 'status_display': 'Expired'})
+
+
+def expire_overdue_requests(today=None, batch_size=BATCH_SIZE, max_batches=None):
+    """Expire pending requests whose required-by date is before ``today``; returns the count"""
+    today = today or timezone.localdate()
+    overdue = BloodRequest.objects.filter(status='pending', required_by_date__lt=today)
+    return _expire_batches(
+        BloodRequest, overdue, ('required_by_date', 'id'), batch_size, max_batches, _publish_expired_requests,
+    )
+
+
+def expire_stale_donations(today=None, batch_size=BATCH_SIZE, max_batches=None):
+    """
+    Expire pending donations collected longer ago than whole blood keeps:
+    approving them could no longer add usable stock. Returns the count.
+    """
+    today = today or timezone.localdate()
+    cutoff = today - timedelta(days=BloodUnit.SHELF_LIFE_DAYS['whole_blood'])
+    stale = DonationHistory.objects.filter(status='pending', donation_date__lt=cutoff)
+    return _expire_batches(
+        DonationHistory, stale, ('donation_date', 'id'), batch_size, max_batches, updated_at=timezone.now(),
+    )
@@ -0,0 +1,169 @@
+"""
+Shortage forecasting.
+
+Daily supply (approved donations) and demand (fulfilled requests, charged to
+the bank that supplied them) are summed per blood bank, blood group and day
+in the database, then smoothed with an exponentially weighted average over
+the history window. The smoothed rate of a series is its daily totals dotted
+with one weight vector indexed by age, so every series is computed in one
+pass over the aggregated rows: ``numpy.bincount`` when NumPy is installed,
+a plain loop otherwise (same numbers, just slower on years of history).
+
+Days of cover is the current stock divided by the net daily draw (demand
+minus supply); series whose stock is not falling have no cover figure.
+"""
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import DateField, FloatField, Sum
+from django.db.models.functions import Cast, TruncDate
+from django.utils import timezone
+
+from blood_requests.models import BloodRequest
+from donors.models import DonationHistory
+from .models import BloodInventory
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+HISTORY_DAYS = 365
+HALF_LIFE_DAYS = 14
+CACHE_KEY = 'shortage_forecast'
+
+
+def cover_threshold_days():
+    return getattr(settings, 'SHORTAGE_COVER_DAYS', 7)
+
+
+@dataclass
+class Forecast:
+    blood_bank_id: int
+    blood_bank_name: str
+    blood_group: str
+    units: float
+    supply_rate: float
+    demand_rate: float
+
+    @property
+    def net_draw(self):
+        """Units per day the stock is expected to fall by"""
+        return self.demand_rate - self.supply_rate
+
+    @property
+    def days_of_cover(self):
+        """Days until the stock runs out at the smoothed rates, None when it is not falling"""
+        if self.net_draw <= 0:
+            return None
+        return self.units / self.net_draw
+
+    def is_shortage(self, threshold=None):
+        cover = self.days_of_cover
+        return cover is not None and cover < (cover_threshold_days() if threshold is None else threshold)
+
+
+def _age_weights(history_days, half_life):
+    """Normalized exponential weights, index 0 being today"""
+    decay = 0.5 ** (1 / half_life)
+    weights = [decay ** age for age in range(history_days)]
+    total = sum(weights)
+    return [weight / total for weight in weights]
+
+
+def _smoothed_rates(rows, index, weights):
+    """Weighted daily rate per series from (series, age, units) rows"""
+    if np is not None:
+        if not rows:
+            return [0.0] * len(index)
+        series, ages, units = (np.asarray(column) for column in zip(*rows))
+        weight_array = np.asarray(weights)
+        return np.bincount(series, weights=units * weight_array[ages], minlength=len(index)).tolist()
+    rates = [0.0] * len(index)
+    for series, age, units in rows:
+        rates[series] += units * weights[age]
+    return rates
+
+
+def _daily_rows(queryset, bank_field, group_field, day_field, units_field, index, today):
+    """(series, age in days, units) per bank, blood group and day with any units"""
+    rows = []
+    aggregated = queryset.values_list(bank_field, group_field, day_field).annotate(
+        total=Sum(units_field, output_field=FloatField())
+    ).order_by()
+    for blood_bank_id, blood_group, day, total in aggregated.iterator(chunk_size=5000):
+        series = index.get((blood_bank_id, blood_group))
+        if series is not None:
+            rows.append((series, (today - day).days, total))
+    return rows
+
+
+def forecast_inventory(today=None, history_days=HISTORY_DAYS, half_life=HALF_LIFE_DAYS):
+    """
+    Smoothed supply and demand for every inventory row of the active banks,
+    lowest days of cover first. Returns a list of ``Forecast``.
+    """
+    today = today or timezone.localdate()
+    start = today - timedelta(days=history_days - 1)
+    inventory = BloodInventory.objects.filter(blood_bank__is_active=True).values_list(
+        'blood_bank_id', 'blood_bank__name', 'blood_group', 'units_available'
+    ).order_by('blood_bank_id', 'blood_group')
+    forecasts = [
+        Forecast(blood_bank_id, name, blood_group, float(units), 0.0, 0.0)
+        for blood_bank_id, name, blood_group, units in inventory
+    ]
+    index = {(f.blood_bank_id, f.blood_group): i for i, f in enumerate(forecasts)}
+    weights = _age_weights(history_days, half_life)
+
+    supply = _daily_rows(
+        DonationHistory.objects.filter(
+            status__in=DonationHistory.COUNTED_STATUSES, donation_date__gte=start, donation_date__lte=today
+        ),
+        'blood_bank_id', 'donor__blood_group', 'donation_date', 'units', index, today,
+    )
+    # Requests are bucketed on the same local days as ``today`` and the
+    # donation dates. In UTC a plain cast does it in the database; TruncDate
+    # converts time zones but calls back into Python for every row on SQLite
+    if timezone.get_current_timezone_name() == 'UTC':
+        day = Cast('requested_date', DateField())
+    else:
+        day = TruncDate('requested_date')
+    since = timezone.make_aware(datetime.combine(start, time.min))
+    demand = _daily_rows(
+        BloodRequest.objects.filter(
+            status='fulfilled', fulfilled_from__isnull=False, requested_date__gte=since
+        ).annotate(day=day).filter(day__lte=today),
+        'fulfilled_from_id', 'blood_group', 'day', 'units_required', index, today,
+    )
+    for forecast, supply_rate, demand_rate in zip(
+        forecasts, _smoothed_rates(supply, index, weights), _smoothed_rates(demand, index, weights)
+    ):
+        forecast.supply_rate = supply_rate
+        forecast.demand_rate = demand_rate
+
+    forecasts.sort(key=lambda f: (f.days_of_cover is None, f.days_of_cover or 0, f.blood_bank_id, f.blood_group))
+    return forecasts
+
+
+def cache_forecast(forecasts):
+    """Store a forecast for the dashboard until the next refresh"""
+    cache.set(CACHE_KEY, forecasts, getattr(settings, 'SHORTAGE_FORECAST_TIMEOUT', 60 * 60))
+
+
+def get_forecast():
+    """The cached forecast, recomputed when missing or expired"""
+    forecasts = cache.get(CACHE_KEY)
+    if forecasts is None:
+        forecasts = forecast_inventory()
+        cache_forecast(forecasts)
+    return forecasts
+
+
+def projected_shortages(forecasts=None, threshold=None):
+    """Forecasts whose days of cover is below the threshold"""
+    if forecasts is None:
+        forecasts = get_forecast()
+    return [forecast for forecast in forecasts if forecast.is_shortage(threshold)]
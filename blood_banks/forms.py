@@ -6,13 +6,15 @@ class BloodBankForm(forms.ModelForm):
     """Blood bank form"""
     class Meta:
         model = BloodBank
-        fields = ['name', 'address', 'city', 'state', 'zip_code', 'phone_number', 'email', 'is_active']
+        fields = ['name', 'address', 'city', 'state', 'zip_code', 'latitude', 'longitude', 'phone_number', 'email', 'is_active']
         widgets = {
             'name': forms.TextInput(attrs={'class': 'form-control'}),
             'address': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
             'city': forms.TextInput(attrs={'class': 'form-control'}),
             'state': forms.TextInput(attrs={'class': 'form-control'}),
             'zip_code': forms.TextInput(attrs={'class': 'form-control'}),
+            'latitude': forms.NumberInput(attrs={'class': 'form-control', 'step': 'any'}),
+            'longitude': forms.NumberInput(attrs={'class': 'form-control', 'step': 'any'}),
             'phone_number': forms.TextInput(attrs={'class': 'form-control'}),
             'email': forms.EmailInput(attrs={'class': 'form-control'}),
             'is_active': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
@@ -29,3 +31,34 @@ class BloodInventoryForm(forms.ModelForm):
             'blood_group': forms.Select(attrs={'class': 'form-control'}),
             'units_available': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
         }
+
+
+class InventoryAdjustmentForm(forms.Form):
+    """Set the units of an inventory row; saved as a ledger adjustment of the difference"""
+    units_available = forms.DecimalField(
+        max_digits=6, decimal_places=2, min_value=0,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'})
+    )
+    # Units shown when the form was opened: only the difference is applied, so
+    # changes saved by others in the meantime are kept
+    original_units = forms.DecimalField(max_digits=6, decimal_places=2, widget=forms.HiddenInput)
+    note = forms.CharField(
+        max_length=255, required=False,
+        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Reason for the adjustment'})
+    )
+    
+    @property
+    def change(self):
+        return self.cleaned_data['units_available'] - self.cleaned_data['original_units']
+
+
+class InventoryImportForm(forms.Form):
+    """CSV file of blood_bank_id, blood_group, units_available rows"""
+    file = forms.FileField(
+        label='CSV file',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,text/csv'})
+    )
+    note = forms.CharField(
+        max_length=255, required=False, initial='CSV import',
+        widget=forms.TextInput(attrs={'class': 'form-control'})
+    )
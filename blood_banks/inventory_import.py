@@ -0,0 +1,174 @@
+"""
+Bulk inventory import from CSV.
+
+Bank partners send their stock levels as ``blood_bank_id,blood_group,
+units_available`` rows (the inventory export has the same columns, so an
+export can be edited and sent back). The file is read as a stream and
+handled ``chunk_size`` rows at a time: each chunk is validated, compared
+with the stored levels and written with ``bulk_create``/``bulk_update`` plus
+one ledger entry per changed row, so memory stays flat however long the file
+is. The whole import is one transaction and nothing is kept if any row is
+invalid; up to ``MAX_ERRORS`` problems are reported.
+"""
+import csv
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+
+from blood_management.fragment_cache import bump_version
+from .ledger import publish_inventory_change
+from .models import BloodBank, BloodInventory, InventoryTransaction
+from .snapshots import record_levels
+from .stats import apply_deltas
+
+
+REQUIRED_COLUMNS = ('blood_bank_id', 'blood_group', 'units_available')
+CHUNK_SIZE = 2000
+MAX_ERRORS = 50
+MAX_UNITS = Decimal('9999.99')
+# bulk_update builds one CASE per column with a branch per row; smaller
+# batches keep that from growing quadratically
+BULK_UPDATE_BATCH = 500
+BLOOD_GROUPS = {group for group, _ in BloodInventory.BLOOD_GROUP_CHOICES}
+
+
+class InventoryImportError(Exception):
+    """The file could not be imported; ``errors`` lists what was wrong"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__('; '.join(errors))
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+
+def _parse_row(line, row):
+    """(blood_bank_id, blood_group, units) from a CSV row, or an error message"""
+    try:
+        blood_bank_id = int(row['blood_bank_id'])
+    except (TypeError, ValueError):
+        return f'Line {line}: invalid blood_bank_id {row["blood_bank_id"]!r}'
+    blood_group = (row['blood_group'] or '').strip().upper()
+    if blood_group not in BLOOD_GROUPS:
+        return f'Line {line}: invalid blood_group {row["blood_group"]!r}'
+    try:
+        units = Decimal((row['units_available'] or '').strip())
+    except InvalidOperation:
+        return f'Line {line}: invalid units_available {row["units_available"]!r}'
+    if not units.is_finite() or units < 0 or units > MAX_UNITS or units != units.quantize(Decimal('0.01')):
+        return f'Line {line}: units_available must be between 0 and {MAX_UNITS} with at most 2 decimals'
+    return blood_bank_id, blood_group, units.quantize(Decimal('0.01'))
+
+
+def _apply_chunk(levels, user, note, result, changed, group_changes):
+    """Write one chunk of validated ``{(bank, group): units}`` levels"""
+    existing = {
+        (blood_bank_id, blood_group): (pk, units)
+        for pk, blood_bank_id, blood_group, units in BloodInventory.objects.select_for_update().filter(
+            blood_bank_id__in={bank for bank, _ in levels}, blood_group__in={group for _, group in levels},
+        ).values_list('pk', 'blood_bank_id', 'blood_group', 'units_available')
+    }
+    now = timezone.now()
+    entries, to_create, to_update = [], [], []
+    deltas = {}
+    for (blood_bank_id, blood_group), units in levels.items():
+        pk, current = existing.get((blood_bank_id, blood_group), (None, None))
+        if pk is None:
+            change, reason = units, 'balance'
+            to_create.append(BloodInventory(blood_bank_id=blood_bank_id, blood_group=blood_group, units_available=units))
+            result.created += 1
+        elif current != units:
+            change, reason = units - current, 'adjustment'
+            to_update.append(BloodInventory(pk=pk, units_available=units))
+            result.updated += 1
+        else:
+            result.unchanged += 1
+            continue
+        if change:
+            entries.append(InventoryTransaction(
+                blood_bank_id=blood_bank_id, blood_group=blood_group, change=change, reason=reason,
+                created_by=user, note=note, created_at=now,
+            ))
+            key = ('inventory_units', blood_group)
+            deltas[key] = deltas.get(key, 0) + change
+            group_changes[blood_group] = group_changes.get(blood_group, 0) + change
+        changed.add((blood_bank_id, blood_group))
+    BloodInventory.objects.bulk_create(to_create)
+    BloodInventory.objects.bulk_update(to_update, ['units_available'], batch_size=BULK_UPDATE_BATCH)
+    BloodInventory.objects.filter(pk__in=[inventory.pk for inventory in to_update]).update(last_updated=now)
+    InventoryTransaction.objects.bulk_create(entries)
+    apply_deltas(deltas)
+
+
+def import_inventory(csv_file, user=None, note='CSV import', chunk_size=CHUNK_SIZE):
+    """
+    Set inventory levels from an open text-mode CSV file.
+
+    Rows for the same bank and blood group later in the file win. Raises
+    ``InventoryImportError`` (and writes nothing) when any row is invalid;
+    returns an ``ImportResult`` otherwise.
+    """
+    reader = csv.DictReader(csv_file)
+    missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        raise InventoryImportError([f'Missing column(s): {", ".join(missing)}'])
+
+    result = ImportResult()
+    errors = []
+    # Bank and blood group pairs touched; bounded by the inventory size, not the file
+    changed = set()
+    # Net change per blood group, announced to live pages once committed
+    group_changes = {}
+    with transaction.atomic():
+        while True:
+            chunk = list(islice(reader, chunk_size))
+            if not chunk:
+                break
+            levels = {}
+            first_line = reader.line_num - len(chunk) + 1
+            for offset, row in enumerate(chunk):
+                parsed = _parse_row(first_line + offset, row)
+                if isinstance(parsed, str):
+                    errors.append(parsed)
+                    continue
+                blood_bank_id, blood_group, units = parsed
+                levels[(blood_bank_id, blood_group)] = units
+            known_banks = set(BloodBank.objects.filter(pk__in={bank for bank, _ in levels}).values_list('pk', flat=True))
+            for bank in {bank for bank, _ in levels} - known_banks:
+                errors.append(f'Unknown blood bank {bank}')
+            result.rows += len(chunk)
+            if len(errors) >= MAX_ERRORS:
+                break
+            if not errors:
+                _apply_chunk(levels, user, note, result, changed, group_changes)
+        if errors:
+            # Roll back whatever the earlier chunks wrote
+            raise InventoryImportError(errors[:MAX_ERRORS])
+
+        def refresh():
+            levels = []
+            for row in BloodInventory.objects.values_list(
+                'blood_bank_id', 'blood_group', 'units_available'
+            ).iterator(chunk_size=chunk_size):
+                if row[:2] in changed:
+                    levels.append(row)
+                if len(levels) == chunk_size:
+                    record_levels(levels)
+                    levels = []
+            record_levels(levels)
+            bump_version(BloodInventory)
+        bump_version(BloodInventory)
+        transaction.on_commit(refresh)
+        for blood_group, change in group_changes.items():
+            if change:
+                publish_inventory_change(None, blood_group, change)
+    return result
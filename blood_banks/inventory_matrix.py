@@ -0,0 +1,93 @@
+"""
+Process-local inventory matrix.
+
+The bank x blood group matrix of units, with per-group totals and the flat
+rows the inventory list shows, is built from one query and kept in this
+process's memory. It is tagged with the ``BloodInventory`` and ``BloodBank``
+versions from the fragment cache, which every inventory write bumps (the
+ledger's ``F()`` updates and bulk imports included), and rebuilt when they
+move. A page view therefore costs one cache round trip for the versions
+instead of a scan of the inventory table. The versions come from the shared
+cache, so a write in any worker reaches every worker's copy; as a backstop
+for writes that skip the bump, a copy is also rebuilt once it is older than
+``INVENTORY_MATRIX_MAX_AGE`` seconds.
+"""
+import threading
+import time
+from collections import namedtuple
+from decimal import Decimal
+
+from django.conf import settings
+
+from blood_management.fragment_cache import model_versions
+from .models import BloodInventory
+
+
+LABELS = ('blood_banks.bloodbank', 'blood_banks.bloodinventory')
+BLOOD_GROUPS = [group for group, _ in BloodInventory.BLOOD_GROUP_CHOICES]
+
+InventoryRow = namedtuple(
+    'InventoryRow', ['pk', 'blood_bank_id', 'blood_bank_name', 'blood_group', 'units_available', 'last_updated']
+)
+
+
+def matrix_max_age():
+    return getattr(settings, 'INVENTORY_MATRIX_MAX_AGE', 60)
+
+
+class InventoryMatrix:
+    """Units per blood bank and blood group as of one pair of model versions"""
+
+    def __init__(self, versions, rows):
+        self.versions = versions
+        self.built_at = time.monotonic()
+        # Ordered by blood bank name, then blood group, like the inventory list
+        self.rows = rows
+        self.units = {(row.blood_bank_id, row.blood_group): row.units_available for row in rows}
+        # Per blood group, in choice order, for the groups any bank stocks
+        totals = {}
+        for row in rows:
+            totals[row.blood_group] = totals.get(row.blood_group, Decimal(0)) + row.units_available
+        self.totals = {group: totals[group] for group in BLOOD_GROUPS if group in totals}
+
+    def for_bank(self, blood_bank_id):
+        """Units of each blood group at one bank, zero where it has no row"""
+        return {group: self.units.get((blood_bank_id, group), Decimal(0)) for group in BLOOD_GROUPS}
+
+
+_lock = threading.Lock()
+_matrix = None
+
+
+def _build(versions):
+    rows = BloodInventory.objects.values_list(
+        'pk', 'blood_bank_id', 'blood_bank__name', 'blood_group', 'units_available', 'last_updated'
+    ).order_by('blood_bank__name', 'blood_bank_id', 'blood_group')
+    return InventoryMatrix(versions, [InventoryRow(*row) for row in rows])
+
+
+def get_inventory_matrix():
+    """The current matrix, rebuilt when inventory or blood banks changed or it got too old"""
+    global _matrix
+    versions = model_versions(LABELS)
+    matrix = _matrix
+    if _is_current(matrix, versions):
+        return matrix
+    with _lock:
+        # Another thread may have rebuilt it while this one waited
+        if not _is_current(_matrix, versions):
+            _matrix = _build(versions)
+        return _matrix
+
+
+def _is_current(matrix, versions):
+    return (
+        matrix is not None and matrix.versions == versions
+        and time.monotonic() - matrix.built_at < matrix_max_age()
+    )
+
+
+def clear_inventory_matrix():
+    """Drop this process's copy, e.g. between tests"""
+    global _matrix
+    _matrix = None
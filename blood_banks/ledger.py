@@ -0,0 +1,312 @@
+"""
+Inventory ledger.
+
+All stock movements go through ``record_transaction``: it appends an
+``InventoryTransaction`` and moves ``BloodInventory.units_available`` with a
+single ``F()`` update in the same database transaction. Concurrent
+approvals on the same bank and blood group therefore serialize on that one
+row instead of overwriting each other, and withdrawals are checked against
+the stock in the same statement that takes them.
+
+Stock received as ``BloodUnit`` bags is issued first-expired-first-out when
+a request is fulfilled, and ``expire_units`` writes off bags past their
+expiry date in batches. Bulk approvals credit all their donations at once
+with ``credit_donations``.
+
+A donation is credited and a request fulfilled only once: the
+``ledger_recorded`` flag of the donation or request is set with a
+conditional update in the transaction that writes its entries. The guard
+lives on the source rows rather than on the entries, so ``compact_ledger``
+can fold entries of every reason into balances.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from blood_management.events import publish_on_commit
+from blood_management.fragment_cache import bump_version
+from donors.models import DonationHistory
+from .models import BloodInventory, BloodUnit, InventoryTransaction
+from .snapshots import record_level, record_levels
+from .stats import apply_deltas
+
+
+class InsufficientInventory(Exception):
+    """A withdrawal asked for more units than the inventory holds"""
+
+
+class AlreadyRecorded(Exception):
+    """The donation was already credited or the request already fulfilled"""
+
+
+def mark_recorded(source):
+    """
+    Set the ``ledger_recorded`` flag of a donation or blood request, or raise
+    ``AlreadyRecorded`` if it is set already. Call it inside the transaction
+    that writes the entries, so they are rolled back together.
+    """
+    if not type(source).objects.filter(pk=source.pk, ledger_recorded=False).update(ledger_recorded=True):
+        raise AlreadyRecorded(f'This {source._meta.verbose_name.lower()} is already in the inventory ledger')
+    source.ledger_recorded = True
+
+
+def _inventory_changed(inventory_id, blood_bank_id, blood_group):
+    # Snapshots and cached fragments only need the committed level
+    def refresh():
+        units = BloodInventory.objects.filter(pk=inventory_id).values_list('units_available', flat=True).first()
+        if units is not None:
+            record_level(blood_bank_id, blood_group, units)
+        bump_version(BloodInventory)
+    bump_version(BloodInventory)
+    transaction.on_commit(refresh)
+
+
+def _inventories_changed(keys):
+    # Bulk version of _inventory_changed for ``(blood_bank_id, blood_group)`` keys
+    def refresh():
+        levels = [
+            row for row in BloodInventory.objects.filter(blood_bank_id__in={bank for bank, _ in keys}).values_list(
+                'blood_bank_id', 'blood_group', 'units_available'
+            ) if row[:2] in keys
+        ]
+        record_levels(levels)
+        bump_version(BloodInventory)
+    bump_version(BloodInventory)
+    transaction.on_commit(refresh)
+
+
+def publish_inventory_change(blood_bank_id, blood_group, change):
+    """Live "inventory" event once committed; ``blood_bank_id`` is None for totals over many banks"""
+    publish_on_commit('inventory', {'blood_bank_id': blood_bank_id, 'blood_group': blood_group, 'change': change})
+
+
+def record_transaction(blood_bank_id, blood_group, change, reason, donation=None, blood_request=None,
+                       user=None, note=''):
+    """
+    Append a ledger entry and apply ``change`` to the inventory row.
+
+    Raises ``InsufficientInventory`` when a negative change would take the
+    units below zero and ``AlreadyRecorded`` for a second credit of the same
+    donation; nothing is written then. Fulfillment entries are written after
+    ``mark_recorded`` on the request (see ``fulfil_request``), as a request
+    may take stock from several banks and blood groups.
+    """
+    change = Decimal(change)
+    with transaction.atomic():
+        if reason == 'donation' and donation is not None:
+            mark_recorded(donation)
+        entry = InventoryTransaction.objects.create(
+            blood_bank_id=blood_bank_id, blood_group=blood_group, change=change, reason=reason,
+            donation=donation, blood_request=blood_request, created_by=user, note=note,
+        )
+        inventory, _ = BloodInventory.objects.get_or_create(blood_bank_id=blood_bank_id, blood_group=blood_group)
+        rows = BloodInventory.objects.filter(pk=inventory.pk)
+        if change < 0:
+            rows = rows.filter(units_available__gte=-change)
+        if not rows.update(units_available=F('units_available') + change, last_updated=timezone.now()):
+            raise InsufficientInventory(
+                f'{blood_group} at blood bank {blood_bank_id} has fewer than {-change} units'
+            )
+        if reason == 'fulfillment':
+            issue_units(blood_bank_id, blood_group, -change, blood_request=blood_request)
+        apply_deltas({('inventory_units', blood_group): change})
+        _inventory_changed(inventory.pk, blood_bank_id, blood_group)
+        publish_inventory_change(blood_bank_id, blood_group, change)
+    return entry
+
+
+def receive_unit(blood_bank_id, blood_group, units, collection_date, component='whole_blood',
+                 reason='donation', donation=None, user=None, note=''):
+    """Add a blood bag to stock: the bag and its ledger entry are written together"""
+    with transaction.atomic():
+        entry = record_transaction(
+            blood_bank_id, blood_group, units, reason, donation=donation, user=user, note=note,
+        )
+        BloodUnit.objects.create(
+            blood_bank_id=blood_bank_id, blood_group=blood_group, component=component, units=units,
+            collection_date=collection_date, donation=donation,
+        )
+    return entry
+
+
+def credit_donation(donation, user=None):
+    """Add an approved donation's bag to its blood bank's inventory"""
+    return receive_unit(
+        donation.blood_bank_id, donation.donor.blood_group, donation.units, donation.donation_date,
+        donation=donation, user=user,
+    )
+
+
+def credit_donations(donations, user=None):
+    """
+    Bulk version of ``credit_donation``: one ledger entry and one bag per
+    donation, written with ``bulk_create``, and one ``F()`` update per blood
+    bank and blood group. Donations without a blood bank are skipped. Raises
+    ``AlreadyRecorded`` (and writes nothing) if any of them was credited
+    before. Returns the ledger entries.
+    """
+    donations = [donation for donation in donations if donation.blood_bank_id]
+    if not donations:
+        return []
+    now = timezone.now()
+    entries, bags = [], []
+    totals = defaultdict(Decimal)
+    shelf_life = timedelta(days=BloodUnit.SHELF_LIFE_DAYS['whole_blood'])
+    for donation in donations:
+        key = (donation.blood_bank_id, donation.donor.blood_group)
+        totals[key] += Decimal(donation.units)
+        entries.append(InventoryTransaction(
+            blood_bank_id=key[0], blood_group=key[1], change=donation.units, reason='donation',
+            donation=donation, created_by=user, created_at=now,
+        ))
+        bags.append(BloodUnit(
+            blood_bank_id=key[0], blood_group=key[1], units=donation.units, collection_date=donation.donation_date,
+            expiry_date=donation.donation_date + shelf_life, donation=donation,
+        ))
+    with transaction.atomic():
+        marked = DonationHistory.objects.filter(
+            pk__in=[donation.pk for donation in donations], ledger_recorded=False
+        ).update(ledger_recorded=True)
+        if marked != len(donations):
+            raise AlreadyRecorded('One of these donations is already in the inventory ledger')
+        entries = InventoryTransaction.objects.bulk_create(entries, batch_size=500)
+        BloodUnit.objects.bulk_create(bags, batch_size=500)
+        deltas = defaultdict(Decimal)
+        for (blood_bank_id, blood_group), units in totals.items():
+            inventory, _ = BloodInventory.objects.get_or_create(blood_bank_id=blood_bank_id, blood_group=blood_group)
+            BloodInventory.objects.filter(pk=inventory.pk).update(
+                units_available=F('units_available') + units, last_updated=now,
+            )
+            deltas[('inventory_units', blood_group)] += units
+            publish_inventory_change(blood_bank_id, blood_group, units)
+        apply_deltas(deltas)
+        _inventories_changed(set(totals))
+    for donation in donations:
+        donation.ledger_recorded = True
+    return entries
+
+
+def issue_units(blood_bank_id, blood_group, units, blood_request=None, on_date=None):
+    """
+    Mark available bags as issued, first-expired-first-out, until ``units``
+    are covered; a bag larger than what is left is split. Stock without bag
+    records (opening balances, adjustments) simply leaves part uncovered.
+    Returns the issued bags.
+    """
+    on_date = on_date or timezone.localdate()
+    remaining = Decimal(units)
+    issued = []
+    bags = BloodUnit.objects.select_for_update().filter(
+        blood_bank_id=blood_bank_id, blood_group=blood_group, status='available', expiry_date__gte=on_date
+    ).order_by('expiry_date', 'id')
+    for bag in bags.iterator(chunk_size=20):
+        if remaining <= 0:
+            break
+        if bag.units > remaining:
+            # Split: the rest of the bag stays available
+            BloodUnit.objects.filter(pk=bag.pk).update(units=F('units') - remaining)
+            bag.pk = None
+            bag.units = remaining
+            bag._state.adding = True
+        bag.status = 'issued'
+        bag.issued_to = blood_request
+        bag.save()
+        issued.append(bag)
+        remaining -= bag.units
+    return issued
+
+
+def fulfil_request(blood_request, blood_bank, user=None):
+    """Take a request's units out of the supplying blood bank's inventory"""
+    with transaction.atomic():
+        mark_recorded(blood_request)
+        return record_transaction(
+            blood_bank.pk, blood_request.blood_group, -Decimal(blood_request.units_required), 'fulfillment',
+            blood_request=blood_request, user=user,
+        )
+
+
+def adjust_inventory(inventory, change, user=None, note=''):
+    """Manual correction of an inventory row by ``change`` units"""
+    return record_transaction(inventory.blood_bank_id, inventory.blood_group, change, 'adjustment', user=user, note=note)
+
+
+def compact_ledger(older_than_days=90):
+    """
+    Replace the entries older than the cutoff, whatever their reason, with
+    one carried-forward balance entry per blood bank and blood group. Sums,
+    and therefore the ledger invariant, are unchanged, and the donations and
+    requests keep their ``ledger_recorded`` flags. Returns the number of
+    entries removed.
+    """
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    removed = 0
+    compactable = InventoryTransaction.objects.filter(created_at__lt=cutoff)
+    groups = compactable.values_list(
+        'blood_bank_id', 'blood_group'
+    ).distinct().order_by()
+    for blood_bank_id, blood_group in list(groups):
+        with transaction.atomic():
+            old = compactable.filter(blood_bank_id=blood_bank_id, blood_group=blood_group)
+            summary = old.aggregate(total=Sum('change'))
+            count = old.count()
+            if count <= 1:
+                continue
+            old.delete()
+            InventoryTransaction.objects.create(
+                blood_bank_id=blood_bank_id, blood_group=blood_group, change=summary['total'] or 0,
+                reason='balance', note=f'Compacted {count} entries', created_at=cutoff,
+            )
+            removed += count - 1
+    return removed
+
+
+def ledger_mismatches():
+    """Inventory rows whose units differ from the sum of their ledger entries"""
+    totals = {
+        (row['blood_bank_id'], row['blood_group']): row['total']
+        for row in InventoryTransaction.objects.values('blood_bank_id', 'blood_group').annotate(total=Sum('change')).order_by()
+    }
+    mismatches = []
+    for inventory in BloodInventory.objects.all():
+        total = totals.get((inventory.blood_bank_id, inventory.blood_group), Decimal(0))
+        if total != inventory.units_available:
+            mismatches.append((inventory, total))
+    return mismatches
+
+
+def expire_units(on_date=None, batch_size=500):
+    """
+    Mark available bags whose expiry date has passed as expired and write
+    the units off the inventory, ``batch_size`` bags per transaction.
+    Returns the number of bags expired.
+    """
+    on_date = on_date or timezone.localdate()
+    expired = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                BloodUnit.objects.select_for_update().filter(status='available', expiry_date__lt=on_date)
+                .order_by('expiry_date', 'id').values_list('id', 'blood_bank_id', 'blood_group', 'units')[:batch_size]
+            )
+            if not batch:
+                return expired
+            BloodUnit.objects.filter(pk__in=[row[0] for row in batch]).update(status='expired', updated_at=timezone.now())
+            totals = defaultdict(Decimal)
+            for _, blood_bank_id, blood_group, units in batch:
+                totals[(blood_bank_id, blood_group)] += units
+            for (blood_bank_id, blood_group), units in totals.items():
+                # Never take more than the stock holds, e.g. after manual corrections
+                stock = BloodInventory.objects.filter(
+                    blood_bank_id=blood_bank_id, blood_group=blood_group
+                ).values_list('units_available', flat=True).first() or Decimal(0)
+                units = min(units, stock)
+                if units > 0:
+                    record_transaction(
+                        blood_bank_id, blood_group, -units, 'expiry', note=f'Expired before {on_date}',
+                    )
+            expired += len(batch)
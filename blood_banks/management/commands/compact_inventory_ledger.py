@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from blood_banks.ledger import compact_ledger, ledger_mismatches
+
+
+class Command(BaseCommand):
+    help = 'Folds old inventory ledger entries into carried-forward balances and checks the ledger against the inventory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=90,
+                            help='Compact entries older than this many days')
+        parser.add_argument('--check', action='store_true',
+                            help='Only report inventory rows that disagree with their ledger')
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            removed = compact_ledger(options['older_than_days'])
+            self.stdout.write(self.style.SUCCESS(f'✓ Compacted the inventory ledger ({removed} entries removed)'))
+        mismatches = ledger_mismatches()
+        for inventory, total in mismatches:
+            self.stdout.write(self.style.WARNING(
+                f'  {inventory.blood_bank} {inventory.blood_group}: {inventory.units_available} units, ledger says {total}'
+            ))
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS('✓ Inventory matches the ledger'))
@@ -0,0 +1,23 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from blood_banks.ledger import expire_units
+
+
+class Command(BaseCommand):
+    help = 'Marks blood bags past their expiry date as expired and writes them off the inventory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Expire bags that expired before this day (YYYY-MM-DD), defaults to today')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Bags expired per transaction')
+
+    def handle(self, *args, **options):
+        day = None
+        if options['date']:
+            try:
+                day = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError(f"Invalid date: {options['date']}")
+        expired = expire_units(day, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'✓ Expired {expired} blood units'))
@@ -0,0 +1,27 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from blood_banks.expiry import BATCH_SIZE, expire_overdue_requests, expire_stale_donations
+
+
+class Command(BaseCommand):
+    help = 'Expires pending blood requests past their required-by date and pending donations past shelf life'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Sweep as of this day (YYYY-MM-DD), defaults to today')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Rows expired per transaction')
+        parser.add_argument('--max-batches', type=int,
+                            help='Stop after this many batches per table; the next run continues')
+
+    def handle(self, *args, **options):
+        day = None
+        if options['date']:
+            try:
+                day = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError(f"Invalid date: {options['date']}")
+        kwargs = {'batch_size': options['batch_size'], 'max_batches': options['max_batches']}
+        requests = expire_overdue_requests(day, **kwargs)
+        donations = expire_stale_donations(day, **kwargs)
+        self.stdout.write(self.style.SUCCESS(f'✓ Expired {requests} blood requests and {donations} donations'))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from blood_banks.forecasting import (
+    HALF_LIFE_DAYS, HISTORY_DAYS, cache_forecast, cover_threshold_days, forecast_inventory, projected_shortages,
+)
+
+
+class Command(BaseCommand):
+    help = 'Forecasts supply and demand per blood bank and blood group and lists stock projected to run short'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threshold', type=float, default=None,
+                            help='Flag stock with fewer days of cover than this (default SHORTAGE_COVER_DAYS)')
+        parser.add_argument('--history-days', type=int, default=HISTORY_DAYS,
+                            help='Days of donation and request history to smooth over')
+        parser.add_argument('--half-life', type=float, default=HALF_LIFE_DAYS,
+                            help='Days after which a day\'s weight in the average halves')
+
+    def handle(self, *args, **options):
+        threshold = options['threshold'] if options['threshold'] is not None else cover_threshold_days()
+        forecasts = forecast_inventory(history_days=options['history_days'], half_life=options['half_life'])
+        cache_forecast(forecasts)
+        shortages = projected_shortages(forecasts, threshold)
+        for forecast in shortages:
+            self.stdout.write(self.style.WARNING(
+                f'  {forecast.blood_bank_name} {forecast.blood_group}: {forecast.units:.2f} units, '
+                f'{forecast.days_of_cover:.1f} days of cover '
+                f'(supply {forecast.supply_rate:.2f}/day, demand {forecast.demand_rate:.2f}/day)'
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Forecast {len(forecasts)} inventory rows, {len(shortages)} under {threshold:g} days of cover'
+        ))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from blood_banks.inventory_import import CHUNK_SIZE, InventoryImportError, import_inventory
+
+
+class Command(BaseCommand):
+    help = 'Sets blood inventory levels from a CSV file of blood_bank_id, blood_group, units_available rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file to import')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                            help='Rows validated and written per batch')
+        parser.add_argument('--note', default='CSV import', help='Note on the ledger entries')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as csv_file:
+                result = import_inventory(csv_file, note=options['note'], chunk_size=options['chunk_size'])
+        except OSError as e:
+            raise CommandError(f'Cannot read {options["path"]}: {e}')
+        except InventoryImportError as e:
+            raise CommandError('Nothing imported:\n  ' + '\n  '.join(e.errors))
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Imported {result.rows} rows: {result.created} created, {result.updated} updated, {result.unchanged} unchanged'
+        ))
@@ -0,0 +1,21 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from blood_banks.snapshots import snapshot_inventory
+
+
+class Command(BaseCommand):
+    help = 'Writes the daily inventory snapshot for every blood bank and blood group and refreshes the rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Snapshot date (YYYY-MM-DD), defaults to today')
+
+    def handle(self, *args, **options):
+        day = None
+        if options['date']:
+            try:
+                day = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError(f"Invalid date: {options['date']}")
+        count = snapshot_inventory(day)
+        self.stdout.write(self.style.SUCCESS(f'✓ Recorded {count} inventory snapshots'))
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blood_banks', '0002_location'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bloodbank',
+            index=models.Index(fields=['name', 'id'], name='blood_bank_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bloodbank',
+            index=models.Index(fields=['is_active', 'name', 'id'], name='blood_bank_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bloodinventory',
+            index=models.Index(fields=['blood_group', 'units_available'], name='inventory_group_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:15
+
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def populate_stats(apps, schema_editor):
+    DashboardStat = apps.get_model('blood_banks', 'DashboardStat')
+    BloodBank = apps.get_model('blood_banks', 'BloodBank')
+    BloodInventory = apps.get_model('blood_banks', 'BloodInventory')
+    DonorProfile = apps.get_model('donors', 'DonorProfile')
+    DonationHistory = apps.get_model('donors', 'DonationHistory')
+    BloodRequest = apps.get_model('blood_requests', 'BloodRequest')
+    totals = defaultdict(int)
+    for row in DonorProfile.objects.values('blood_group', 'is_available').annotate(n=Count('id')).order_by():
+        totals[('donors', row['blood_group'])] += row['n']
+        if row['is_available']:
+            totals[('available_donors', row['blood_group'])] += row['n']
+    for row in BloodBank.objects.values('is_active').annotate(n=Count('id')).order_by():
+        totals[('blood_banks', 'active' if row['is_active'] else 'inactive')] += row['n']
+    for row in DonationHistory.objects.values('status').annotate(n=Count('id')).order_by():
+        totals[('donations', row['status'])] += row['n']
+    for row in BloodRequest.objects.values('status').annotate(n=Count('id')).order_by():
+        totals[('requests', row['status'])] += row['n']
+    for row in BloodInventory.objects.values('blood_group').annotate(total=Sum('units_available')).order_by():
+        totals[('inventory_units', row['blood_group'])] += row['total'] or 0
+    DashboardStat.objects.bulk_create(
+        DashboardStat(metric=metric, key=key, value=value) for (metric, key), value in totals.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blood_banks', '0003_hot_filter_indexes'),
+        ('blood_requests', '0002_hot_filter_indexes'),
+        ('donors', '0006_city'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(choices=[('donors', 'Donors'), ('available_donors', 'Available donors'), ('blood_banks', 'Blood banks'), ('donations', 'Donations'), ('requests', 'Blood requests'), ('inventory_units', 'Inventory units')], max_length=20)),
+                ('key', models.CharField(blank=True, help_text='Blood group or status', max_length=20)),
+                ('value', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Dashboard Statistic',
+                'verbose_name_plural': 'Dashboard Statistics',
+                'db_table': 'dashboard_stats',
+                'ordering': ['metric', 'key'],
+                'unique_together': {('metric', 'key')},
+            },
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
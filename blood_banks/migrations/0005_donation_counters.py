@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blood_banks', '0004_dashboard_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bloodbank',
+            name='approved_units',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='bloodbank',
+            name='donation_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Approved donations'),
+        ),
+        migrations.AddField(
+            model_name='bloodbank',
+            name='last_approved_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+    ]
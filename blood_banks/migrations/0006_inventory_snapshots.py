@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blood_banks', '0005_donation_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventorySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('blood_group', models.CharField(choices=[('A+', 'A+'), ('A-', 'A-'), ('B+', 'B+'), ('B-', 'B-'), ('AB+', 'AB+'), ('AB-', 'AB-'), ('O+', 'O+'), ('O-', 'O-')], max_length=3)),
+                ('period', models.CharField(choices=[('day', 'Day'), ('week', 'Week'), ('month', 'Month')], max_length=5)),
+                ('period_start', models.DateField(help_text='First day of the period (weeks start on Monday)')),
+                ('units', models.DecimalField(decimal_places=2, help_text='Units at the end of the period', max_digits=8)),
+                ('min_units', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('max_units', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('avg_units', models.DecimalField(decimal_places=2, help_text='Average of the daily closing units', max_digits=8)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('blood_bank', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_snapshots', to='blood_banks.bloodbank')),
+            ],
+            options={
+                'verbose_name': 'Inventory Snapshot',
+                'verbose_name_plural': 'Inventory Snapshots',
+                'db_table': 'inventory_snapshots',
+                'ordering': ['period', 'period_start', 'blood_bank', 'blood_group'],
+                'indexes': [models.Index(fields=['period', 'period_start', 'blood_group'], name='snapshot_period_idx')],
+                'unique_together': {('blood_bank', 'blood_group', 'period', 'period_start')},
+            },
+        ),
+    ]
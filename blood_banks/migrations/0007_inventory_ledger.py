@@ -0,0 +1,56 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:23
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def open_ledger(apps, schema_editor):
+    # One balance entry per existing inventory row so the ledger sums to units_available
+    BloodInventory = apps.get_model('blood_banks', 'BloodInventory')
+    InventoryTransaction = apps.get_model('blood_banks', 'InventoryTransaction')
+    InventoryTransaction.objects.bulk_create(
+        (
+            InventoryTransaction(blood_bank_id=bank_id, blood_group=group, change=units, reason='balance',
+                                 note='Opening balance')
+            for bank_id, group, units in BloodInventory.objects.values_list('blood_bank_id', 'blood_group', 'units_available')
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blood_banks', '0006_inventory_snapshots'),
+        ('blood_requests', '0002_hot_filter_indexes'),
+        ('donors', '0007_donation_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('blood_group', models.CharField(choices=[('A+', 'A+'), ('A-', 'A-'), ('B+', 'B+'), ('B-', 'B-'), ('AB+', 'AB+'), ('AB-', 'AB-'), ('O+', 'O+'), ('O-', 'O-')], max_length=3)),
+                ('change', models.DecimalField(decimal_places=2, help_text='Units added (positive) or removed (negative)', max_digits=8)),
+                ('reason', models.CharField(choices=[('donation', 'Approved donation'), ('fulfillment', 'Request fulfillment'), ('adjustment', 'Manual adjustment'), ('balance', 'Carried-forward balance')], max_length=20)),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('blood_bank', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_transactions', to='blood_banks.bloodbank')),
+                ('blood_request', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='inventory_transactions', to='blood_requests.bloodrequest')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='inventory_transactions', to=settings.AUTH_USER_MODEL)),
+                ('donation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='inventory_transactions', to='donors.donationhistory')),
+            ],
+            options={
+                'verbose_name': 'Inventory Transaction',
+                'verbose_name_plural': 'Inventory Transactions',
+                'db_table': 'inventory_transactions',
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['blood_bank', 'blood_group', 'created_at'], name='inventory_txn_idx'), models.Index(fields=['created_at', 'id'], name='inventory_txn_created_idx')],
+            },
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
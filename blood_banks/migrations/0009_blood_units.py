@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blood_banks', '0007_inventory_ledger'),
+        ('blood_requests', '0003_fulfilled_from'),
+        ('donors', '0007_donation_counters'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='inventorytransaction',
+            name='reason',
+            field=models.CharField(choices=[('donation', 'Approved donation'), ('fulfillment', 'Request fulfillment'), ('adjustment', 'Manual adjustment'), ('expiry', 'Expired units'), ('balance', 'Carried-forward balance')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='BloodUnit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('blood_group', models.CharField(choices=[('A+', 'A+'), ('A-', 'A-'), ('B+', 'B+'), ('B-', 'B-'), ('AB+', 'AB+'), ('AB-', 'AB-'), ('O+', 'O+'), ('O-', 'O-')], max_length=3)),
+                ('component', models.CharField(choices=[('whole_blood', 'Whole Blood'), ('red_cells', 'Red Cells'), ('plasma', 'Plasma'), ('platelets', 'Platelets')], default='whole_blood', max_length=20)),
+                ('units', models.DecimalField(decimal_places=2, default=1, max_digits=4)),
+                ('collection_date', models.DateField()),
+                ('expiry_date', models.DateField(blank=True, help_text="Defaults to the component's shelf life after collection")),
+                ('status', models.CharField(choices=[('available', 'Available'), ('issued', 'Issued'), ('expired', 'Expired'), ('discarded', 'Discarded')], default='available', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('blood_bank', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='blood_units', to='blood_banks.bloodbank')),
+                ('donation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='blood_units', to='donors.donationhistory')),
+                ('issued_to', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='blood_units', to='blood_requests.bloodrequest')),
+            ],
+            options={
+                'verbose_name': 'Blood Unit',
+                'verbose_name_plural': 'Blood Units',
+                'db_table': 'blood_units',
+                'ordering': ['expiry_date', 'id'],
+                'indexes': [models.Index(condition=models.Q(('status', 'available')), fields=['blood_bank', 'blood_group', 'expiry_date', 'id'], name='unit_fefo_idx'), models.Index(condition=models.Q(('status', 'available')), fields=['expiry_date', 'id'], name='unit_expiry_idx')],
+            },
+        ),
+    ]
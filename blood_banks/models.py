@@ -1,27 +1,58 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import models
+from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+from blood_management.counters import MaintainedCountersMixin
+from blood_management.geo import encode_geohash
 
 
-class BloodBank(models.Model):
+class BloodBank(MaintainedCountersMixin, models.Model):
     """Blood Bank model for managing blood banks"""
     name = models.CharField(max_length=200)
     address = models.TextField()
     city = models.CharField(max_length=100)
     state = models.CharField(max_length=100, blank=True)
     zip_code = models.CharField(max_length=10, blank=True)
+    latitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)])
+    geohash = models.CharField(max_length=12, blank=True, db_index=True, editable=False)
     phone_number = models.CharField(max_length=15)
     email = models.EmailField()
     is_active = models.BooleanField(default=True)
+    donation_count = models.PositiveIntegerField(default=0, editable=False, help_text="Approved donations")
+    approved_units = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
+    last_approved_date = models.DateField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Maintained by donors.counters from donation history
+    counter_fields = ('donation_count', 'approved_units', 'last_approved_date')
+    
     def __str__(self):
         return self.name
     
+    def save(self, *args, **kwargs):
+        self.geohash = encode_geohash(self.latitude, self.longitude) if self.has_location else ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & {'latitude', 'longitude'}:
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        super().save(*args, **kwargs)
+    
+    @property
+    def has_location(self):
+        return self.latitude is not None and self.longitude is not None
+    
     class Meta:
         db_table = 'blood_banks'
         verbose_name = 'Blood Bank'
         verbose_name_plural = 'Blood Banks'
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['name', 'id'], name='blood_bank_name_idx'),
+            models.Index(fields=['is_active', 'name', 'id'], name='blood_bank_active_idx'),
+        ]
 
 
 class BloodInventory(models.Model):
@@ -51,3 +82,172 @@ class BloodInventory(models.Model):
         verbose_name_plural = 'Blood Inventories'
         unique_together = ['blood_bank', 'blood_group']
         ordering = ['blood_bank', 'blood_group']
+        indexes = [
+            models.Index(fields=['blood_group', 'units_available'], name='inventory_group_idx'),
+        ]
+
+
+class DashboardStat(models.Model):
+    """
+    Summary counters for the admin dashboard, one row per metric and key
+    (a blood group or a status). Kept current by signals applying deltas.
+    """
+    METRIC_CHOICES = (
+        ('donors', 'Donors'),
+        ('available_donors', 'Available donors'),
+        ('blood_banks', 'Blood banks'),
+        ('donations', 'Donations'),
+        ('requests', 'Blood requests'),
+        ('inventory_units', 'Inventory units'),
+    )
+    
+    metric = models.CharField(max_length=20, choices=METRIC_CHOICES)
+    key = models.CharField(max_length=20, blank=True, help_text="Blood group or status")
+    value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.metric}[{self.key}] = {self.value}"
+    
+    class Meta:
+        db_table = 'dashboard_stats'
+        verbose_name = 'Dashboard Statistic'
+        verbose_name_plural = 'Dashboard Statistics'
+        unique_together = ['metric', 'key']
+        ordering = ['metric', 'key']
+
+
+class InventorySnapshot(models.Model):
+    """
+    Inventory level time series, one row per blood bank, blood group and
+    period. Daily rows are written on every inventory change and by the
+    ``snapshot_inventory`` command; weekly and monthly rows are rollups of
+    the daily ones.
+    """
+    PERIOD_CHOICES = (
+        ('day', 'Day'),
+        ('week', 'Week'),
+        ('month', 'Month'),
+    )
+    
+    blood_bank = models.ForeignKey(BloodBank, on_delete=models.CASCADE, related_name='inventory_snapshots')
+    blood_group = models.CharField(max_length=3, choices=BloodInventory.BLOOD_GROUP_CHOICES)
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    period_start = models.DateField(help_text="First day of the period (weeks start on Monday)")
+    units = models.DecimalField(max_digits=8, decimal_places=2, help_text="Units at the end of the period")
+    min_units = models.DecimalField(max_digits=8, decimal_places=2)
+    max_units = models.DecimalField(max_digits=8, decimal_places=2)
+    avg_units = models.DecimalField(max_digits=8, decimal_places=2, help_text="Average of the daily closing units")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.blood_bank_id} {self.blood_group} {self.period} {self.period_start}: {self.units}"
+    
+    class Meta:
+        db_table = 'inventory_snapshots'
+        verbose_name = 'Inventory Snapshot'
+        verbose_name_plural = 'Inventory Snapshots'
+        unique_together = ['blood_bank', 'blood_group', 'period', 'period_start']
+        ordering = ['period', 'period_start', 'blood_bank', 'blood_group']
+        indexes = [
+            models.Index(fields=['period', 'period_start', 'blood_group'], name='snapshot_period_idx'),
+        ]
+
+
+class InventoryTransaction(models.Model):
+    """
+    Append-only ledger of inventory changes. Every entry is written in the
+    same database transaction as the ``F()`` update of the matching
+    ``BloodInventory.units_available``, so the entries of a bank and blood
+    group always sum to its current units.
+    """
+    REASON_CHOICES = (
+        ('donation', 'Approved donation'),
+        ('fulfillment', 'Request fulfillment'),
+        ('adjustment', 'Manual adjustment'),
+        ('expiry', 'Expired units'),
+        ('balance', 'Carried-forward balance'),
+    )
+    
+    blood_bank = models.ForeignKey(BloodBank, on_delete=models.CASCADE, related_name='inventory_transactions')
+    blood_group = models.CharField(max_length=3, choices=BloodInventory.BLOOD_GROUP_CHOICES)
+    change = models.DecimalField(max_digits=8, decimal_places=2, help_text="Units added (positive) or removed (negative)")
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    donation = models.ForeignKey('donors.DonationHistory', on_delete=models.SET_NULL, null=True, blank=True, related_name='inventory_transactions')
+    blood_request = models.ForeignKey('blood_requests.BloodRequest', on_delete=models.SET_NULL, null=True, blank=True, related_name='inventory_transactions')
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='inventory_transactions')
+    note = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        return f"{self.blood_bank_id} {self.blood_group} {self.change:+} ({self.reason})"
+    
+    class Meta:
+        db_table = 'inventory_transactions'
+        verbose_name = 'Inventory Transaction'
+        verbose_name_plural = 'Inventory Transactions'
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['blood_bank', 'blood_group', 'created_at'], name='inventory_txn_idx'),
+            models.Index(fields=['created_at', 'id'], name='inventory_txn_created_idx'),
+        ]
+
+
+class BloodUnit(models.Model):
+    """
+    A single blood bag. ``BloodInventory.units_available`` stays the cached
+    per-bank, per-group total; bags add expiry tracking so stock can be
+    issued first-expired-first-out and swept when it expires.
+    """
+    COMPONENT_CHOICES = (
+        ('whole_blood', 'Whole Blood'),
+        ('red_cells', 'Red Cells'),
+        ('plasma', 'Plasma'),
+        ('platelets', 'Platelets'),
+    )
+    
+    # Storage life from collection, in days
+    SHELF_LIFE_DAYS = {
+        'whole_blood': 35,
+        'red_cells': 42,
+        'plasma': 365,
+        'platelets': 5,
+    }
+    
+    STATUS_CHOICES = (
+        ('available', 'Available'),
+        ('issued', 'Issued'),
+        ('expired', 'Expired'),
+        ('discarded', 'Discarded'),
+    )
+    
+    blood_bank = models.ForeignKey(BloodBank, on_delete=models.CASCADE, related_name='blood_units')
+    blood_group = models.CharField(max_length=3, choices=BloodInventory.BLOOD_GROUP_CHOICES)
+    component = models.CharField(max_length=20, choices=COMPONENT_CHOICES, default='whole_blood')
+    units = models.DecimalField(max_digits=4, decimal_places=2, default=1)
+    collection_date = models.DateField()
+    expiry_date = models.DateField(blank=True, help_text="Defaults to the component's shelf life after collection")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='available')
+    donation = models.ForeignKey('donors.DonationHistory', on_delete=models.SET_NULL, null=True, blank=True, related_name='blood_units')
+    issued_to = models.ForeignKey('blood_requests.BloodRequest', on_delete=models.SET_NULL, null=True, blank=True, related_name='blood_units')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.blood_group} {self.get_component_display()} (expires {self.expiry_date})"
+    
+    def save(self, *args, **kwargs):
+        if not self.expiry_date:
+            self.expiry_date = self.collection_date + timedelta(days=self.SHELF_LIFE_DAYS[self.component])
+        super().save(*args, **kwargs)
+    
+    class Meta:
+        db_table = 'blood_units'
+        verbose_name = 'Blood Unit'
+        verbose_name_plural = 'Blood Units'
+        ordering = ['expiry_date', 'id']
+        indexes = [
+            # First-expired-first-out picking and the expiry sweep only look at available bags
+            models.Index(fields=['blood_bank', 'blood_group', 'expiry_date', 'id'], condition=models.Q(status='available'), name='unit_fefo_idx'),
+            models.Index(fields=['expiry_date', 'id'], condition=models.Q(status='available'), name='unit_expiry_idx'),
+        ]
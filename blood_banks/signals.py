@@ -0,0 +1,36 @@
+from django.db.models.signals import post_save, post_delete
+
+from blood_management.stored_rows import on_pre_save
+from .models import BloodInventory
+from .snapshots import record_level
+from .stats import TRACKED_MODELS, apply_deltas, change_deltas, instance_values
+
+
+def remember_previous_stats(instance, stored):
+    """Keep the stored values so post_save can apply only the difference"""
+    instance._previous_stats = stored
+
+
+def update_stats_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    deltas = change_deltas(sender, getattr(instance, '_previous_stats', None), instance_values(instance))
+    apply_deltas(deltas)
+
+
+def update_stats_on_delete(sender, instance, **kwargs):
+    apply_deltas(change_deltas(sender, old_values=instance_values(instance)))
+
+
+for model, (fields, _) in TRACKED_MODELS.items():
+    on_pre_save(model, fields, remember_previous_stats)
+    post_save.connect(update_stats_on_save, sender=model, dispatch_uid=f'dashboard_stats_post_save_{model.__name__}')
+    post_delete.connect(update_stats_on_delete, sender=model, dispatch_uid=f'dashboard_stats_delete_{model.__name__}')
+
+
+def record_inventory_snapshot(sender, instance, raw=False, **kwargs):
+    if not raw:
+        record_level(instance.blood_bank_id, instance.blood_group, instance.units_available)
+
+
+post_save.connect(record_inventory_snapshot, sender=BloodInventory, dispatch_uid='inventory_snapshot_post_save')
@@ -0,0 +1,209 @@
+"""
+Inventory level time series.
+
+``BloodInventory`` only holds the current level. Each change records the
+level in that day's ``InventorySnapshot`` row (keeping the day's low and
+high), and the daily rows are rolled up into weekly and monthly rows so
+trend reports read a few hundred pre-aggregated rows. ``record_levels`` does
+the same for many rows at once (nightly snapshots, bulk imports).
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Avg, DecimalField, Max, Min, Sum
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+
+from .models import BloodInventory, InventorySnapshot
+
+
+ROLLUP_PERIODS = ('week', 'month')
+
+
+def period_start(day, period):
+    """First day of the day/week/month containing ``day``; weeks start on Monday"""
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def period_end(day, period):
+    """Last day of the period containing ``day``"""
+    start = period_start(day, period)
+    if period == 'week':
+        return start + timedelta(days=6)
+    if period == 'month':
+        next_month = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return next_month - timedelta(days=1)
+    return start
+
+
+def record_level(blood_bank_id, blood_group, units, day=None):
+    """Record the current level in the day's snapshot and refresh its rollups"""
+    day = day or timezone.localdate()
+    with transaction.atomic():
+        snapshots = InventorySnapshot.objects.filter(
+            blood_bank_id=blood_bank_id, blood_group=blood_group, period='day', period_start=day
+        )
+        updated = snapshots.update(
+            units=units, avg_units=units,
+            min_units=Least('min_units', units, output_field=DecimalField()),
+            max_units=Greatest('max_units', units, output_field=DecimalField()),
+        )
+        if not updated:
+            try:
+                with transaction.atomic():
+                    InventorySnapshot.objects.create(
+                        blood_bank_id=blood_bank_id, blood_group=blood_group, period='day', period_start=day,
+                        units=units, min_units=units, max_units=units, avg_units=units,
+                    )
+            except IntegrityError:
+                # Created concurrently: fold this level into that row
+                snapshots.update(
+                    units=units, avg_units=units,
+                    min_units=Least('min_units', units, output_field=DecimalField()),
+                    max_units=Greatest('max_units', units, output_field=DecimalField()),
+                )
+        for period in ROLLUP_PERIODS:
+            refresh_rollup(blood_bank_id, blood_group, period, day)
+
+
+def refresh_rollup(blood_bank_id, blood_group, period, day):
+    """Recompute one weekly or monthly row from the daily rows it covers"""
+    start, end = period_start(day, period), period_end(day, period)
+    days = InventorySnapshot.objects.filter(
+        blood_bank_id=blood_bank_id, blood_group=blood_group, period='day',
+        period_start__gte=start, period_start__lte=end,
+    )
+    summary = days.aggregate(low=Min('min_units'), high=Max('max_units'), average=Avg('units'))
+    closing = days.order_by('-period_start').values_list('units', flat=True).first()
+    if closing is None:
+        return
+    InventorySnapshot.objects.update_or_create(
+        blood_bank_id=blood_bank_id, blood_group=blood_group, period=period, period_start=start,
+        defaults={
+            'units': closing,
+            'min_units': summary['low'],
+            'max_units': summary['high'],
+            'avg_units': round(summary['average'], 2),
+        },
+    )
+
+
+SNAPSHOT_FIELDS = ['units', 'min_units', 'max_units', 'avg_units']
+SNAPSHOT_KEY = ['blood_bank', 'blood_group', 'period', 'period_start']
+
+
+def _save_snapshots(existing, new):
+    InventorySnapshot.objects.bulk_update(existing, SNAPSHOT_FIELDS + ['updated_at'])
+    # A row created concurrently since it was looked up is overwritten
+    InventorySnapshot.objects.bulk_create(
+        new, update_conflicts=True, unique_fields=SNAPSHOT_KEY, update_fields=SNAPSHOT_FIELDS + ['updated_at'],
+    )
+
+
+def record_levels(levels, day=None):
+    """
+    Bulk ``record_level`` for many rows at once: ``levels`` is a list of
+    (blood_bank_id, blood_group, units). A fixed number of queries per call
+    instead of several per row.
+    """
+    day = day or timezone.localdate()
+    if not levels:
+        return
+    now = timezone.now()
+    banks = {blood_bank_id for blood_bank_id, _, _ in levels}
+    groups = {blood_group for _, blood_group, _ in levels}
+    keys = {(blood_bank_id, blood_group) for blood_bank_id, blood_group, _ in levels}
+    with transaction.atomic():
+        snapshots = InventorySnapshot.objects.select_for_update().filter(blood_bank_id__in=banks, blood_group__in=groups)
+        days = {
+            (row.blood_bank_id, row.blood_group): row
+            for row in snapshots.filter(period='day', period_start=day)
+        }
+        existing, new = [], []
+        for blood_bank_id, blood_group, units in levels:
+            row = days.get((blood_bank_id, blood_group))
+            if row is None:
+                row = days[(blood_bank_id, blood_group)] = InventorySnapshot(
+                    blood_bank_id=blood_bank_id, blood_group=blood_group, period='day', period_start=day,
+                    min_units=units, max_units=units,
+                )
+                new.append(row)
+            elif row.pk is not None:
+                existing.append(row)
+            row.units = row.avg_units = units
+            row.min_units = min(row.min_units, units)
+            row.max_units = max(row.max_units, units)
+            row.updated_at = now
+        _save_snapshots(existing, new)
+
+        # Rollups from the daily rows of the widest period around the day
+        first, last = min(period_start(day, p) for p in ROLLUP_PERIODS), max(period_end(day, p) for p in ROLLUP_PERIODS)
+        daily = defaultdict(list)
+        for row in snapshots.filter(period='day', period_start__gte=first, period_start__lte=last).values_list(
+            'blood_bank_id', 'blood_group', 'period_start', 'units', 'min_units', 'max_units'
+        ).order_by('period_start'):
+            if (row[0], row[1]) in keys:
+                daily[(row[0], row[1])].append(row[2:])
+        for period in ROLLUP_PERIODS:
+            start, end = period_start(day, period), period_end(day, period)
+            rollups = {
+                (row.blood_bank_id, row.blood_group): row
+                for row in snapshots.filter(period=period, period_start=start)
+            }
+            existing, new = [], []
+            for key in keys:
+                rows = [row for row in daily[key] if start <= row[0] <= end]
+                if not rows:
+                    continue
+                rollup = rollups.get(key)
+                if rollup is None:
+                    rollup = InventorySnapshot(blood_bank_id=key[0], blood_group=key[1], period=period, period_start=start)
+                    new.append(rollup)
+                else:
+                    existing.append(rollup)
+                rollup.units = rows[-1][1]
+                rollup.min_units = min(row[2] for row in rows)
+                rollup.max_units = max(row[3] for row in rows)
+                rollup.avg_units = round(sum(row[1] for row in rows) / len(rows), 2)
+                rollup.updated_at = now
+            _save_snapshots(existing, new)
+
+
+def snapshot_inventory(day=None, chunk_size=2000):
+    """
+    Write the day's snapshot for every inventory row, carrying levels forward
+    for rows that did not change that day. Returns the number of rows.
+    """
+    day = day or timezone.localdate()
+    count = 0
+    with transaction.atomic():
+        rows = BloodInventory.objects.values_list('blood_bank_id', 'blood_group', 'units_available').order_by('pk')
+        chunk = []
+        for row in rows.iterator(chunk_size=chunk_size):
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                record_levels(chunk, day)
+                count += len(chunk)
+                chunk = []
+        record_levels(chunk, day)
+        count += len(chunk)
+    return count
+
+
+def inventory_trend(period, since=None, blood_group=None, blood_bank=None):
+    """Units per period and blood group summed over blood banks, oldest first"""
+    snapshots = InventorySnapshot.objects.filter(period=period)
+    if since:
+        snapshots = snapshots.filter(period_start__gte=period_start(since, period))
+    if blood_group:
+        snapshots = snapshots.filter(blood_group=blood_group)
+    if blood_bank:
+        snapshots = snapshots.filter(blood_bank=blood_bank)
+    return snapshots.values('period_start', 'blood_group').annotate(
+        units=Sum('units'), min_units=Sum('min_units'), max_units=Sum('max_units'), avg_units=Sum('avg_units'),
+    ).order_by('period_start', 'blood_group')
@@ -0,0 +1,137 @@
+"""
+Incrementally maintained admin dashboard statistics.
+
+Every tracked model maps a row to its contributions to ``DashboardStat``
+counters. Saves subtract the old row's contributions and add the new ones,
+deletes subtract, and the net deltas are applied with ``F()`` updates so
+concurrent writers never lose counts. ``rebuild_stats`` recomputes everything
+from the source tables to correct drift from bulk writes.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from blood_requests.models import BloodRequest
+from donors.models import DonorProfile, DonationHistory
+from .models import BloodBank, BloodInventory, DashboardStat
+
+
+def donor_contributions(blood_group, is_available):
+    yield 'donors', blood_group, 1
+    if is_available:
+        yield 'available_donors', blood_group, 1
+
+
+def blood_bank_contributions(is_active):
+    yield 'blood_banks', 'active' if is_active else 'inactive', 1
+
+
+def donation_contributions(status):
+    yield 'donations', status, 1
+
+
+def request_contributions(status):
+    yield 'requests', status, 1
+
+
+def inventory_contributions(blood_group, units_available):
+    yield 'inventory_units', blood_group, Decimal(units_available)
+
+
+# Model -> (fields the contributions depend on, contribution function)
+TRACKED_MODELS = {
+    DonorProfile: (('blood_group', 'is_available'), donor_contributions),
+    BloodBank: (('is_active',), blood_bank_contributions),
+    DonationHistory: (('status',), donation_contributions),
+    BloodRequest: (('status',), request_contributions),
+    BloodInventory: (('blood_group', 'units_available'), inventory_contributions),
+}
+
+
+def row_contributions(model, values):
+    _, contributions = TRACKED_MODELS[model]
+    return contributions(*values)
+
+
+def instance_values(instance):
+    fields, _ = TRACKED_MODELS[type(instance)]
+    return tuple(getattr(instance, field) for field in fields)
+
+
+def change_deltas(model, old_values=None, new_values=None):
+    """Net counter changes for a row going from ``old_values`` to ``new_values``"""
+    deltas = defaultdict(Decimal)
+    if old_values is not None:
+        for metric, key, amount in row_contributions(model, old_values):
+            deltas[(metric, key)] -= Decimal(amount)
+    if new_values is not None:
+        for metric, key, amount in row_contributions(model, new_values):
+            deltas[(metric, key)] += Decimal(amount)
+    return {stat: amount for stat, amount in deltas.items() if amount}
+
+
+def apply_deltas(deltas):
+    """Add each delta to its counter, creating missing counters"""
+    for (metric, key), amount in deltas.items():
+        updated = DashboardStat.objects.filter(metric=metric, key=key).update(value=F('value') + amount)
+        if not updated:
+            try:
+                with transaction.atomic():
+                    DashboardStat.objects.create(metric=metric, key=key, value=amount)
+            except IntegrityError:
+                # Created concurrently: fall back to the atomic update
+                DashboardStat.objects.filter(metric=metric, key=key).update(value=F('value') + amount)
+
+
+def compute_stats():
+    """Every counter computed from scratch with aggregate queries"""
+    totals = defaultdict(Decimal)
+    for row in DonorProfile.objects.values('blood_group', 'is_available').annotate(n=Count('id')).order_by():
+        for metric, key, amount in donor_contributions(row['blood_group'], row['is_available']):
+            totals[(metric, key)] += amount * row['n']
+    for row in BloodBank.objects.values('is_active').annotate(n=Count('id')).order_by():
+        for metric, key, amount in blood_bank_contributions(row['is_active']):
+            totals[(metric, key)] += amount * row['n']
+    for row in DonationHistory.objects.values('status').annotate(n=Count('id')).order_by():
+        for metric, key, amount in donation_contributions(row['status']):
+            totals[(metric, key)] += amount * row['n']
+    for row in BloodRequest.objects.values('status').annotate(n=Count('id')).order_by():
+        for metric, key, amount in request_contributions(row['status']):
+            totals[(metric, key)] += amount * row['n']
+    for row in BloodInventory.objects.values('blood_group').annotate(total=Sum('units_available')).order_by():
+        for metric, key, amount in inventory_contributions(row['blood_group'], row['total'] or 0):
+            totals[(metric, key)] += amount
+    return totals
+
+
+def rebuild_stats():
+    """
+    Replace all counters with freshly computed values.
+
+    Returns ``{(metric, key): (old, new)}`` for every counter that drifted.
+    """
+    with transaction.atomic():
+        totals = compute_stats()
+        existing = {(stat.metric, stat.key): stat for stat in DashboardStat.objects.select_for_update()}
+        drift = {}
+        for stat_key in set(existing) | set(totals):
+            new_value = totals.get(stat_key, Decimal(0))
+            stat = existing.get(stat_key)
+            if stat is None:
+                DashboardStat.objects.create(metric=stat_key[0], key=stat_key[1], value=new_value)
+                drift[stat_key] = (Decimal(0), new_value)
+            elif stat.value != new_value:
+                drift[stat_key] = (stat.value, new_value)
+                stat.value = new_value
+                stat.save(update_fields=['value', 'updated_at'])
+    return drift
+
+
+def get_dashboard_stats():
+    """All counters in one query as ``{metric: {key: value}}``"""
+    stats = defaultdict(dict)
+    for metric, key, value in DashboardStat.objects.values_list('metric', 'key', 'value'):
+        stats[metric][key] = value
+    return stats
@@ -0,0 +1,54 @@
+from django import template
+
+from blood_management.fragment_cache import get_or_render
+
+
+register = template.Library()
+
+
+class VersionedCacheNode(template.Node):
+    def __init__(self, nodelist, name, models, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.models = models
+        self.vary_on = vary_on
+
+    def render(self, context):
+        name = self.name.resolve(context)
+        models = [model.resolve(context) for model in self.models]
+        vary_on = [value.resolve(context) for value in self.vary_on]
+        return get_or_render(name, models, lambda: self.nodelist.render(context), vary_on)
+
+
+@register.tag('versioned_cache')
+def do_versioned_cache(parser, token):
+    """
+    Cache a template fragment until one of the listed models changes.
+
+    Usage::
+
+        {% load fragment_cache %}
+        {% versioned_cache 'inventory_list' 'blood_banks.BloodInventory' 'blood_banks.BloodBank' vary_on user.user_type %}
+            ...
+        {% endversioned_cache %}
+    """
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' takes a fragment name followed by at least one model label"
+        )
+    args = bits[1:]
+    vary_on = []
+    if 'vary_on' in args:
+        index = args.index('vary_on')
+        args, vary_on = args[:index], args[index + 1:]
+    if len(args) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' needs at least one model label")
+    nodelist = parser.parse(('endversioned_cache',))
+    parser.delete_first_token()
+    return VersionedCacheNode(
+        nodelist,
+        parser.compile_filter(args[0]),
+        [parser.compile_filter(arg) for arg in args[1:]],
+        [parser.compile_filter(arg) for arg in vary_on],
+    )
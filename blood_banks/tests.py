@@ -1,3 +1,869 @@
-from django.test import TestCase
+import asyncio
+import subprocess
+import sys
+import zoneinfo
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from accounts.models import User
+from blood_management.events import broker, event_stream
+from blood_management.fragment_cache import bump_version, fragment_stats
+from blood_management.testing import QueryPlanAssertionsMixin
+from blood_requests.models import BloodRequest
+from donors.counters import recompute_donation_counters
+from donors.models import DonorProfile, DonationHistory
+from notifications.models import OutboxMessage
+from .ledger import (
+    AlreadyRecorded, compact_ledger, credit_donation, expire_units, fulfil_request, ledger_mismatches, receive_unit,
+    record_transaction,
+)
+from .models import BloodBank, BloodInventory, BloodUnit, InventorySnapshot, InventoryTransaction
+from .forecasting import forecast_inventory
+from .inventory_import import InventoryImportError, import_inventory
+from .inventory_matrix import clear_inventory_matrix, get_inventory_matrix
+from .snapshots import record_level
+from .stats import get_dashboard_stats, rebuild_stats
+from .approvals import approve_donations
+from .expiry import expire_overdue_requests, expire_stale_donations
+
+
+class BloodBankQueryPlanTests(QueryPlanAssertionsMixin, TestCase):
+    """The main query of every admin and inventory view must be answered from an index"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='admin123', user_type='admin'
+        )
+        donor = User.objects.create_user(
+            username='donor', email='donor@example.com', password='donor123', user_type='donor'
+        )
+        profile = DonorProfile.objects.create(
+            user=donor, blood_group='O-', date_of_birth=date(1990, 1, 1), gender='female',
+            address='45 Gulshan Avenue', city='Dhaka'
+        )
+        bank = BloodBank.objects.create(
+            name='Central Blood Bank', address='Shahbagh', city='Dhaka',
+            phone_number='0123456789', email='central@example.com', latitude=23.73, longitude=90.39
+        )
+        BloodInventory.objects.create(blood_bank=bank, blood_group='O-', units_available=10)
+        DonationHistory.objects.create(donor=profile, blood_bank=bank, donation_date=date.today(), units=1)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_admin_dashboard(self):
+        # The counters table is read whole (a few rows per metric), and so is the inventory matrix
+        self.assertNoFullScans(
+            self.client, '/admin/dashboard/', allow=['dashboard_stats', 'blood_inventory', 'blood_banks']
+        )
+
+    def test_donors_list(self):
+        for url in ['/admin/donors/', '/admin/donors/?blood_group=O-&is_available=true']:
+            self.assertNoFullScans(self.client, url)
+
+    def test_donation_approval_list(self):
+        self.assertNoFullScans(self.client, '/admin/donations/pending/')
+
+    def test_blood_inventory_list(self):
+        # The inventory matrix is built from the whole table, once per inventory version
+        self.assertNoFullScans(self.client, '/inventory/', allow=['blood_inventory', 'blood_banks'])
+
+    def test_blood_bank_list(self):
+        for url in ['/blood-banks/', '/blood-banks/?near=23.7,90.4']:
+            self.assertNoFullScans(self.client, url)
+
+
+class DashboardStatTests(TestCase):
+    """Dashboard counters follow every write and agree with a full recount"""
+
+    def setUp(self):
+        self.bank = BloodBank.objects.create(
+            name='Central Blood Bank', address='Shahbagh', city='Dhaka',
+            phone_number='0123456789', email='central@example.com'
+        )
+        self.inventory = BloodInventory.objects.create(blood_bank=self.bank, blood_group='A+', units_available=4)
+        donor = User.objects.create_user(
+            username='donor', email='donor@example.com', password='donor123', user_type='donor'
+        )
+        self.profile = DonorProfile.objects.create(
+            user=donor, blood_group='A+', date_of_birth=date(1990, 1, 1), gender='male',
+            address='12 Green Road', city='Dhaka'
+        )
+
+    def test_counters_follow_writes(self):
+        stats = get_dashboard_stats()
+        self.assertEqual(stats['donors']['A+'], 1)
+        self.assertEqual(stats['available_donors']['A+'], 1)
+        self.assertEqual(stats['inventory_units']['A+'], 4)
+        self.assertEqual(stats['blood_banks']['active'], 1)
+
+        self.profile.blood_group = 'B-'
+        self.profile.is_available = False
+        self.profile.save()
+        self.inventory.units_available = Decimal('6.5')
+        self.inventory.save()
+        donation = DonationHistory.objects.create(
+            donor=self.profile, blood_bank=self.bank, donation_date=date.today(), units=1
+        )
+        donation.status = 'approved'
+        donation.save()
+
+        stats = get_dashboard_stats()
+        self.assertEqual(stats['donors']['A+'], 0)
+        self.assertEqual(stats['donors']['B-'], 1)
+        self.assertEqual(stats['available_donors']['A+'], 0)
+        self.assertNotIn('B-', stats['available_donors'])
+        self.assertEqual(stats['inventory_units']['A+'], Decimal('6.5'))
+        self.assertEqual(stats['donations'], {'pending': 0, 'approved': 1})
+
+        self.profile.delete()
+        stats = get_dashboard_stats()
+        self.assertEqual(stats['donors']['B-'], 0)
+        self.assertEqual(stats['donations']['approved'], 0)
+
+    def test_rebuild_corrects_drift(self):
+        BloodInventory.objects.filter(pk=self.inventory.pk).update(units_available=9)
+        drift = rebuild_stats()
+        self.assertEqual(drift, {('inventory_units', 'A+'): (Decimal(4), Decimal(9))})
+        self.assertEqual(rebuild_stats(), {})
+
+    def test_admin_dashboard_uses_counters(self):
+        admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='admin123', user_type='admin'
+        )
+        self.client.force_login(admin)
+        response = self.client.get('/admin/dashboard/')
+        self.assertEqual(response.context['total_donors'], 1)
+        self.assertEqual(response.context['available_donors'], 1)
+        self.assertEqual(response.context['total_blood_banks'], 1)
+        self.assertEqual(response.context['donors_by_blood_group'], [{'blood_group': 'A+', 'count': 1}])
+
+
+class FragmentCacheTests(TestCase):
+    """Cached fragments are served until a model they render changes"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='admin123', user_type='admin'
+        )
+        self.bank = BloodBank.objects.create(
+            name='Central Blood Bank', address='Shahbagh', city='Dhaka',
+            phone_number='0123456789', email='central@example.com'
+        )
+        self.inventory = BloodInventory.objects.create(blood_bank=self.bank, blood_group='AB-', units_available=3)
+        self.client.force_login(self.admin)
+
+    def test_inventory_list_cached_until_inventory_changes(self):
+        self.client.get('/inventory/')
+        with self.assertNumQueries(2):  # session and user only
+            response = self.client.get('/inventory/')
+        self.assertContains(response, '3.00')
+        self.assertEqual(fragment_stats()['inventory_list'], {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+        self.inventory.units_available = 7
+        self.inventory.save()
+        response = self.client.get('/inventory/')
+        self.assertContains(response, '7.00')
+        self.assertEqual(fragment_stats()['inventory_list']['misses'], 2)
+
+    def test_bump_version_for_writes_without_signals(self):
+        self.client.get('/inventory/')
+        BloodInventory.objects.filter(pk=self.inventory.pk).update(units_available=12)
+        bump_version(BloodInventory)
+        self.assertContains(self.client.get('/inventory/'), '12.00')
+
+    def test_bump_from_another_process_invalidates(self):
+        self.client.get('/inventory/')
+        BloodInventory.objects.filter(pk=self.inventory.pk).update(units_available=9)
+        self.assertContains(self.client.get('/inventory/'), '3.00')
+        # A separate worker has its own cache connection; the bump must reach this one
+        subprocess.run(
+            [sys.executable, 'manage.py', 'shell', '-c',
+             'from blood_management.fragment_cache import bump_version; bump_version("blood_banks.bloodinventory")'],
+            cwd=settings.BASE_DIR, check=True, capture_output=True,
+        )
+        self.assertContains(self.client.get('/inventory/'), '9.00')
+
+    def test_stats_endpoint(self):
+        self.client.get('/inventory/')
+        response = self.client.get('/admin/cache-stats/')
+        self.assertEqual(response.json()['fragments']['inventory_list']['misses'], 1)
+        self.client.post('/admin/cache-stats/')
+        self.assertEqual(fragment_stats()['inventory_list']['misses'], 0)
+
+
+class InventorySnapshotTests(TestCase):
+    """Inventory changes land in daily snapshots that roll up into weeks and months"""
+
+    def setUp(self):
+        self.bank = BloodBank.objects.create(
+            name='Central Blood Bank', address='Shahbagh', city='Dhaka',
+            phone_number='0123456789', email='central@example.com'
+        )
+
+    def test_daily_levels_roll_up(self):
+        # Monday 3 to Wednesday 5 March 2025
+        for day, units in [(date(2025, 3, 3), 10), (date(2025, 3, 3), 4), (date(2025, 3, 4), 8), (date(2025, 3, 5), 6)]:
+            record_level(self.bank.pk, 'O+', Decimal(units), day)
+
+        monday = InventorySnapshot.objects.get(period='day', period_start=date(2025, 3, 3))
+        self.assertEqual((monday.units, monday.min_units, monday.max_units), (4, 4, 10))
+
+        week = InventorySnapshot.objects.get(period='week', period_start=date(2025, 3, 3))
+        self.assertEqual((week.units, week.min_units, week.max_units, week.avg_units), (6, 4, 10, 6))
+        month = InventorySnapshot.objects.get(period='month', period_start=date(2025, 3, 1))
+        self.assertEqual(month.units, 6)
+
+    def test_inventory_changes_are_recorded(self):
+        inventory = BloodInventory.objects.create(blood_bank=self.bank, blood_group='B+', units_available=5)
+        inventory.units_available = 2
+        inventory.save()
+        self.assertEqual(InventorySnapshot.objects.filter(blood_group='B+').count(), 3)
+        today = InventorySnapshot.objects.get(blood_group='B+', period='day')
+        self.assertEqual((today.units, today.max_units), (2, 5))
+
+    def test_snapshot_command_and_trends_view(self):
+        BloodInventory.objects.create(blood_bank=self.bank, blood_group='A-', units_available=3)
+        call_command('snapshot_inventory', date='2025-01-15', stdout=StringIO())
+        self.assertTrue(InventorySnapshot.objects.filter(period='month', period_start=date(2025, 1, 1)).exists())
+
+        admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='admin123', user_type='admin'
+        )
+        self.client.force_login(admin)
+        response = self.client.get('/inventory/trends/?period=day')
+        self.assertEqual(response.context['trend'][-1]['units'][1], 3)
+
+
+class InventoryLedgerTests(TestCase):
+    """Stock moves only through ledger entries and the F() update that goes with them"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='admin123', user_type='admin'
+        )
+        donor = User.objects.create_user(
+            username='donor', email='donor@example.com', password='donor123', user_type='donor'
+        )
+        self.profile = DonorProfile.objects.create(
+            user=donor, blood_group='O+', date_of_birth=date(1990, 1, 1), gender='male',
+            address='12 Green Road', city='Dhaka'
+        )
+        self.bank = BloodBank.objects.create(
+            name='Central Blood Bank', address='Shahbagh', city='Dhaka',
+            phone_number='0123456789', email='central@example.com'
+        )
+        self.client.force_login(self.admin)
+
+    def units(self, blood_group='O+'):
+        return BloodInventory.objects.get(blood_bank=self.bank, blood_group=blood_group).units_available
+
+    def assertLedgerBalanced(self):
+        self.assertEqual(ledger_mismatches(), [])
+
+    def test_donation_approval_credits_inventory_once(self):
+        donation = DonationHistory.objects.create(
+            donor=self.profile, blood_bank=self.bank, donation_date=date.today(), units=Decimal('1.50')
+        )
+        self.client.post(f'/admin/donations/{donation.pk}/approve/')
+        self.client.post(f'/admin/donations/{donation.pk}/approve/')
+        self.assertEqual(self.units(), Decimal('1.50'))
+        self.assertEqual(InventoryTransaction.objects.filter(donation=donation, reason='donation').count(), 1)
+        self.assertEqual(get_dashboard_stats()['inventory_units']['O+'], Decimal('1.50'))
+        bag = BloodUnit.objects.get(donation=donation)
+        self.assertEqual((bag.units, bag.status), (Decimal('1.50'), 'available'))
+        self.assertEqual(bag.expiry_date, date.today() + timedelta(days=35))
+        with self.assertRaises(AlreadyRecorded):
+            credit_donation(donation)
+        self.assertLedgerBalanced()
+
+    def test_fulfillment_debits_supplying_bank(self):
+        record_transaction(self.bank.pk, 'A+', 3, 'adjustment')
+        blood_request = BloodRequest.objects.create(
+            requester=self.admin, patient_name='Patient', blood_group='A+', units_required=Decimal('5'),
+            hospital_name='DMCH', hospital_address='Dhaka', city='Dhaka', contact_number='0123',
+            reason='Surgery', required_by_date=date.today()
+        )
+        url = f'/requests/{blood_request.pk}/update/'
+        response = self.client.post(url, {'status': 'fulfilled', 'fulfilled_from': self.bank.pk})
+        self.assertFormError(response.context['form'], 'fulfilled_from', 'This blood bank does not have enough units in stock.')
+        blood_request.refresh_from_db()
+        self.assertEqual(blood_request.status, 'pending')
+        self.assertEqual(self.units('A+'), 3)
+
+        record_transaction(self.bank.pk, 'A+', 2, 'adjustment')
+        self.client.post(url, {'status': 'fulfilled', 'fulfilled_from': self.bank.pk})
+        blood_request.refresh_from_db()
+        self.assertEqual(blood_request.status, 'fulfilled')
+        self.assertEqual(self.units('A+'), 0)
+        self.assertLedgerBalanced()
+
+    def test_adjustment_applies_only_the_difference(self):
+        record_transaction(self.bank.pk, 'O+', 10, 'adjustment')
+        inventory = BloodInventory.objects.get(blood_bank=self.bank, blood_group='O+')
+        # An approval lands after the form was opened with 10 units
+        record_transaction(self.bank.pk, 'O+', 1, 'donation')
+        self.client.post(f'/inventory/{inventory.pk}/update/', {
+            'units_available': '8', 'original_units': '10', 'note': 'Expired bags',
+        })
+        self.assertEqual(self.units(), 9)
+        self.assertLedgerBalanced()
+
+    def test_compaction_keeps_totals(self):
+        for change in (5, -2, 4):
+            record_transaction(self.bank.pk, 'B-', change, 'adjustment')
+        InventoryTransaction.objects.update(created_at=timezone.now() - timedelta(days=120))
+        record_transaction(self.bank.pk, 'B-', 1, 'adjustment')
+        self.assertEqual(compact_ledger(older_than_days=90), 2)
+        self.assertEqual(InventoryTransaction.objects.filter(blood_group='B-').count(), 2)
+        self.assertEqual(self.units('B-'), 8)
+        self.assertLedgerBalanced()
+
+    def test_compaction_folds_every_reason(self):
+        donations = [
+            DonationHistory.objects.create(
+                donor=self.profile, blood_bank=self.bank, donation_date=date.today(), units=Decimal('2.00')
+            )
+            for _ in range(3)
+        ]
+        for donation in donations:
+            credit_donation(donation)
+        record_transaction(self.bank.pk, 'O+', 3, 'adjustment')
+        blood_request = BloodRequest.objects.create(
+            requester=self.admin, patient_name='Patient', blood_group='O+', units_required=Decimal('4'),
+            hospital_name='DMCH', hospital_address='Dhaka', city='Dhaka', contact_number='0123',
+            reason='Surgery', required_by_date=date.today()
+        )
+        fulfil_request(blood_request, self.bank)
+        record_transaction(self.bank.pk, 'O+', -1, 'expiry')
+        record_transaction(self.bank.pk, 'A-', 2, 'adjustment')
+        InventoryTransaction.objects.update(created_at=timezone.now() - timedelta(days=120))
+        record_transaction(self.bank.pk, 'O+', 1, 'adjustment')
+
+        # The six old O+ entries become one balance; a lone A- entry is left as it is
+        self.assertEqual(compact_ledger(older_than_days=90), 5)
+        self.assertEqual(
+            sorted(InventoryTransaction.objects.values_list('blood_group', 'reason', 'change')),
+            [('A-', 'adjustment', Decimal('2.00')), ('O+', 'adjustment', Decimal('1.00')),
+             ('O+', 'balance', Decimal('4.00'))],
+        )
+        self.assertEqual((self.units(), self.units('A-')), (5, 2))
+        self.assertLedgerBalanced()
+        # The flags on the donations and the request still stop a second credit or fulfillment
+        with self.assertRaises(AlreadyRecorded):
+            credit_donation(donations[0])
+        with self.assertRaises(AlreadyRecorded):
+            fulfil_request(blood_request, self.bank)
+        self.assertEqual(self.units(), 5)
+        self.assertEqual(compact_ledger(older_than_days=90), 0)
+
+    def test_other_integrity_errors_are_not_already_recorded(self):
+        with self.assertRaises(IntegrityError):
+            record_transaction(self.bank.pk, None, 1, 'donation')
+        self.assertFalse(InventoryTransaction.objects.exists())
+
+    def test_reject_pending_donation(self):
+        donation = DonationHistory.objects.create(
+            donor=self.profile, blood_bank=self.bank, donation_date=date.today(), units=Decimal('1.00')
+        )
+        self.client.post(f'/admin/donations/{donation.pk}/reject/', {'notes': 'Low haemoglobin'})
+        donation.refresh_from_db()
+        self.assertEqual((donation.status, donation.notes), ('rejected', 'Low haemoglobin'))
+
+    def test_approved_donation_cannot_be_rejected(self):
+        donation = DonationHistory.objects.create(
+            donor=self.profile, blood_bank=self.bank, donation_date=date.today(), units=Decimal('1.00')
+        )
+        self.client.post(f'/admin/donations/{donation.pk}/approve/')
+        response = self.client.post(f'/admin/donations/{donation.pk}/reject/', {'notes': 'Oops'}, follow=True)
+        self.assertContains(response, 'Only pending donations can be rejected')
+        donation.refresh_from_db()
+        self.assertEqual(donation.status, 'approved')
+        self.assertEqual(self.units(), 1)
+        self.assertLedgerBalanced()
+
+
+class BloodUnitTests(TestCase):
+    """Bags are issued first-expired-first-out and written off when they expire"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='admin123', user_type='admin'
+        )
+        self.bank = BloodBank.objects.create(
+            name='Central Blood Bank', address='Shahbagh', city='Dhaka',
+            phone_number='0123456789', email='central@example.com'
+        )
+        self.today = date.today()
+
+    def receive(self, collected_days_ago, units=1, component='whole_blood'):
+        receive_unit(self.bank.pk, 'A+', units, self.today - timedelta(days=collected_days_ago), component=component)
+        return BloodUnit.objects.latest('id')
+
+    def test_fulfillment_issues_oldest_bags_first(self):
+        fresh = self.receive(1, units=2)
+        oldest = self.receive(30)
+        older = self.receive(20, units=2)
+        blood_request = BloodRequest.objects.create(
+            requester=self.admin, patient_name='Patient', blood_group='A+', units_required=Decimal('2.5'),
+            hospital_name='DMCH', hospital_address='Dhaka', city='Dhaka', contact_number='0123',
+            reason='Surgery', required_by_date=self.today
+        )
+        record_transaction(self.bank.pk, 'A+', -Decimal('2.5'), 'fulfillment', blood_request=blood_request)
+
+        issued = BloodUnit.objects.filter(status='issued', issued_to=blood_request)
+        self.assertEqual(sum(bag.units for bag in issued), Decimal('2.5'))
+        oldest.refresh_from_db()
+        older.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual(oldest.status, 'issued')
+        # The second bag is split: half issued, the rest still in stock
+        self.assertEqual((older.status, older.units), ('available', Decimal('0.5')))
+        self.assertEqual((fresh.status, fresh.units), ('available', Decimal('2')))
+        available = BloodUnit.objects.filter(status='available').values_list('units', flat=True)
+        self.assertEqual(sum(available), BloodInventory.objects.get(blood_bank=self.bank).units_available)
+
+    def test_expired_bags_are_written_off(self):
+        self.receive(40)
+        self.receive(36, units=2)
+        self.receive(2, units=1, component='platelets')
+        self.receive(1)
+        self.assertEqual(expire_units(self.today + timedelta(days=4), batch_size=2), 3)
+        self.assertEqual(BloodUnit.objects.filter(status='expired').count(), 3)
+        self.assertEqual(BloodInventory.objects.get(blood_bank=self.bank).units_available, 1)
+        self.assertEqual(InventoryTransaction.objects.filter(reason='expiry').count(), 2)
+        self.assertEqual(ledger_mismatches(), [])
+
+        out = StringIO()
+        call_command('expire_blood_units', stdout=out)
+        self.assertIn('Expired 0 blood units', out.getvalue())
+
+
+class ShortageForecastTests(TestCase):
+    """Smoothed supply and demand give days of cover per bank and blood group"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='admin123', user_type='admin'
+        )
+        donor = User.objects.create_user(
+            username='donor', email='donor@example.com', password='donor123', user_type='donor'
+        )
+        self.profile = DonorProfile.objects.create(
+            user=donor, blood_group='A+', date_of_birth=date(1990, 1, 1), gender='male',
+            address='12 Green Road', city='Dhaka'
+        )
+        self.bank = BloodBank.objects.create(
+            name='Central Blood Bank', address='Shahbagh', city='Dhaka',
+            phone_number='0123456789', email='central@example.com'
+        )
+        record_transaction(self.bank.pk, 'O-', 10, 'adjustment')
+        record_transaction(self.bank.pk, 'A+', 10, 'adjustment')
+        today = timezone.now()
+        for days_ago in range(30):
+            blood_request = BloodRequest.objects.create(
+                requester=self.admin, patient_name='Patient', blood_group='O-', units_required=Decimal('3'),
+                hospital_name='DMCH', hospital_address='Dhaka', city='Dhaka', contact_number='0123',
+                reason='Surgery', required_by_date=date.today(), status='fulfilled', fulfilled_from=self.bank,
+            )
+            BloodRequest.objects.filter(pk=blood_request.pk).update(requested_date=today - timedelta(days=days_ago))
+            DonationHistory.objects.create(
+                donor=self.profile, blood_bank=self.bank, units=Decimal('1'), status='approved',
+                donation_date=date.today() - timedelta(days=days_ago),
+            )
+
+    def test_forecast_flags_low_cover(self):
+        forecasts = {f.blood_group: f for f in forecast_inventory(half_life=7)}
+        o_negative = forecasts['O-']
+        self.assertAlmostEqual(o_negative.demand_rate, 3, delta=0.2)
+        self.assertEqual(o_negative.supply_rate, 0)
+        self.assertLess(o_negative.days_of_cover, 4)
+        self.assertTrue(o_negative.is_shortage(7))
+        # Supply keeps up with (no) demand: nothing to project
+        self.assertIsNone(forecasts['A+'].days_of_cover)
+        self.assertAlmostEqual(forecasts['A+'].supply_rate, 1, delta=0.1)
+
+    @override_settings(TIME_ZONE='Asia/Dhaka')
+    def test_demand_is_bucketed_on_local_days(self):
+        record_transaction(self.bank.pk, 'B+', 10, 'adjustment')
+        today = date(2026, 10, 18)
+        dhaka = zoneinfo.ZoneInfo('Asia/Dhaka')
+        # Half past midnight in Dhaka is still the previous day in UTC
+        for requested, units in [(datetime(2026, 10, 18, 0, 30), 2), (datetime(2026, 10, 17, 23, 30), 5)]:
+            blood_request = BloodRequest.objects.create(
+                requester=self.admin, patient_name='Patient', blood_group='B+', units_required=Decimal(units),
+                hospital_name='DMCH', hospital_address='Dhaka', city='Dhaka', contact_number='0123',
+                reason='Surgery', required_by_date=today, status='fulfilled', fulfilled_from=self.bank,
+            )
+            BloodRequest.objects.filter(pk=blood_request.pk).update(requested_date=requested.replace(tzinfo=dhaka))
+        forecasts = {f.blood_group: f for f in forecast_inventory(today=today, history_days=1)}
+        self.assertEqual(forecasts['B+'].demand_rate, 2)
+        forecasts = {f.blood_group: f for f in forecast_inventory(today=today - timedelta(days=1), history_days=1)}
+        self.assertEqual(forecasts['B+'].demand_rate, 5)
+
+    def test_dashboard_and_command_show_shortages(self):
+        self.client.force_login(self.admin)
+        response = self.client.get('/admin/dashboard/')
+        self.assertEqual([f.blood_group for f in response.context['shortages']], ['O-'])
+        self.assertContains(response, 'Projected Shortages')
+
+        out = StringIO()
+        call_command('forecast_shortages', '--threshold', '2', stdout=out)
+        self.assertIn('0 under 2 days of cover', out.getvalue())
+
+
+class InventoryCsvTests(TestCase):
+    """CSV exports stream from iterators; imports are validated and written in chunks"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='admin123', user_type='admin'
+        )
+        self.bank = BloodBank.objects.create(
+            name='Central Blood Bank', address='Shahbagh', city='Dhaka',
+            phone_number='0123456789', email='central@example.com'
+        )
+        record_transaction(self.bank.pk, 'A+', 5, 'balance')
+        record_transaction(self.bank.pk, 'B+', 2, 'balance')
+        self.client.force_login(self.admin)
+
+    def upload(self, content):
+        return self.client.post('/inventory/import/', {
+            'file': SimpleUploadedFile('stock.csv', content.encode(), content_type='text/csv'), 'note': 'Partner feed',
+        })
+
+    def test_inventory_export_streams_rows(self):
+        response = self.client.get('/inventory/export/')
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'blood_bank_id,blood_bank,blood_group,units_available,last_updated')
+        self.assertTrue(lines[1].startswith(f'{self.bank.pk},Central Blood Bank,A+,5.00,'))
+        self.assertEqual(len(lines), 3)
+
+    def test_import_sets_levels_through_the_ledger(self):
+        rows = [f'{self.bank.pk},A+,7.5', f'{self.bank.pk},B+,2', f'{self.bank.pk},O-,3', f'{self.bank.pk},A+,8']
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.upload('blood_bank_id,blood_group,units_available\n' + '\n'.join(rows) + '\n')
+        self.assertRedirects(response, '/inventory/', fetch_redirect_response=False)
+        levels = dict(BloodInventory.objects.values_list('blood_group', 'units_available'))
+        self.assertEqual(levels, {'A+': Decimal('8'), 'B+': Decimal('2'), 'O-': Decimal('3')})
+        self.assertEqual(ledger_mismatches(), [])
+        # A+ appears twice: only the last level counts
+        self.assertEqual(InventoryTransaction.objects.filter(note='Partner feed').count(), 2)
+        self.assertEqual(get_dashboard_stats()['inventory_units']['O-'], Decimal('3'))
+        snapshots = InventorySnapshot.objects.filter(blood_group='A+').values_list('period', 'units', 'max_units')
+        self.assertEqual(sorted(snapshots), [('day', 8, 8), ('month', 8, 8), ('week', 8, 8)])
+
+    def test_invalid_rows_roll_back_the_whole_file(self):
+        content = 'blood_bank_id,blood_group,units_available\n' + f'{self.bank.pk},A+,1\n' * 3 + f'{self.bank.pk},Q+,1\n{self.bank.pk},A+,-1\n999,A+,1\n'
+        with self.assertRaises(InventoryImportError) as raised:
+            import_inventory(StringIO(content), chunk_size=2)
+        self.assertEqual(len(raised.exception.errors), 3)
+        self.assertIn("Line 5: invalid blood_group 'Q+'", raised.exception.errors)
+        self.assertEqual(BloodInventory.objects.get(blood_group='A+').units_available, 5)
+
+        response = self.upload('blood_bank_id,units\n1,2\n')
+        self.assertContains(response, 'Missing column(s): blood_group, units_available')
+
+    def test_donation_export(self):
+        response = self.client.get('/admin/donations/export/')
+        self.assertEqual(b''.join(response.streaming_content).decode().splitlines()[0],
+                         'id,donor_id,donor,blood_group,blood_bank_id,blood_bank,donation_date,units,status,created_at')
+
+
+class InventoryMatrixTests(TestCase):
+    """The bank x group matrix is read once per inventory version and shared by the dashboards"""
+
+    def setUp(self):
+        cache.clear()
+        clear_inventory_matrix()
+        self.banks = [
+            BloodBank.objects.create(
+                name=name, address='Road 1', city='Dhaka', phone_number='0123456789', email=f'{name}@example.com'
+            )
+            for name in ('North', 'South')
+        ]
+        record_transaction(self.banks[0].pk, 'O-', 4, 'balance')
+        record_transaction(self.banks[1].pk, 'O-', 1, 'balance')
+        record_transaction(self.banks[1].pk, 'A+', 2, 'balance')
+
+    def test_matrix_is_rebuilt_only_after_inventory_writes(self):
+        matrix = get_inventory_matrix()
+        self.assertEqual(matrix.totals, {'A+': 2, 'O-': 5})
+        self.assertEqual(matrix.for_bank(self.banks[1].pk)['O-'], 1)
+        self.assertEqual(matrix.for_bank(self.banks[0].pk)['A+'], 0)
+        with self.assertNumQueries(0):
+            self.assertIs(get_inventory_matrix(), matrix)
+
+        record_transaction(self.banks[0].pk, 'O-', -3, 'fulfillment')
+        self.assertEqual(get_inventory_matrix().totals['O-'], 2)
+        BloodBank.objects.filter(pk=self.banks[0].pk).update(name='North Wing')
+        self.assertEqual(get_inventory_matrix().rows[0].blood_bank_name, 'North')
+        self.banks[1].save()
+        self.assertEqual(get_inventory_matrix().rows[0].blood_bank_name, 'North Wing')
+
+    def test_inventory_list_is_in_bank_name_order(self):
+        self.banks[0].name = 'Zeta'
+        self.banks[0].save()
+        self.client.force_login(User.objects.create_user(username='viewer', email='viewer@example.com'))
+        rows = self.client.get('/inventory/').context['inventory']
+        self.assertEqual([(row.blood_bank_name, row.blood_group) for row in rows],
+                         [('South', 'A+'), ('South', 'O-'), ('Zeta', 'O-')])
+
+    def test_matrix_is_rebuilt_once_too_old(self):
+        matrix = get_inventory_matrix()
+        # A write that skipped the version bump
+        BloodInventory.objects.filter(blood_bank=self.banks[0]).update(units_available=9)
+        self.assertIs(get_inventory_matrix(), matrix)
+        with override_settings(INVENTORY_MATRIX_MAX_AGE=0):
+            self.assertEqual(get_inventory_matrix().totals['O-'], 10)
+
+    def test_dashboards_read_the_matrix(self):
+        donor = User.objects.create_user(
+            username='donor', email='donor@example.com', password='donor123', user_type='donor'
+        )
+        DonorProfile.objects.create(
+            user=donor, blood_group='O+', date_of_birth=date(1990, 1, 1), gender='male',
+            address='12 Green Road', city='Dhaka'
+        )
+        self.client.force_login(donor)
+        response = self.client.get('/donors/dashboard/')
+        self.assertEqual(response.context['blood_inventory'], [
+            {'blood_group': 'A+', 'units_available': 2}, {'blood_group': 'O-', 'units_available': 5},
+        ])
+        response = self.client.get('/inventory/')
+        self.assertEqual([(row.blood_bank_name, row.blood_group) for row in response.context['inventory']],
+                         [('North', 'O-'), ('South', 'A+'), ('South', 'O-')])
+
+
+class BulkDonationApprovalTests(TestCase):
+    """Selected donations are approved or rejected together in one request"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='admin123', user_type='admin'
+        )
+        self.bank = BloodBank.objects.create(
+            name='Central Blood Bank', address='Shahbagh', city='Dhaka',
+            phone_number='0123456789', email='central@example.com'
+        )
+        self.client.force_login(self.admin)
+
+    def make_donations(self, donors, per_donor=1):
+        today = date.today()
+        profiles = []
+        for i in range(donors):
+            user = User.objects.create_user(username=f'donor{i}', email=f'donor{i}@example.com', user_type='donor')
+            profiles.append(DonorProfile.objects.create(
+                user=user, blood_group=('O+', 'A-')[i % 2], date_of_birth=date(1990, 1, 1), gender='male',
+                address='12 Green Road', city='Dhaka', last_donation_date=today - timedelta(days=200),
+            ))
+        return [
+            DonationHistory.objects.create(
+                donor=profile, blood_bank=self.bank, donation_date=today - timedelta(days=n), units=Decimal('0.45')
+            )
+            for profile in profiles for n in range(per_donor)
+        ]
+
+    def test_bulk_approval_is_one_request_with_bounded_queries(self):
+        donations = self.make_donations(500)
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/admin/donations/bulk/', {
+                'action': 'approve', 'donations': [donation.pk for donation in donations],
+            })
+        self.assertRedirects(response, '/admin/donations/pending/', fetch_redirect_response=False)
+        # Batched inserts and updates: about a hundred queries where one at a time took thousands
+        self.assertLess(len(queries), 120)
+        self.assertEqual(DonationHistory.objects.filter(status='approved', approved_by=self.admin).count(), 500)
+        self.assertEqual(BloodInventory.objects.get(blood_bank=self.bank, blood_group='O+').units_available, Decimal('112.50'))
+        self.assertEqual(BloodUnit.objects.filter(status='available').count(), 500)
+        self.assertEqual(ledger_mismatches(), [])
+        self.assertEqual(rebuild_stats(), {})
+        self.assertEqual(recompute_donation_counters(), 0)
+        donor = donations[0].donor
+        donor.refresh_from_db()
+        self.assertEqual((donor.last_donation_date, donor.donation_count), (date.today(), 1))
+        self.assertEqual(donor.next_eligible_date, date.today() + timedelta(days=56))
+        self.assertEqual(OutboxMessage.objects.filter(subject='Donation Approved').count(), 500)
+
+    def test_latest_donation_date_wins_and_counted_rows_are_skipped(self):
+        donations = self.make_donations(2, per_donor=3)
+        approve_donations([donations[1].pk], self.admin)
+        approved = approve_donations([donation.pk for donation in donations], self.admin)
+        self.assertEqual(len(approved), 5)
+        donor = DonorProfile.objects.get(pk=donations[0].donor_id)
+        self.assertEqual((donor.last_donation_date, donor.donation_count), (date.today(), 3))
+        self.assertEqual(donor.approved_units, Decimal('1.35'))
+        self.assertEqual(InventoryTransaction.objects.filter(reason='donation').count(), 6)
+        self.assertEqual(recompute_donation_counters(), 0)
+
+    def test_bulk_rejection_only_touches_pending_donations(self):
+        donations = self.make_donations(3)
+        approve_donations([donations[0].pk], self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/admin/donations/bulk/', {
+                'action': 'reject', 'notes': 'Low haemoglobin', 'donations': [donation.pk for donation in donations],
+            })
+        statuses = dict(DonationHistory.objects.values_list('pk', 'status'))
+        self.assertEqual([statuses[donation.pk] for donation in donations], ['approved', 'rejected', 'rejected'])
+        self.assertEqual(DonationHistory.objects.filter(notes='Low haemoglobin').count(), 2)
+        self.assertEqual(rebuild_stats(), {})
+        rejections = OutboxMessage.objects.filter(subject='Donation Rejected')
+        self.assertEqual(rejections.count(), 2)
+        self.assertIn('Low haemoglobin', rejections.first().body)
+
+
+class LiveEventsTests(TestCase):
+    """Committed request and inventory changes are pushed to server-sent event streams"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='admin123', user_type='admin'
+        )
+        self.bank = BloodBank.objects.create(
+            name='Central Blood Bank', address='Shahbagh', city='Dhaka',
+            phone_number='0123456789', email='central@example.com'
+        )
+
+    def committed(self, write):
+        """Run a write in a thread-sensitive sync call with its on_commit callbacks"""
+        def run():
+            with self.captureOnCommitCallbacks(execute=True):
+                write()
+        return sync_to_async(run)()
+
+    async def test_stream_pushes_inventory_changes(self):
+        await self.async_client.aforce_login(self.admin)
+        response = await self.async_client.get('/admin/events/?channels=inventory')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b'retry: 5000\n\n')
+
+        await self.committed(lambda: record_transaction(self.bank.pk, 'O+', Decimal('2.50'), 'adjustment'))
+        frame = await asyncio.wait_for(anext(stream), timeout=1)
+        self.assertEqual(
+            frame, f'event: inventory\ndata: {{"blood_bank_id": {self.bank.pk}, "blood_group": "O+", "change": "2.50"}}\n\n'.encode()
+        )
+
+    async def test_request_changes_reach_subscribers_after_commit(self):
+        with broker.subscribe(['requests']) as subscription:
+            def create_request():
+                BloodRequest.objects.create(
+                    requester=self.admin, patient_name='Patient', blood_group='A+', units_required=1,
+                    hospital_name='DMCH', hospital_address='Dhaka', city='Dhaka', contact_number='0123',
+                    reason='Surgery', required_by_date=date.today()
+                )
+            await self.committed(create_request)
+            channel, payload = await asyncio.wait_for(subscription.get(), timeout=1)
+        self.assertEqual((channel, payload['status'], payload['created']), ('requests', 'pending', True))
+
+    async def test_closed_streams_unsubscribe_and_slow_ones_drop_oldest(self):
+        stream = event_stream(['requests'], heartbeat=0.01)
+        await anext(stream)
+        self.assertEqual(broker.subscriber_count, 1)
+        self.assertEqual(await anext(stream), ': keep-alive\n\n')
+        await stream.aclose()
+        self.assertEqual(broker.subscriber_count, 0)
+
+        with broker.subscribe(['inventory'], maxsize=2) as subscription:
+            for change in range(3):
+                broker.publish('inventory', change)
+            await asyncio.sleep(0)
+            self.assertEqual([await subscription.get(), await subscription.get()], [('inventory', 1), ('inventory', 2)])
+            self.assertEqual(subscription.dropped, 1)
+
+    def test_donors_are_turned_away(self):
+        donor = User.objects.create_user(username='donor', password='donor123', user_type='donor')
+        self.client.force_login(donor)
+        self.assertRedirects(self.client.get('/admin/events/'), '/', fetch_redirect_response=False)
+
+    def test_wsgi_requests_are_told_not_to_reconnect(self):
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get('/admin/events/').status_code, 204)
+
+
+class ExpirySweepTests(TestCase):
+    """Overdue pending requests and stale pending donations are expired in resumable batches"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='admin123', user_type='admin'
+        )
+        donor = User.objects.create_user(
+            username='donor', email='donor@example.com', password='donor123', user_type='donor'
+        )
+        self.profile = DonorProfile.objects.create(
+            user=donor, blood_group='O+', date_of_birth=date(1990, 1, 1), gender='male',
+            address='12 Green Road', city='Dhaka'
+        )
+        today = date.today()
+        self.overdue = [self.make_request(today - timedelta(days=days)) for days in (3, 2, 1)]
+        self.due_today = self.make_request(today)
+        self.approved = self.make_request(today - timedelta(days=5), status='approved')
+        self.stale = DonationHistory.objects.create(
+            donor=self.profile, donation_date=today - timedelta(days=36), units=1
+        )
+        self.fresh = DonationHistory.objects.create(
+            donor=self.profile, donation_date=today - timedelta(days=35), units=1
+        )
+
+    def make_request(self, required_by_date, status='pending'):
+        return BloodRequest.objects.create(
+            requester=self.admin, patient_name='Patient', blood_group='A+', units_required=1,
+            hospital_name='DMCH', hospital_address='Dhaka', city='Dhaka', contact_number='0123',
+            reason='Surgery', required_by_date=required_by_date, status=status,
+        )
+
+    def statuses(self, model, rows):
+        stored = dict(model.objects.values_list('pk', 'status'))
+        return [stored[row.pk] for row in rows]
+
+    def test_sweep_is_batched_resumable_and_idempotent(self):
+        self.assertEqual(expire_overdue_requests(batch_size=2, max_batches=1), 2)
+        self.assertEqual(self.statuses(BloodRequest, self.overdue), ['expired', 'expired', 'pending'])
+        out = StringIO()
+        call_command('expire_stale_records', '--batch-size', '2', stdout=out)
+        self.assertIn('Expired 1 blood requests and 1 donations', out.getvalue())
+        self.assertEqual(
+            self.statuses(BloodRequest, self.overdue + [self.due_today, self.approved]),
+            ['expired'] * 3 + ['pending', 'approved'],
+        )
+        self.assertEqual(self.statuses(DonationHistory, [self.stale, self.fresh]), ['expired', 'pending'])
+        self.assertEqual(rebuild_stats(), {})
+        self.assertEqual((expire_overdue_requests(), expire_stale_donations()), (0, 0))
+
+    def test_expired_donations_cannot_be_approved(self):
+        expire_stale_donations()
+        self.assertEqual(approve_donations([self.stale.pk], self.admin), [])
+        self.client.force_login(self.admin)
+        self.client.post(f'/admin/donations/{self.stale.pk}/approve/')
+        self.stale.refresh_from_db()
+        self.assertEqual(self.stale.status, 'expired')
+        self.assertFalse(BloodUnit.objects.exists())
+
+    def test_sweep_reads_the_overdue_indexes(self):
+        today = date.today()
+        queries = [
+            BloodRequest.objects.filter(status='pending', required_by_date__lt=today).order_by('required_by_date', 'id'),
+            DonationHistory.objects.filter(status='pending', donation_date__lt=today).order_by('donation_date', 'id'),
+        ]
+        for queryset in queries:
+            sql, params = queryset.values_list('pk', flat=True)[:500].query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                plan = ' '.join(row[3] for row in cursor.fetchall())
+            self.assertIn('_overdue_idx', plan)
+            self.assertNotIn('TEMP B-TREE', plan)
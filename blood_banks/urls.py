@@ -4,6 +4,8 @@ from . import views
 urlpatterns = [
     # Admin dashboard
     path('admin/dashboard/', views.admin_dashboard, name='admin_dashboard'),
+    path('admin/cache-stats/', views.fragment_cache_stats, name='fragment_cache_stats'),
+    path('admin/events/', views.live_events, name='live_events'),
     
     # Blood banks
     path('blood-banks/', views.blood_bank_list, name='blood_bank_list'),
@@ -14,6 +16,9 @@ urlpatterns = [
     # Blood inventory
     path('inventory/', views.blood_inventory_list, name='blood_inventory_list'),
     path('inventory/create/', views.blood_inventory_create, name='blood_inventory_create'),
+    path('inventory/export/', views.blood_inventory_export, name='blood_inventory_export'),
+    path('inventory/import/', views.blood_inventory_import, name='blood_inventory_import'),
+    path('inventory/trends/', views.inventory_trends, name='inventory_trends'),
     path('inventory/<int:pk>/update/', views.blood_inventory_update, name='blood_inventory_update'),
     
     # Donors management (Admin)
@@ -21,6 +26,8 @@ urlpatterns = [
     
     # Donation approvals
     path('admin/donations/pending/', views.donation_approval_list, name='donation_approval_list'),
+    path('admin/donations/export/', views.donation_export, name='donation_export'),
+    path('admin/donations/bulk/', views.donation_bulk_action, name='donation_bulk_action'),
     path('admin/donations/<int:pk>/approve/', views.donation_approve, name='donation_approve'),
     path('admin/donations/<int:pk>/reject/', views.donation_reject, name='donation_reject'),
 ]
@@ -1,12 +1,33 @@
+import io
+from datetime import timedelta
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Sum, Count, Q
-from .models import BloodBank, BloodInventory
-from .forms import BloodBankForm, BloodInventoryForm
+from django.db import transaction
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+from .models import BloodBank, BloodInventory, InventorySnapshot, InventoryTransaction
+from .forecasting import cover_threshold_days, projected_shortages
+from .snapshots import inventory_trend
+from .stats import get_dashboard_stats
+from .forms import BloodBankForm, BloodInventoryForm, InventoryAdjustmentForm, InventoryImportForm
+from .inventory_import import InventoryImportError, import_inventory
+from .inventory_matrix import get_inventory_matrix
+from .approvals import approve_donations, reject_donations
+from .ledger import AlreadyRecorded, InsufficientInventory, adjust_inventory, credit_donation, record_transaction
 from donors.models import DonorProfile, DonationHistory
 from blood_requests.models import BloodRequest
 from accounts.models import User
+from blood_management.csv_export import stream_csv
+from blood_management.events import event_stream
+from blood_management.fragment_cache import fragment_stats, reset_fragment_stats
+from blood_management.geo import parse_point, parse_radius, within_radius
+from blood_management.pagination import paginate
+from notifications.outbox import queue_email
 
 
 @login_required
@@ -16,17 +37,20 @@ def admin_dashboard(request):
         messages.error(request, 'Access denied. Admins only.')
         return redirect('home')
     
-    # Get statistics
-    total_donors = DonorProfile.objects.count()
-    available_donors = DonorProfile.objects.filter(is_available=True).count()
-    total_blood_banks = BloodBank.objects.filter(is_active=True).count()
-    pending_requests = BloodRequest.objects.filter(status='pending').count()
-    pending_donations = DonationHistory.objects.filter(status='pending').count()
-    
-    # Blood inventory by group
-    blood_inventory = BloodInventory.objects.values('blood_group').annotate(
-        total_units=Sum('units_available')
-    ).order_by('blood_group')
+    # Counters maintained on every write (see blood_banks.stats): one query instead of a scan per metric
+    stats = get_dashboard_stats()
+    donor_counts = stats['donors']
+    total_donors = int(sum(donor_counts.values()))
+    available_donors = int(sum(stats['available_donors'].values()))
+    total_blood_banks = int(stats['blood_banks'].get('active', 0))
+    pending_requests = int(stats['requests'].get('pending', 0))
+    pending_donations = int(stats['donations'].get('pending', 0))
+    
+    # Blood inventory by group, from this process's cached matrix
+    blood_inventory = [
+        {'blood_group': blood_group, 'total_units': units}
+        for blood_group, units in get_inventory_matrix().totals.items()
+    ]
     
     # Recent blood requests
     recent_requests = BloodRequest.objects.all().order_by('-requested_date')[:5]
@@ -35,9 +59,13 @@ def admin_dashboard(request):
     recent_donations = DonationHistory.objects.all().order_by('-created_at')[:5]
     
     # Donor statistics by blood group
-    donors_by_blood_group = DonorProfile.objects.values('blood_group').annotate(
-        count=Count('id')
-    ).order_by('blood_group')
+    donors_by_blood_group = [
+        {'blood_group': blood_group, 'count': int(count)}
+        for blood_group, count in sorted(donor_counts.items()) if count
+    ]
+    
+    # Stock projected to run out soon (cached; refreshed by forecast_shortages)
+    shortages = projected_shortages()
     
     context = {
         'total_donors': total_donors,
@@ -49,11 +77,51 @@ def admin_dashboard(request):
         'recent_requests': recent_requests,
         'recent_donations': recent_donations,
         'donors_by_blood_group': donors_by_blood_group,
+        'shortages': shortages,
+        'cover_threshold_days': cover_threshold_days(),
     }
     
     return render(request, 'blood_banks/admin_dashboard.html', context)
 
 
+LIVE_CHANNELS = ('requests', 'inventory')
+
+
+@login_required
+async def live_events(request):
+    """Server-sent events with live request and inventory changes (Admin only)"""
+    user = await request.auser()
+    if user.user_type != 'admin':
+        messages.error(request, 'Access denied. Admins only.')
+        return redirect('home')
+    
+    if not isinstance(request, ASGIRequest):
+        # A WSGI server would buffer the endless stream; 204 tells the browser not to reconnect
+        return HttpResponse(status=204)
+    
+    requested = request.GET.get('channels', ','.join(LIVE_CHANNELS)).split(',')
+    channels = [channel for channel in LIVE_CHANNELS if channel in requested]
+    response = StreamingHttpResponse(
+        event_stream(channels, getattr(settings, 'LIVE_EVENTS_HEARTBEAT', 15)), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Tell nginx not to buffer the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@login_required
+def fragment_cache_stats(request):
+    """Template fragment cache hit/miss counts (Admin only); POST resets them"""
+    if request.user.user_type != 'admin':
+        return JsonResponse({'error': 'Admins only.'}, status=403)
+    
+    if request.method == 'POST':
+        reset_fragment_stats()
+    
+    return JsonResponse({'fragments': fragment_stats()})
+
+
 @login_required
 def blood_bank_list(request):
     """List all blood banks"""
@@ -64,7 +132,18 @@ def blood_bank_list(request):
         # Show all blood banks to admin
         blood_banks = BloodBank.objects.all()
     
-    return render(request, 'blood_banks/blood_bank_list.html', {'blood_banks': blood_banks})
+    # Nearest blood banks first when a location is given, e.g. ?near=23.81,90.41&radius_km=25
+    near = request.GET.get('near', '')
+    point = parse_point(near)
+    ordering = ('name', 'id')
+    if point:
+        radius_km = parse_radius(request.GET.get('radius_km'))
+        blood_banks = within_radius(blood_banks, point[0], point[1], radius_km)
+        ordering = ('distance_km', 'id')
+    
+    page_obj = paginate(request, blood_banks, ordering)
+    
+    return render(request, 'blood_banks/blood_bank_list.html', {'blood_banks': page_obj, 'page_obj': page_obj, 'near': near})
 
 
 @login_required
@@ -127,9 +206,91 @@ def blood_bank_delete(request, pk):
 @login_required
 def blood_inventory_list(request):
     """List blood inventory"""
-    inventory = BloodInventory.objects.all().order_by('blood_bank', 'blood_group')
+    # Evaluated only when the cached table fragment has to be re-rendered; the
+    # rows come from the in-memory matrix, already in (bank name, group) order
+    page_obj = SimpleLazyObject(
+        lambda: paginate(request, get_inventory_matrix().rows, ('blood_bank_name', 'blood_bank_id', 'blood_group'))
+    )
+    
+    return render(request, 'blood_banks/inventory_list.html', {'inventory': page_obj, 'page_obj': page_obj})
+
+
+@login_required
+def blood_inventory_export(request):
+    """Download the whole inventory as CSV (Admin only)"""
+    if request.user.user_type != 'admin':
+        messages.error(request, 'Access denied. Admins only.')
+        return redirect('home')
+    
+    rows = BloodInventory.objects.values_list(
+        'blood_bank_id', 'blood_bank__name', 'blood_group', 'units_available', 'last_updated'
+    ).order_by('blood_bank_id', 'blood_group')
+    header = ['blood_bank_id', 'blood_bank', 'blood_group', 'units_available', 'last_updated']
+    return stream_csv('inventory.csv', header, rows)
+
+
+@login_required
+def blood_inventory_import(request):
+    """Set inventory levels from an uploaded CSV file (Admin only)"""
+    if request.user.user_type != 'admin':
+        messages.error(request, 'Access denied. Admins only.')
+        return redirect('home')
+    
+    errors = []
+    if request.method == 'POST':
+        form = InventoryImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            csv_file = io.TextIOWrapper(form.cleaned_data['file'].file, encoding='utf-8-sig', newline='')
+            try:
+                result = import_inventory(csv_file, user=request.user, note=form.cleaned_data['note'] or 'CSV import')
+            except InventoryImportError as e:
+                errors = e.errors
+            except UnicodeDecodeError:
+                errors = ['The file is not UTF-8 encoded CSV.']
+            else:
+                messages.success(
+                    request,
+                    f'Imported {result.rows} rows: {result.created} created, {result.updated} updated, '
+                    f'{result.unchanged} unchanged.'
+                )
+                return redirect('blood_inventory_list')
+    else:
+        form = InventoryImportForm()
     
-    return render(request, 'blood_banks/inventory_list.html', {'inventory': inventory})
+    return render(request, 'blood_banks/inventory_import.html', {'form': form, 'errors': errors})
+
+
+@login_required
+def inventory_trends(request):
+    """Inventory levels over time from the pre-aggregated snapshots (Admin only)"""
+    if request.user.user_type != 'admin':
+        messages.error(request, 'Access denied. Admins only.')
+        return redirect('home')
+    
+    period = request.GET.get('period', 'week')
+    if period not in dict(InventorySnapshot.PERIOD_CHOICES):
+        period = 'week'
+    # Roughly the last 30 days, 26 weeks or 24 months
+    lookback = {'day': 30, 'week': 26 * 7, 'month': 730}[period]
+    since = timezone.localdate() - timedelta(days=lookback)
+    
+    # Pivot to one row per period with the closing units of each blood group
+    blood_groups = [group for group, _ in BloodInventory.BLOOD_GROUP_CHOICES]
+    rows = {}
+    for point in inventory_trend(period, since=since):
+        rows.setdefault(point['period_start'], {})[point['blood_group']] = point['units']
+    trend = [
+        {'period_start': start, 'units': [levels.get(group) for group in blood_groups]}
+        for start, levels in sorted(rows.items())
+    ]
+    
+    context = {
+        'trend': trend,
+        'blood_groups': blood_groups,
+        'period': period,
+        'periods': InventorySnapshot.PERIOD_CHOICES,
+    }
+    return render(request, 'blood_banks/inventory_trends.html', context)
 
 
 @login_required
@@ -142,7 +303,11 @@ def blood_inventory_create(request):
     if request.method == 'POST':
         form = BloodInventoryForm(request.POST)
         if form.is_valid():
-            form.save()
+            # The row is created by the ledger entry for its opening units
+            record_transaction(
+                form.cleaned_data['blood_bank'].pk, form.cleaned_data['blood_group'],
+                form.cleaned_data['units_available'], 'balance', user=request.user, note='Opening balance',
+            )
             messages.success(request, 'Blood inventory added successfully!')
             return redirect('blood_inventory_list')
     else:
@@ -158,18 +323,32 @@ def blood_inventory_update(request, pk):
         messages.error(request, 'Access denied. Admins only.')
         return redirect('home')
     
-    inventory = get_object_or_404(BloodInventory, pk=pk)
+    inventory = get_object_or_404(BloodInventory.objects.select_related('blood_bank'), pk=pk)
     
     if request.method == 'POST':
-        form = BloodInventoryForm(request.POST, instance=inventory)
+        form = InventoryAdjustmentForm(request.POST)
         if form.is_valid():
-            form.save()
-            messages.success(request, 'Blood inventory updated successfully!')
-            return redirect('blood_inventory_list')
+            if form.change:
+                try:
+                    adjust_inventory(inventory, form.change, user=request.user, note=form.cleaned_data['note'])
+                except InsufficientInventory:
+                    form.add_error(None, 'Units were taken out of this inventory in the meantime; please review the current value.')
+            if not form.errors:
+                messages.success(request, 'Blood inventory updated successfully!')
+                return redirect('blood_inventory_list')
     else:
-        form = BloodInventoryForm(instance=inventory)
-    
-    return render(request, 'blood_banks/inventory_form.html', {'form': form, 'action': 'Update'})
+        form = InventoryAdjustmentForm(initial={
+            'units_available': inventory.units_available,
+            'original_units': inventory.units_available,
+        })
+    
+    transactions = InventoryTransaction.objects.filter(
+        blood_bank_id=inventory.blood_bank_id, blood_group=inventory.blood_group
+    ).select_related('created_by')[:10]
+    
+    return render(request, 'blood_banks/inventory_form.html', {
+        'form': form, 'action': 'Update', 'inventory': inventory, 'transactions': transactions,
+    })
 
 
 @login_required
@@ -179,7 +358,7 @@ def donors_list(request):
         messages.error(request, 'Access denied. Admins only.')
         return redirect('home')
     
-    donors = DonorProfile.objects.all().order_by('-created_at')
+    donors = DonorProfile.objects.select_related('user')
     
     # Filter by blood group and availability
     blood_group = request.GET.get('blood_group', '')
@@ -191,13 +370,23 @@ def donors_list(request):
     if is_available:
         donors = donors.filter(is_available=(is_available == 'true'))
     
+    # Donors past their deferral window (range scan on next_eligible_date)
+    eligible = request.GET.get('eligible', '')
+    if eligible == 'true':
+        donors = donors.filter(next_eligible_date__lte=timezone.localdate())
+    elif eligible == 'false':
+        donors = donors.filter(next_eligible_date__gt=timezone.localdate())
+    
     blood_groups = DonorProfile.BLOOD_GROUP_CHOICES
+    page_obj = paginate(request, donors, ('-created_at', '-id'))
     
     context = {
-        'donors': donors,
+        'donors': page_obj,
+        'page_obj': page_obj,
         'blood_groups': blood_groups,
         'selected_blood_group': blood_group,
         'selected_is_available': is_available,
+        'selected_eligible': eligible,
     }
     
     return render(request, 'blood_banks/donors_list.html', context)
@@ -210,9 +399,58 @@ def donation_approval_list(request):
         messages.error(request, 'Access denied. Admins only.')
         return redirect('home')
     
-    donations = DonationHistory.objects.filter(status='pending').order_by('-created_at')
+    donations = DonationHistory.objects.filter(status='pending').select_related('donor__user', 'blood_bank')
+    page_obj = paginate(request, donations, ('-created_at', '-id'))
     
-    return render(request, 'blood_banks/donation_approval_list.html', {'donations': donations})
+    return render(request, 'blood_banks/donation_approval_list.html', {'donations': page_obj, 'page_obj': page_obj})
+
+
+@login_required
+def donation_export(request):
+    """Download all donation records as CSV (Admin only)"""
+    if request.user.user_type != 'admin':
+        messages.error(request, 'Access denied. Admins only.')
+        return redirect('home')
+    
+    rows = DonationHistory.objects.values_list(
+        'id', 'donor_id', 'donor__user__username', 'donor__blood_group', 'blood_bank_id', 'blood_bank__name',
+        'donation_date', 'units', 'status', 'created_at',
+    ).order_by('id')
+    header = [
+        'id', 'donor_id', 'donor', 'blood_group', 'blood_bank_id', 'blood_bank',
+        'donation_date', 'units', 'status', 'created_at',
+    ]
+    return stream_csv('donations.csv', header, rows)
+
+
+@login_required
+def donation_bulk_action(request):
+    """Approve or reject the selected pending donations in one go (Admin only)"""
+    if request.user.user_type != 'admin':
+        messages.error(request, 'Access denied. Admins only.')
+        return redirect('home')
+    
+    if request.method != 'POST':
+        return redirect('donation_approval_list')
+    
+    ids = [pk for pk in request.POST.getlist('donations') if pk.isdigit()]
+    action = request.POST.get('action')
+    if not ids or action not in ('approve', 'reject'):
+        messages.error(request, 'Select at least one donation and an action.')
+        return redirect('donation_approval_list')
+    
+    if action == 'approve':
+        try:
+            donations = approve_donations(ids, request.user)
+        except AlreadyRecorded:
+            messages.error(request, 'Some of these donations were already approved. Nothing was changed.')
+            return redirect('donation_approval_list')
+        messages.success(request, f'{len(donations)} donation(s) approved.')
+    else:
+        donations = reject_donations(ids, request.user, notes=request.POST.get('notes', ''))
+        messages.success(request, f'{len(donations)} donation(s) rejected.')
+    
+    return redirect('donation_approval_list')
 
 
 @login_required
@@ -225,30 +463,41 @@ def donation_approve(request, pk):
     donation = get_object_or_404(DonationHistory, pk=pk)
     
     if request.method == 'POST':
-        donation.status = 'approved'
-        donation.approved_by = request.user
-        donation.save()
+        if donation.status in DonationHistory.COUNTED_STATUSES:
+            messages.info(request, 'This donation has already been approved.')
+            return redirect('donation_approval_list')
+        if donation.status == 'expired':
+            messages.error(request, 'This donation expired before it was approved.')
+            return redirect('donation_approval_list')
         
-        # Update donor's last donation date
-        donation.donor.last_donation_date = donation.donation_date
-        donation.donor.save()
+        try:
+            with transaction.atomic():
+                donation.status = 'approved'
+                donation.approved_by = request.user
+                donation.save()
+                
+                # Add the units to the blood bank's stock in the same transaction
+                if donation.blood_bank_id:
+                    credit_donation(donation, user=request.user)
+                
+                # Update donor's last donation date (this also moves next_eligible_date)
+                donor = donation.donor
+                if not donor.last_donation_date or donation.donation_date > donor.last_donation_date:
+                    donor.last_donation_date = donation.donation_date
+                    donor.save()
+                
+                # Notify the donor (sent by send_outbox)
+                queue_email(
+                    'Donation Approved',
+                    f'Your donation on {donation.donation_date} has been approved.',
+                    donor.user.email,
+                )
+        except AlreadyRecorded:
+            messages.info(request, 'This donation has already been approved.')
+            return redirect('donation_approval_list')
         
         messages.success(request, 'Donation approved successfully!')
         
-        # Send email notification (bonus feature)
-        try:
-            from django.core.mail import send_mail
-            from django.conf import settings
-            send_mail(
-                'Donation Approved',
-                f'Your donation on {donation.donation_date} has been approved.',
-                settings.DEFAULT_FROM_EMAIL if hasattr(settings, 'DEFAULT_FROM_EMAIL') else 'noreply@bloodbank.com',
-                [donation.donor.user.email],
-                fail_silently=True,
-            )
-        except:
-            pass
-        
         return redirect('donation_approval_list')
     
     return render(request, 'blood_banks/donation_approve.html', {'donation': donation})
@@ -264,26 +513,23 @@ def donation_reject(request, pk):
     donation = get_object_or_404(DonationHistory, pk=pk)
     
     if request.method == 'POST':
+        # Approved donations are already in stock; only pending ones can be turned down
+        if donation.status != 'pending':
+            messages.error(request, f'Only pending donations can be rejected; this one is {donation.get_status_display().lower()}.')
+            return redirect('donation_approval_list')
         donation.status = 'rejected'
         donation.approved_by = request.user
         donation.notes = request.POST.get('notes', '')
-        donation.save()
-        
-        messages.success(request, 'Donation rejected.')
-        
-        # Send email notification (bonus feature)
-        try:
-            from django.core.mail import send_mail
-            from django.conf import settings
-            send_mail(
+        with transaction.atomic():
+            donation.save()
+            # Notify the donor (sent by send_outbox)
+            queue_email(
                 'Donation Rejected',
                 f'Your donation on {donation.donation_date} has been rejected. Reason: {donation.notes}',
-                settings.DEFAULT_FROM_EMAIL if hasattr(settings, 'DEFAULT_FROM_EMAIL') else 'noreply@bloodbank.com',
-                [donation.donor.user.email],
-                fail_silently=True,
+                donation.donor.user.email,
             )
-        except:
-            pass
+        
+        messages.success(request, 'Donation rejected.')
         
         return redirect('donation_approval_list')
     
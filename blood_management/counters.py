@@ -0,0 +1,21 @@
+"""
+Support for denormalized counter columns.
+
+Counter columns are only ever changed with ``F()`` expression updates (and
+once-only flags with a conditional update), so a plain ``save()`` of an
+instance loaded earlier must not write its (possibly stale) copy of them
+back over a concurrent change.
+"""
+
+
+class MaintainedCountersMixin:
+    """Leave ``counter_fields`` out of every save of an existing row"""
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
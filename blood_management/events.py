@@ -0,0 +1,115 @@
+"""
+In-process publish/subscribe for live page updates.
+
+Writers call ``publish_on_commit`` with a channel name ("requests",
+"inventory") and a JSON-serializable payload. Once the transaction commits,
+the event is handed to every subscriber of that channel in this process.
+The server-sent events endpoint holds one ``Subscription`` per connected
+browser: a bounded ``asyncio.Queue`` on the server's event loop that the
+connection awaits. An idle client therefore costs a queue and a suspended
+coroutine, not a thread or a polling query.
+
+Publishing is thread-safe: sync views and ``on_commit`` callbacks run in
+worker threads and hand events to the loop with ``call_soon_threadsafe``.
+The broker is local to one process, so with several ASGI workers each
+browser only hears about writes made by the worker it is connected to
+(management commands run in their own process and are not heard at all).
+"""
+import asyncio
+import json
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+
+
+# Events a slow client may fall behind by before the oldest are dropped
+QUEUE_SIZE = 100
+
+
+class Subscription:
+    """One listener's queue of ``(channel, payload)`` events"""
+
+    def __init__(self, channels, loop, maxsize=QUEUE_SIZE):
+        self.channels = frozenset(channels)
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def _put(self, event):
+        # Runs on the subscriber's loop
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    def deliver(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The loop was closed under a connection that never unsubscribed
+            pass
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class Broker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+
+    @contextmanager
+    def subscribe(self, channels, maxsize=QUEUE_SIZE):
+        """Listen on ``channels`` from the running event loop until the block exits"""
+        subscription = Subscription(channels, asyncio.get_running_loop(), maxsize)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        try:
+            yield subscription
+        finally:
+            with self._lock:
+                self._subscriptions.discard(subscription)
+
+    def publish(self, channel, payload):
+        """Hand an event to every current subscriber of ``channel``; returns how many"""
+        with self._lock:
+            listeners = [s for s in self._subscriptions if channel in s.channels]
+        for subscription in listeners:
+            subscription.deliver((channel, payload))
+        return len(listeners)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscriptions)
+
+
+broker = Broker()
+
+
+def publish_on_commit(channel, payload):
+    """Publish once the surrounding transaction commits (immediately outside one)"""
+    transaction.on_commit(lambda: broker.publish(channel, payload))
+
+
+def format_event(channel, payload):
+    """One server-sent event frame"""
+    return f'event: {channel}\ndata: {json.dumps(payload, default=str)}\n\n'
+
+
+async def event_stream(channels, heartbeat):
+    """
+    Server-sent event frames for ``channels`` until the client disconnects
+    (the server then closes this generator, which unsubscribes it). A
+    comment line every ``heartbeat`` seconds keeps proxies from timing out
+    an idle connection.
+    """
+    with broker.subscribe(channels) as subscription:
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                channel, payload = await asyncio.wait_for(subscription.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            yield format_event(channel, payload)
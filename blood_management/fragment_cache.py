@@ -0,0 +1,154 @@
+"""
+Versioned template fragment caching.
+
+Every tracked model has a version counter in the cache that is bumped on
+``post_save`` and ``post_delete``. A fragment's cache key contains the
+current versions of the models it is rendered from, so a cached fragment
+stays valid exactly until one of those models changes; superseded entries
+are never read again and simply age out. Writes that bypass signals
+(``QuerySet.update()``, ``bulk_create``) must call ``bump_version``.
+
+Versions and hit/miss statistics live in the default cache, which the
+settings make shared between processes (a cache directory, or Redis).
+A version is a fresh random token rather than a counter: backends such as
+the file cache increment by read and write, and two racing increments could
+otherwise bring a version back to a value an older fragment was built with.
+"""
+import hashlib
+import uuid
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+
+VERSION_KEY = 'fragment-version:{label}'
+FRAGMENT_KEY = 'fragment:{name}:{digest}'
+STATS_KEY = 'fragment-stats:{name}:{outcome}'
+NAMES_KEY = 'fragment-stats:names'
+
+_tracked = set()
+
+
+def fragment_timeout():
+    """Seconds a rendered fragment is kept; versioning makes expiry a memory bound only"""
+    return getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def _label(model):
+    if isinstance(model, str):
+        model = apps.get_model(model)
+    return model._meta.label_lower
+
+
+def _new_version():
+    # Never reused, so neither an evicted nor a raced version can come back
+    # at a value an older cached fragment was built with
+    return uuid.uuid4().hex
+
+
+def bump_version(model):
+    """Invalidate every fragment rendered from ``model``"""
+    cache.set(VERSION_KEY.format(label=_label(model)), _new_version(), timeout=None)
+
+
+def bump_after_write(*models):
+    """Bump now and again after commit, as the signals do, for bulk writes"""
+    for model in models:
+        bump_version(model)
+        # Bump again once the change is visible to other connections: a fragment
+        # rendered concurrently from the pre-commit data must not outlive it.
+        transaction.on_commit(lambda model=model: bump_version(model))
+
+
+def _bump_on_change(sender, raw=False, **kwargs):
+    if raw:
+        return
+    bump_after_write(sender)
+
+
+def track_models(*models):
+    """Bump the version of each model whenever one of its rows is saved or deleted"""
+    for model in models:
+        label = _label(model)
+        if label in _tracked:
+            continue
+        model_class = apps.get_model(label)
+        post_save.connect(_bump_on_change, sender=model_class, dispatch_uid=f'fragment_cache_save_{label}')
+        post_delete.connect(_bump_on_change, sender=model_class, dispatch_uid=f'fragment_cache_delete_{label}')
+        _tracked.add(label)
+
+
+def model_versions(labels):
+    """Current version of each model label, initialising missing counters"""
+    keys = {label: VERSION_KEY.format(label=label) for label in labels}
+    stored = cache.get_many(keys.values())
+    versions = []
+    for label, key in keys.items():
+        if label not in _tracked:
+            raise LookupError(f'{label} is not tracked by the fragment cache; add it with track_models()')
+        version = stored.get(key)
+        if version is None:
+            cache.add(key, _new_version(), timeout=None)
+            version = cache.get(key)
+        versions.append(f'{label}={version}')
+    return versions
+
+
+def fragment_key(name, models, vary_on=()):
+    labels = sorted(_label(model) for model in models)
+    parts = model_versions(labels) + [str(value) for value in vary_on]
+    digest = hashlib.md5(':'.join(parts).encode(), usedforsecurity=False).hexdigest()
+    return FRAGMENT_KEY.format(name=name, digest=digest)
+
+
+def _register_name(name):
+    # Only called on a miss: a hit implies the name was registered by the miss
+    # that stored the fragment, so the common path costs no extra round trip.
+    names = cache.get(NAMES_KEY, set())
+    if name not in names:
+        cache.set(NAMES_KEY, names | {name}, timeout=None)
+
+
+def _record(name, outcome):
+    key = STATS_KEY.format(name=name, outcome=outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def get_or_render(name, models, render, vary_on=()):
+    """Return the cached fragment for the current model versions, rendering it on a miss"""
+    key = fragment_key(name, models, vary_on)
+    content = cache.get(key)
+    if content is not None:
+        _record(name, 'hits')
+        return content
+    _register_name(name)
+    _record(name, 'misses')
+    content = render()
+    cache.set(key, content, fragment_timeout())
+    return content
+
+
+def fragment_stats():
+    """Hit and miss counts per fragment name, with the hit rate"""
+    names = sorted(cache.get(NAMES_KEY, set()))
+    keys = [STATS_KEY.format(name=name, outcome=outcome) for name in names for outcome in ('hits', 'misses')]
+    counts = cache.get_many(keys)
+    stats = {}
+    for name in names:
+        hits = counts.get(STATS_KEY.format(name=name, outcome='hits'), 0)
+        misses = counts.get(STATS_KEY.format(name=name, outcome='misses'), 0)
+        total = hits + misses
+        stats[name] = {'hits': hits, 'misses': misses, 'hit_rate': hits / total if total else 0.0}
+    return stats
+
+
+def reset_fragment_stats():
+    names = cache.get(NAMES_KEY, set())
+    cache.delete_many([STATS_KEY.format(name=name, outcome=outcome) for name in names for outcome in ('hits', 'misses')])
@@ -0,0 +1,185 @@
+"""
+Geohash helpers for radius searches on plain SQLite.
+
+Donors and blood banks store a geohash of their coordinates in an indexed
+column. A radius search first narrows rows to the geohash cell holding the
+centre plus its eight neighbours (a handful of index range scans) and to the
+latitude/longitude box around the circle, then computes exact great-circle
+distances only for the rows left.
+"""
+import math
+
+from django.db.models import Q
+
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9
+EARTH_RADIUS_KM = 6371.0088
+# Radius searches when no radius_km is given, and the widest allowed (every
+# candidate in the box is loaded, so wide radii cost whole regions of rows)
+DEFAULT_RADIUS_KM = 25
+MAX_RADIUS_KM = 100
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Encode a coordinate pair as a geohash string"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    geohash = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(geohash) < precision:
+        value, bounds = (longitude, lon_range) if even else (latitude, lat_range)
+        mid = (bounds[0] + bounds[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            bounds[0] = mid
+        else:
+            bounds[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(geohash)
+
+
+def cell_size_degrees(precision):
+    """Height and width in degrees of a geohash cell at the given precision"""
+    lon_bits = math.ceil(precision * 5 / 2)
+    lat_bits = math.floor(precision * 5 / 2)
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lon_bits)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def search_precision(latitude, radius_km):
+    """
+    Longest geohash prefix whose cells are at least ``radius_km`` across.
+
+    With cells that large, any point within the radius lies in the centre
+    cell or one of its eight neighbours. 0 means no prefix will do.
+    """
+    km_per_degree = math.pi * EARTH_RADIUS_KM / 180
+    # Cells are narrowest (in km) at the edge of the circle furthest from the equator
+    edge_latitude = abs(latitude) + radius_km / km_per_degree
+    if edge_latitude >= 89.0:
+        # Near a pole cells shrink to nothing and the circle may span every
+        # longitude, so no nine cells can cover it
+        return 0
+    lon_scale = math.cos(math.radians(edge_latitude))
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        lat_deg, lon_deg = cell_size_degrees(precision)
+        if min(lat_deg * km_per_degree, lon_deg * km_per_degree * lon_scale) >= radius_km:
+            return precision
+    return 0
+
+
+def covering_cells(latitude, longitude, radius_km):
+    """Geohash prefixes of the centre cell and its neighbours for a radius search"""
+    precision = search_precision(latitude, radius_km)
+    if precision == 0:
+        return []
+    lat_deg, lon_deg = cell_size_degrees(precision)
+    cells = set()
+    for d_lat in (-lat_deg, 0, lat_deg):
+        lat = latitude + d_lat
+        if not -90 <= lat <= 90:
+            continue
+        for d_lon in (-lon_deg, 0, lon_deg):
+            lon = (longitude + d_lon + 180) % 360 - 180
+            cells.add(encode_geohash(lat, lon, precision))
+    return sorted(cells)
+
+
+def geohash_prefix_filter(cells, field='geohash'):
+    """
+    Q object matching rows whose geohash starts with any of ``cells``.
+
+    Expressed as ``>= prefix AND < prefix + '~'`` ranges rather than LIKE so
+    SQLite can always use the index.
+    """
+    condition = Q()
+    for cell in cells:
+        condition |= Q(**{f'{field}__gte': cell, f'{field}__lt': cell + '~'})
+    return condition
+
+
+def bounding_box(latitude, longitude, radius_km, lat_field='latitude', lon_field='longitude'):
+    """
+    Q object matching rows inside the latitude/longitude box around the
+    circle; nothing outside it can be within ``radius_km``. The longitude
+    range wraps at the antimeridian and is dropped when the circle reaches a
+    pole, where it spans every longitude.
+    """
+    angle = radius_km / EARTH_RADIUS_KM
+    south = latitude - math.degrees(angle)
+    north = latitude + math.degrees(angle)
+    condition = Q(**{f'{lat_field}__gte': max(south, -90.0), f'{lat_field}__lte': min(north, 90.0)})
+    if south <= -90 or north >= 90:
+        return condition
+    # Widest longitude offset of a circle of angular radius ``angle``
+    d_lon = math.degrees(math.asin(min(1.0, math.sin(angle) / math.cos(math.radians(latitude)))))
+    west, east = longitude - d_lon, longitude + d_lon
+    if west < -180:
+        return condition & (Q(**{f'{lon_field}__gte': west + 360}) | Q(**{f'{lon_field}__lte': east}))
+    if east > 180:
+        return condition & (Q(**{f'{lon_field}__gte': west}) | Q(**{f'{lon_field}__lte': east - 360}))
+    return condition & Q(**{f'{lon_field}__gte': west, f'{lon_field}__lte': east})
+
+
+def within_radius(queryset, latitude, longitude, radius_km):
+    """
+    Objects from ``queryset`` within ``radius_km`` of the point, nearest first.
+
+    Each returned object has a ``distance_km`` attribute.
+    """
+    cells = covering_cells(latitude, longitude, radius_km)
+    # Sorted by distance below; an ORDER BY would only tempt SQLite into
+    # walking the ordering index instead of the geohash ranges
+    queryset = queryset.order_by().filter(bounding_box(latitude, longitude, radius_km))
+    if cells:
+        queryset = queryset.filter(geohash_prefix_filter(cells))
+    else:
+        # Radius wider than any geohash cell (near a pole): the box alone
+        # narrows the located rows
+        queryset = queryset.exclude(geohash='')
+
+    results = []
+    for obj in queryset:
+        distance = haversine_km(latitude, longitude, obj.latitude, obj.longitude)
+        if distance <= radius_km:
+            obj.distance_km = round(distance, 2)
+            results.append(obj)
+    results.sort(key=lambda obj: obj.distance_km)
+    return results
+
+
+def parse_point(value):
+    """Parse a 'lat,lon' string, returning None if it is missing or invalid"""
+    try:
+        lat, lon = (float(part) for part in value.split(','))
+    except (AttributeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return lat, lon
+
+
+def parse_radius(value, default=DEFAULT_RADIUS_KM, maximum=MAX_RADIUS_KM):
+    """Parse a radius_km query parameter, clamped to a sane range"""
+    try:
+        radius = float(value)
+    except (TypeError, ValueError):
+        return default
+    return min(max(radius, 0.1), maximum)
@@ -0,0 +1,224 @@
+"""
+Keyset (cursor) pagination shared by all list views.
+
+Pages are selected with ``WHERE (key columns) < (last row seen)`` against an
+index-friendly ordering instead of OFFSET, so every page costs the same no
+matter how deep it is, and rows inserted or deleted while a user is paging
+never shift items between pages. Cursors are opaque URL-safe tokens.
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q, QuerySet
+from django.http import QueryDict
+
+
+DEFAULT_PER_PAGE = 25
+CURSOR_PARAM = 'cursor'
+
+
+class InvalidCursor(Exception):
+    """Raised when a cursor cannot be decoded"""
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(values, direction):
+    payload = json.dumps({'v': [_encode_value(v) for v in values], 'd': direction}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values, direction = payload['v'], payload['d']
+    except (binascii.Error, ValueError, TypeError, KeyError, UnicodeDecodeError):
+        raise InvalidCursor(cursor)
+    if direction not in ('next', 'prev') or not isinstance(values, list):
+        raise InvalidCursor(cursor)
+    return values, direction
+
+
+class KeysetPage:
+    """One page of results plus the cursors needed to move from it"""
+
+    def __init__(self, object_list, next_cursor, previous_cursor, query_params=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.query_params = query_params
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def _query_with_cursor(self, cursor):
+        params = self.query_params.copy() if self.query_params is not None else QueryDict(mutable=True)
+        params[CURSOR_PARAM] = cursor
+        return params.urlencode()
+
+    @property
+    def next_query(self):
+        """Query string (other filters preserved) for the next page"""
+        return self._query_with_cursor(self.next_cursor) if self.next_cursor else ''
+
+    @property
+    def previous_query(self):
+        """Query string (other filters preserved) for the previous page"""
+        return self._query_with_cursor(self.previous_cursor) if self.previous_cursor else ''
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset (or an already sorted list) by a unique ordering.
+
+    ``ordering`` uses ``order_by`` syntax, e.g. ``('-created_at', '-id')``, and
+    must end in a unique field so every row has a distinct key. Lists are
+    paged in Python on the same keys, which suits small result sets sorted on
+    computed attributes such as a distance.
+    """
+
+    def __init__(self, object_list, ordering, per_page=DEFAULT_PER_PAGE):
+        self.object_list = object_list
+        self.ordering = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+        self.per_page = per_page
+
+    def get_page(self, cursor=None, query_params=None):
+        values, direction = (None, 'next')
+        if cursor:
+            try:
+                values, direction = decode_cursor(cursor)
+            except InvalidCursor:
+                values, direction = (None, 'next')
+            if values is not None and len(values) != len(self.ordering):
+                values, direction = (None, 'next')
+
+        backwards = direction == 'prev'
+        try:
+            rows = self._fetch(values, backwards)
+        except (ValidationError, ValueError, TypeError, ArithmeticError):
+            # Cursor values that do not fit the key fields: start over
+            values, backwards = None, False
+            rows = self._fetch(None, False)
+
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if has_more or backwards:
+                next_cursor = encode_cursor(self._key(rows[-1]), 'next')
+            if values is not None and (not backwards or has_more):
+                previous_cursor = encode_cursor(self._key(rows[0]), 'prev')
+        return KeysetPage(rows, next_cursor, previous_cursor, query_params)
+
+    def _key(self, obj):
+        key = []
+        for name, _ in self.ordering:
+            value = obj
+            for attr in name.split('__'):
+                value = getattr(value, attr)
+            key.append(value)
+        return key
+
+    def _fetch(self, values, backwards):
+        if isinstance(self.object_list, QuerySet):
+            return self._fetch_queryset(values, backwards)
+        return self._fetch_list(values, backwards)
+
+    def _fetch_queryset(self, values, backwards):
+        queryset = self.object_list
+        order_by = []
+        for name, descending in self.ordering:
+            descending = descending != backwards
+            order_by.append(f'-{name}' if descending else name)
+        queryset = queryset.order_by(*order_by)
+        if values is not None:
+            queryset = queryset.filter(self._after(values, backwards))
+        return list(queryset[:self.per_page + 1])
+
+    def _after(self, values, backwards):
+        """Row-value comparison "key comes after values" expanded into ORs of ANDs"""
+        condition = Q()
+        for i, (name, descending) in enumerate(self.ordering):
+            descending = descending != backwards
+            term = Q(**{f'{name}__lt' if descending else f'{name}__gt': values[i]})
+            for j, (prior_name, _) in enumerate(self.ordering[:i]):
+                term &= Q(**{prior_name: values[j]})
+            condition |= term
+        return condition
+
+    def _fetch_list(self, values, backwards):
+        rows = sorted(self.object_list, key=self._sort_key, reverse=backwards)
+        if values is not None and rows:
+            cursor_key = self._sort_key(_decode_values(values, self._key(rows[0])))
+            if backwards:
+                rows = [row for row in rows if self._sort_key(row) < cursor_key]
+            else:
+                rows = [row for row in rows if self._sort_key(row) > cursor_key]
+        return rows[:self.per_page + 1]
+
+    def _sort_key(self, obj):
+        values = obj if isinstance(obj, list) else self._key(obj)
+        return tuple(_Descending(v) if descending else v for v, (_, descending) in zip(values, self.ordering))
+
+
+class _Descending:
+    """Sort key wrapper that reverses the order of any comparable value (dates and text included)"""
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __gt__(self, other):
+        return other.value > self.value
+
+
+def _decode_values(values, sample):
+    """Turn JSON cursor values back into the types of the key values in ``sample``"""
+    decoded = []
+    for value, like in zip(values, sample):
+        if isinstance(like, datetime):
+            value = datetime.fromisoformat(value)
+        elif isinstance(like, date):
+            value = date.fromisoformat(value)
+        elif isinstance(like, Decimal):
+            value = Decimal(value)
+        decoded.append(value)
+    return decoded
+
+
+def paginate(request, object_list, ordering, per_page=DEFAULT_PER_PAGE):
+    """Return the keyset page selected by the request's ``cursor`` parameter"""
+    paginator = KeysetPaginator(object_list, ordering, per_page)
+    return paginator.get_page(request.GET.get(CURSOR_PARAM), query_params=request.GET)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,6 +44,9 @@ INSTALLED_APPS = [
     'donors',
     'blood_requests',
     'blood_banks',
+    'search',
+    'notifications',
+    'api',
 ]
 
 MIDDLEWARE = [
@@ -84,10 +88,53 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock when a transaction starts and wait for it, so
+            # concurrent inventory ledger writes queue up instead of failing
+            # with "database is locked"
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Template fragments are versioned per model (see blood_management.fragment_cache),
+# so every worker process must share the cache that holds the versions. The
+# default is a directory on this host (CACHE_DIR); set REDIS_URL when the
+# workers run on more than one host.
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_DIR', str(BASE_DIR / 'cache')),
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+# Runs tests against an empty cache directory of their own
+TEST_RUNNER = 'blood_management.test_runner.TestRunner'
+
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+# Seconds a worker keeps its inventory matrix even when the versions say it is current
+INVENTORY_MATRIX_MAX_AGE = 60
+
+# Shortage forecast (blood_banks.forecasting): flag stock with fewer days of
+# cover than this; the dashboard reuses a forecast for up to the timeout
+SHORTAGE_COVER_DAYS = 7
+SHORTAGE_FORECAST_TIMEOUT = 60 * 60
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -167,3 +214,18 @@ EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'  # For developm
 # EMAIL_USE_TLS = True
 # EMAIL_HOST_USER = 'your_email@gmail.com'
 # EMAIL_HOST_PASSWORD = 'your_password'
+
+# Email outbox (notifications.outbox): a failed message is retried after
+# OUTBOX_RETRY_BASE_SECONDS, doubling each time, and given up after
+# OUTBOX_MAX_ATTEMPTS tries
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_BASE_SECONDS = 60
+
+# Urgent request donor alerts (notifications.fanout): at most this many
+# alert emails become due per interval (seconds)
+DONOR_ALERT_BATCH_SIZE = 500
+DONOR_ALERT_BATCH_INTERVAL = 60
+
+# Live updates (blood_management.events): seconds between keep-alive
+# comments on an idle server-sent events connection
+LIVE_EVENTS_HEARTBEAT = 15
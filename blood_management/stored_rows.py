@@ -0,0 +1,39 @@
+"""
+One pre_save lookup of a row's stored values, shared between handlers.
+
+Several apps keep totals that only move by the difference a save makes
+(dashboard statistics, city counts, donation counters), so each needs the
+values the row had before the save. Rather than each connecting its own
+``pre_save`` receiver with its own ``SELECT``, they register the fields they
+need with ``on_pre_save``: one receiver per model reads the union of those
+fields with a single query and hands every handler its own values.
+"""
+from collections import defaultdict
+
+from django.db.models.signals import pre_save
+
+
+# Model -> [(fields, handler)]
+_handlers = defaultdict(list)
+
+
+def on_pre_save(model, fields, handler):
+    """
+    Call ``handler(instance, stored)`` before every save of ``model``, where
+    ``stored`` is the tuple of ``fields`` as currently stored, or None for a
+    new row or a raw (fixture) save.
+    """
+    entry = (tuple(fields), handler)
+    if entry not in _handlers[model]:
+        _handlers[model].append(entry)
+    pre_save.connect(read_stored_row, sender=model, dispatch_uid=f'stored_row_pre_save_{model._meta.label_lower}')
+
+
+def read_stored_row(sender, instance, raw=False, **kwargs):
+    handlers = _handlers[sender]
+    row = None
+    if instance.pk and not raw:
+        fields = list(dict.fromkeys(field for fields, _ in handlers for field in fields))
+        row = sender.objects.filter(pk=instance.pk).values(*fields).first()
+    for fields, handler in handlers:
+        handler(instance, None if row is None else tuple(row[field] for field in fields))
@@ -0,0 +1,38 @@
+"""
+Test runner that gives the suite a cache of its own.
+
+The default file-based cache is shared by every process using the
+settings, development server included. Tests get a fresh temporary
+directory instead (exported as ``CACHE_DIR`` for any process they start),
+so they neither read fragments cached from the development database nor
+leave theirs behind.
+"""
+import os
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._cache_dir = tempfile.TemporaryDirectory(prefix='blood-management-cache-')
+        self._previous_cache_dir = os.environ.get('CACHE_DIR')
+        os.environ['CACHE_DIR'] = self._cache_dir.name
+        caches = {alias: dict(config) for alias, config in settings.CACHES.items()}
+        for config in caches.values():
+            if config['BACKEND'].endswith('FileBasedCache'):
+                config['LOCATION'] = self._cache_dir.name
+        self._cache_settings = override_settings(CACHES=caches)
+        self._cache_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._cache_settings.disable()
+        if self._previous_cache_dir is None:
+            os.environ.pop('CACHE_DIR', None)
+        else:
+            os.environ['CACHE_DIR'] = self._previous_cache_dir
+        self._cache_dir.cleanup()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,55 @@
+"""
+Test helpers shared by the app test suites.
+"""
+import re
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+# SCAN steps read every row of a table, or every entry of one of its indexes
+FULL_SCAN_RE = re.compile(r'^SCAN (\w+)(?: AS \w+)?( USING (?:COVERING )?INDEX \w+)?$')
+LIMIT_RE = re.compile(r'\bLIMIT \d+(?: OFFSET \d+)?\s*$')
+
+
+class QueryPlanAssertionsMixin:
+    """
+    Assertions on SQLite ``EXPLAIN QUERY PLAN`` output.
+
+    ``SCAN <table>`` reads every row of the table, and ``SCAN <table> USING
+    [COVERING] INDEX <index>`` every entry of the index. The latter is only
+    accepted under a ``LIMIT``, where it walks the index in ``ORDER BY``
+    order and stops after one page. Index searches, FTS lookups and subquery
+    co-routines are fine.
+    """
+
+    def full_scans(self, sql, allow=()):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = [row[3] for row in cursor.fetchall()]
+        limited = bool(LIMIT_RE.search(sql))
+        scans = []
+        for step in plan:
+            match = FULL_SCAN_RE.match(step)
+            if not match or step == 'SCAN subquery' or match.group(1) in allow:
+                continue
+            if match.group(2) and limited:
+                continue
+            scans.append(step)
+        return scans
+
+    def assertNoFullScans(self, client, url, allow=()):
+        """
+        Request ``url`` and fail if any query it ran needs a full table or
+        index scan. ``allow`` names tables the view reads whole on purpose.
+        """
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        for query in context.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            scans = self.full_scans(sql, allow)
+            self.assertEqual(scans, [], f'{url} runs a full table scan:\n{sql}')
+        return response
@@ -0,0 +1,229 @@
+import math
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase, TestCase
+from blood_banks.models import BloodBank
+from .geo import (
+    DEFAULT_RADIUS_KM, EARTH_RADIUS_KM, MAX_RADIUS_KM, bounding_box, covering_cells, encode_geohash, haversine_km,
+    parse_radius, within_radius,
+)
+from .pagination import KeysetPaginator, decode_cursor, encode_cursor
+from .testing import QueryPlanAssertionsMixin
+
+
+def walk(paginator):
+    """Follow the next cursors from the first page, then the previous cursors back"""
+    pages, page = [], paginator.get_page()
+    pages.append(list(page))
+    # Bounded, so a cursor that restarts from the first page fails instead of looping
+    while page.has_next() and len(pages) < 20:
+        page = paginator.get_page(page.next_cursor)
+        pages.append(list(page))
+    back = [list(page)]
+    while page.has_previous() and len(back) < 20:
+        page = paginator.get_page(page.previous_cursor)
+        back.append(list(page))
+    return pages, back[::-1]
+
+
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Three cities with several banks each, so the city key ties and the id breaks it
+        cls.banks = [
+            BloodBank.objects.create(
+                name=f'Bank {i:02d}', address='1 Road', city=['Sylhet', 'Dhaka', 'Khulna'][i % 3],
+                phone_number='1', email='bank@example.com',
+            )
+            for i in range(11)
+        ]
+
+    def test_next_and_previous_cursors(self):
+        paginator = KeysetPaginator(BloodBank.objects.all(), ('-id',), per_page=4)
+        first = paginator.get_page()
+        self.assertEqual([b.pk for b in first], [b.pk for b in self.banks[::-1][:4]])
+        self.assertFalse(first.has_previous())
+        second = paginator.get_page(first.next_cursor)
+        self.assertEqual([b.pk for b in second], [b.pk for b in self.banks[::-1][4:8]])
+        self.assertEqual(list(paginator.get_page(second.previous_cursor)), list(first))
+        last = paginator.get_page(second.next_cursor)
+        self.assertEqual(len(last), 3)
+        self.assertFalse(last.has_next())
+        self.assertEqual(list(paginator.get_page(last.previous_cursor)), list(second))
+
+    def test_ties_on_leading_column(self):
+        expected = sorted(self.banks, key=lambda b: (b.city, -b.pk))
+        paginator = KeysetPaginator(BloodBank.objects.all(), ('city', '-id'), per_page=2)
+        pages, back = walk(paginator)
+        self.assertEqual(sum(pages, []), expected)
+        self.assertEqual(back, pages)
+
+    def test_invalid_or_tampered_cursor_starts_over(self):
+        paginator = KeysetPaginator(BloodBank.objects.all(), ('city', '-id'), per_page=4)
+        first = list(paginator.get_page())
+        for cursor in ['not-a-cursor!', 'e30', encode_cursor(['Dhaka'], 'next'),
+                       encode_cursor(['Dhaka', 'x'], 'next'), encode_cursor(['Dhaka', 1], 'sideways')]:
+            self.assertEqual(list(paginator.get_page(cursor)), first, cursor)
+
+    def test_cursor_round_trip(self):
+        values = [datetime(2026, 1, 2, 3, 4, 5), date(2026, 1, 2), Decimal('1.50'), 'A+', 7]
+        self.assertEqual(decode_cursor(encode_cursor(values, 'prev')),
+                         (['2026-01-02T03:04:05', '2026-01-02', '1.50', 'A+', 7], 'prev'))
+
+
+class KeysetListPaginationTests(SimpleTestCase):
+    def setUp(self):
+        start = date(2026, 1, 1)
+        self.rows = [
+            SimpleNamespace(
+                id=i, day=start + timedelta(days=i // 2), name=f'donor {i % 4}',
+                units=Decimal(i % 3), distance=(i * 7) % 5 + 0.5,
+            )
+            for i in range(10)
+        ]
+
+    def assertWalks(self, ordering, key):
+        pages, back = walk(KeysetPaginator(self.rows, ordering, per_page=3))
+        self.assertEqual([row.id for row in sum(pages, [])], [row.id for row in sorted(self.rows, key=key)])
+        self.assertEqual(back, pages)
+
+    def test_numeric_keys(self):
+        self.assertWalks(('distance', 'id'), lambda r: (r.distance, r.id))
+        self.assertWalks(('-units', '-id'), lambda r: (-r.units, -r.id))
+
+    def test_descending_date_and_text_keys(self):
+        self.assertWalks(('-day', 'id'), lambda r: (-r.day.toordinal(), r.id))
+        self.assertWalks(('-name', '-id'), lambda r: ([-ord(c) for c in r.name], -r.id))
+        self.assertWalks(('name', '-day', 'id'), lambda r: (r.name, -r.day.toordinal(), r.id))
+
+    def test_invalid_cursor_value_starts_over(self):
+        paginator = KeysetPaginator(self.rows, ('-day', 'id'), per_page=3)
+        first = list(paginator.get_page())
+        self.assertEqual(list(paginator.get_page(encode_cursor(['yesterday', 1], 'next'))), first)
+        paginator = KeysetPaginator(self.rows, ('-units', 'id'), per_page=3)
+        self.assertEqual(list(paginator.get_page(encode_cursor(['x', 1], 'next'))), list(paginator.get_page()))
+
+
+def destination(latitude, longitude, distance_km, bearing):
+    """The point ``distance_km`` from the start along the initial ``bearing`` (degrees)"""
+    phi, lam, theta = math.radians(latitude), math.radians(longitude), math.radians(bearing)
+    delta = distance_km / EARTH_RADIUS_KM
+    phi2 = math.asin(math.sin(phi) * math.cos(delta) + math.cos(phi) * math.sin(delta) * math.cos(theta))
+    lam2 = lam + math.atan2(math.sin(theta) * math.sin(delta) * math.cos(phi),
+                            math.cos(delta) - math.sin(phi) * math.sin(phi2))
+    return math.degrees(phi2), (math.degrees(lam2) + 540) % 360 - 180
+
+
+class GeohashTests(SimpleTestCase):
+    def test_encode_geohash(self):
+        self.assertEqual(encode_geohash(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(encode_geohash(-90, -180, 5), '00000')
+        self.assertEqual(encode_geohash(90, 180, 5), 'zzzzz')
+
+    def assertCovered(self, latitude, longitude, radius_km):
+        """Every point inside the radius has a geohash starting with one of the covering cells"""
+        cells = covering_cells(latitude, longitude, radius_km)
+        for bearing in range(0, 360, 10):
+            for fraction in (0.5, 0.999):
+                point = destination(latitude, longitude, radius_km * fraction, bearing)
+                geohash = encode_geohash(*point)
+                self.assertTrue(
+                    not cells or any(geohash.startswith(cell) for cell in cells),
+                    f'{point} ({geohash}) within {radius_km} km of {latitude},{longitude} is not in {cells}',
+                )
+        return cells
+
+    def test_radius_crossing_cell_edge(self):
+        cells = covering_cells(23.8103, 90.4125, 5)
+        self.assertEqual(len(cells), 9)
+        self.assertEqual(len({len(cell) for cell in cells}), 1)
+        # A centre right on a cell edge: the circle reaches both sides
+        edge = 22.5
+        self.assertNotEqual(encode_geohash(edge - 1e-6, 90, 4), encode_geohash(edge, 90, 4))
+        for latitude, longitude in [(23.8103, 90.4125), (edge, 90.0), (edge - 1e-6, 90.0), (0.0, 0.0), (-33.9, 18.4)]:
+            for radius_km in (0.5, 5, 25, 100, 500):
+                self.assertCovered(latitude, longitude, radius_km)
+
+    def test_antimeridian(self):
+        cells = self.assertCovered(10.0, 179.99, 25)
+        self.assertTrue(any(cell.startswith('8') for cell in cells))
+        self.assertTrue(any(cell.startswith('x') for cell in cells))
+        self.assertCovered(-10.0, -179.99, 25)
+
+    def test_near_the_poles(self):
+        for latitude in (85.0, 88.5, 89.5, 89.99, 90.0, -89.9, -90.0):
+            for radius_km in (0.5, 5, 25):
+                self.assertCovered(latitude, 0.0, radius_km)
+        # No nine cells can cover a circle around a pole
+        self.assertEqual(covering_cells(89.99, 0.0, 5), [])
+
+    def test_parse_radius(self):
+        self.assertEqual(parse_radius(None), DEFAULT_RADIUS_KM)
+        self.assertEqual(parse_radius('abc'), DEFAULT_RADIUS_KM)
+        self.assertEqual(parse_radius('7.5'), 7.5)
+        self.assertEqual(parse_radius('0'), 0.1)
+        self.assertEqual(parse_radius('100000'), MAX_RADIUS_KM)
+
+
+class WithinRadiusTests(TestCase):
+    def make_bank(self, name, latitude, longitude):
+        return BloodBank.objects.create(
+            name=name, address='1 Road', city='Dhaka', phone_number='1', email='bank@example.com',
+            latitude=latitude, longitude=longitude,
+        )
+
+    def test_distance_cutoff(self):
+        centre = (23.8103, 90.4125)
+        inside = self.make_bank('Inside', *destination(*centre, 9.9, 45))
+        nearest = self.make_bank('Nearest', *destination(*centre, 1, 200))
+        self.make_bank('Outside', *destination(*centre, 10.1, 45))
+        self.make_bank('Far', 22.3569, 91.7832)
+        self.make_bank('Unlocated', None, None)
+        results = within_radius(BloodBank.objects.all(), *centre, 10)
+        self.assertEqual(results, [nearest, inside])
+        self.assertEqual([bank.distance_km for bank in results], [1.0, 9.9])
+
+    def test_near_pole_and_antimeridian(self):
+        across_pole = self.make_bank('Across the pole', 89.95, 180.0)
+        across_meridian = self.make_bank('Across the antimeridian', 10.0, -179.95)
+        self.assertEqual(within_radius(BloodBank.objects.all(), 89.95, 0.0, 15), [across_pole])
+        self.assertEqual(within_radius(BloodBank.objects.all(), 10.0, 179.95, 15), [across_meridian])
+        self.assertLess(haversine_km(10.0, 179.95, 10.0, -179.95), 15)
+
+    def test_bounding_box_keeps_every_point_inside(self):
+        # Just inside and just outside the circle in every direction, including
+        # across the antimeridian and around a pole
+        for centre, radius_km in [((23.8, 90.4), 25), ((60.0, 179.9), 100), ((-45.0, -179.5), 100),
+                                  ((89.5, 30.0), 100), ((-88.8, 0.0), 100)]:
+            BloodBank.objects.all().delete()
+            inside = [self.make_bank(f'In {b}', *destination(*centre, radius_km * 0.999, b)) for b in range(0, 360, 30)]
+            for bearing in range(15, 360, 30):
+                self.make_bank(f'Out {bearing}', *destination(*centre, radius_km * 1.01, bearing))
+            results = within_radius(BloodBank.objects.all(), *centre, radius_km)
+            self.assertEqual({bank.pk for bank in results}, {bank.pk for bank in inside}, centre)
+
+    def test_box_filters_rows_in_sql(self):
+        # Near the pole, where no geohash cells apply, only the latitude band is loaded
+        polar = self.make_bank('Near the pole', *destination(89.5, 0.0, 50, 90))
+        self.make_bank('Equator', 0.0, 0.0)
+        self.assertEqual(list(BloodBank.objects.filter(bounding_box(89.5, 0.0, MAX_RADIUS_KM))), [polar])
+        # Elsewhere it trims what the (larger) covering cells let through
+        centre = (23.8103, 90.4125)
+        near = self.make_bank('North', *destination(*centre, 20, 0))
+        self.make_bank('East', *destination(*centre, 30, 90))
+        self.make_bank('South', *destination(*centre, 40, 200))
+        self.assertEqual(list(BloodBank.objects.filter(bounding_box(*centre, 25)).order_by()), [near])
+
+
+class QueryPlanAssertionTests(QueryPlanAssertionsMixin, TestCase):
+    def test_full_table_and_index_scans(self):
+        self.assertEqual(self.full_scans('SELECT * FROM blood_banks'), ['SCAN blood_banks'])
+        self.assertEqual(self.full_scans('SELECT * FROM blood_banks ORDER BY name, id'),
+                         ['SCAN blood_banks USING INDEX blood_bank_name_idx'])
+        self.assertEqual(self.full_scans('SELECT name, id FROM blood_banks ORDER BY name, id'),
+                         ['SCAN blood_banks USING COVERING INDEX blood_bank_name_idx'])
+        self.assertEqual(self.full_scans('SELECT * FROM blood_banks ORDER BY name, id LIMIT 26'), [])
+        self.assertEqual(self.full_scans('SELECT * FROM blood_banks WHERE id = 1'), [])
+        self.assertEqual(self.full_scans('SELECT * FROM blood_banks', allow=['blood_banks']), [])
@@ -26,6 +26,7 @@ urlpatterns = [
     path('donors/', include('donors.urls')),
     path('requests/', include('blood_requests.urls')),
     path('', include('blood_banks.urls')),
+    path('api/', include('api.urls')),
     path('admin/', admin.site.urls),
 ]
 
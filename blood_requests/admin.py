@@ -1,13 +1,16 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from search.admin import FullTextSearchAdminMixin
+from .approvals import set_request_status
 from .models import BloodRequest
 
 
 @admin.register(BloodRequest)
-class BloodRequestAdmin(admin.ModelAdmin):
-    list_display = ['patient_name', 'blood_group', 'units_required', 'urgency', 'status', 'requested_date', 'required_by_date']
+class BloodRequestAdmin(FullTextSearchAdminMixin, admin.ModelAdmin):
+    list_display = ['patient_name', 'blood_group', 'units_required', 'urgency', 'priority_score', 'status', 'requested_date', 'required_by_date']
     list_filter = ['status', 'urgency', 'blood_group', 'requested_date']
-    search_fields = ['patient_name', 'hospital_name', 'requester__username', 'requester__email']
-    readonly_fields = ['requested_date', 'approved_date']
+    search_fields = ['patient_name', 'hospital_name', 'city', 'reason', 'requester__username', 'requester__email']
+    readonly_fields = ['requested_date', 'approved_date', 'priority_score']
+    actions = ['approve_selected', 'reject_selected']
     
     fieldsets = (
         ('Patient Information', {
@@ -17,7 +20,7 @@ class BloodRequestAdmin(admin.ModelAdmin):
             'fields': ('hospital_name', 'hospital_address', 'city', 'contact_number')
         }),
         ('Request Details', {
-            'fields': ('reason', 'required_by_date', 'notes')
+            'fields': ('reason', 'required_by_date', 'priority_score', 'notes')
         }),
         ('Status', {
             'fields': ('status', 'approved_by', 'approved_date', 'rejection_reason')
@@ -27,3 +30,13 @@ class BloodRequestAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+    
+    @admin.action(description='Approve selected pending requests')
+    def approve_selected(self, request, queryset):
+        updated = set_request_status(queryset.values_list('pk', flat=True), 'approved', request.user)
+        self.message_user(request, f'{len(updated)} blood request(s) approved.', messages.SUCCESS)
+    
+    @admin.action(description='Reject selected pending requests')
+    def reject_selected(self, request, queryset):
+        updated = set_request_status(queryset.values_list('pk', flat=True), 'rejected', request.user)
+        self.message_user(request, f'{len(updated)} blood request(s) rejected.', messages.SUCCESS)
@@ -0,0 +1,173 @@
+"""
+Batch allocation of bank stock to open blood requests.
+
+``plan_allocations`` reads every open request and every stocked inventory
+row in two queries and assigns units in memory, most urgent request first:
+the recipient's own group before other compatible groups (universal O- is
+kept for last), same-city banks before others, fullest banks first. A
+request is only planned when it can be covered in full, so stock is never
+tied up in half-served requests. The plan is a dry run; ``apply_plan``
+writes it through the inventory ledger, one transaction per request, and
+queues the requester's email as a manual fulfillment does.
+"""
+from collections import defaultdict
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.db import transaction
+
+from blood_banks.ledger import AlreadyRecorded, InsufficientInventory, mark_recorded, record_transaction
+from blood_banks.models import BloodInventory
+from donors.matching import compatible_donor_groups
+from donors.models import normalize_city
+from notifications.outbox import queue_email
+from .approvals import status_email
+from .models import BloodRequest
+
+
+OPEN_STATUSES = ('pending', 'approved')
+URGENCY_RANK = {'critical': 0, 'high': 1, 'medium': 2, 'low': 3}
+
+
+@dataclass
+class Allocation:
+    blood_bank_id: int
+    blood_group: str
+    units: Decimal
+
+
+@dataclass
+class RequestPlan:
+    request_id: int
+    blood_group: str
+    units_required: Decimal
+    allocations: list = field(default_factory=list)
+
+    @property
+    def fulfilled(self):
+        return bool(self.allocations)
+
+    @property
+    def supplying_bank_id(self):
+        """The bank giving the most units, recorded as ``fulfilled_from``"""
+        return max(self.allocations, key=lambda allocation: allocation.units).blood_bank_id
+
+    def as_dict(self):
+        return {
+            'request_id': self.request_id,
+            'blood_group': self.blood_group,
+            'units_required': str(self.units_required),
+            'fulfilled': self.fulfilled,
+            'allocations': [
+                {'blood_bank_id': a.blood_bank_id, 'blood_group': a.blood_group, 'units': str(a.units)}
+                for a in self.allocations
+            ],
+        }
+
+
+def _request_priority(row):
+    return (URGENCY_RANK.get(row['urgency'], len(URGENCY_RANK)), row['required_by_date'], row['requested_date'], row['id'])
+
+
+def _group_preference(recipient_group, totals):
+    """Own group first, then other compatible groups by stock left, O- last"""
+    others = [group for group in compatible_donor_groups(recipient_group) if group != recipient_group]
+    others.sort(key=lambda group: (group == 'O-', -totals[group]))
+    return [recipient_group] + others
+
+
+def plan_allocations(requests=None):
+    """
+    Assign stock to every open request without writing anything.
+
+    Returns one ``RequestPlan`` per open request, in allocation order;
+    requests that cannot be covered in full have no allocations.
+    """
+    if requests is None:
+        requests = BloodRequest.objects.filter(status__in=OPEN_STATUSES)
+    rows = sorted(
+        requests.values('id', 'blood_group', 'units_required', 'urgency', 'required_by_date', 'requested_date', 'city'),
+        key=_request_priority,
+    )
+
+    # Stock entries are [blood_bank_id, units left, city], fullest first,
+    # indexed by blood group and by (blood group, city)
+    stock = BloodInventory.objects.filter(units_available__gt=0, blood_bank__is_active=True).values_list(
+        'blood_bank_id', 'blood_group', 'units_available', 'blood_bank__city'
+    ).order_by('-units_available')
+    by_group = defaultdict(list)
+    by_city = defaultdict(list)
+    totals = defaultdict(Decimal)
+    for blood_bank_id, blood_group, units, city in stock:
+        entry = [blood_bank_id, units, normalize_city(city)]
+        by_group[blood_group].append(entry)
+        by_city[(blood_group, entry[2])].append(entry)
+        totals[blood_group] += units
+
+    plans = []
+    for row in rows:
+        plan = RequestPlan(row['id'], row['blood_group'], row['units_required'])
+        plans.append(plan)
+        city = normalize_city(row['city'])
+        needed = row['units_required']
+        taken = []
+        for group in _group_preference(row['blood_group'], totals):
+            if totals[group] <= 0:
+                continue
+            # Same-city banks first, then the rest
+            candidates = by_city.get((group, city), []) + [e for e in by_group[group] if e[2] != city]
+            for entry in candidates:
+                if entry[1] <= 0:
+                    continue
+                units = min(needed, entry[1])
+                taken.append((entry, group, units))
+                needed -= units
+                if needed <= 0:
+                    break
+            if needed <= 0:
+                break
+        if needed > 0:
+            continue
+        for entry, group, units in taken:
+            entry[1] -= units
+            totals[group] -= units
+            plan.allocations.append(Allocation(entry[0], group, units))
+    return plans
+
+
+def apply_plan(plans, user=None):
+    """
+    Fulfil the planned requests through the inventory ledger.
+
+    Each request is fulfilled in its own transaction; one whose stock or
+    status changed since planning is skipped. Returns ``(fulfilled, skipped)``
+    lists of request ids.
+    """
+    fulfilled, skipped = [], []
+    for plan in plans:
+        if not plan.fulfilled:
+            continue
+        try:
+            with transaction.atomic():
+                blood_request = BloodRequest.objects.select_for_update().select_related('requester').filter(
+                    pk=plan.request_id, status__in=OPEN_STATUSES
+                ).first()
+                if blood_request is None:
+                    skipped.append(plan.request_id)
+                    continue
+                mark_recorded(blood_request)
+                for allocation in plan.allocations:
+                    record_transaction(
+                        allocation.blood_bank_id, allocation.blood_group, -allocation.units, 'fulfillment',
+                        blood_request=blood_request, user=user, note='Batch allocation',
+                    )
+                blood_request.status = 'fulfilled'
+                blood_request.fulfilled_from_id = plan.supplying_bank_id
+                blood_request.save()
+                # Notify the requester (sent by send_outbox)
+                queue_email(*status_email(blood_request))
+        except (InsufficientInventory, AlreadyRecorded):
+            skipped.append(plan.request_id)
+            continue
+        fulfilled.append(plan.request_id)
+    return fulfilled, skipped
@@ -0,0 +1,64 @@
+"""
+Bulk approval and rejection of pending blood requests.
+
+The selected requests are updated with one ``bulk_update`` in a single
+transaction. The dashboard statistics get the summed status changes, and
+the requesters' notifications are written to the outbox with the change.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from blood_banks.stats import apply_deltas, change_deltas
+from blood_management.events import publish_on_commit
+from blood_management.fragment_cache import bump_after_write
+from notifications.outbox import queue_emails
+from .models import BloodRequest
+from .signals import request_event
+
+BATCH_SIZE = 500
+
+
+def status_email(blood_request):
+    """The ``(subject, body, recipient)`` telling the requester of the request's current status"""
+    label = blood_request.get_status_display()
+    return (
+        f'Blood Request {label}',
+        f'Your blood request for {blood_request.blood_group} has been {label.lower()}.',
+        blood_request.requester.email,
+    )
+
+
+def set_request_status(ids, status, user, rejection_reason=''):
+    """
+    Move the pending requests in ``ids`` to ``status`` ('approved' or
+    'rejected'). Returns the updated requests.
+    """
+    if status not in ('approved', 'rejected'):
+        raise ValueError(f'Cannot bulk-set blood requests to {status!r}')
+    with transaction.atomic():
+        requests = list(
+            BloodRequest.objects.select_for_update().filter(pk__in=ids, status='pending')
+            .select_related('requester').order_by('pk')
+        )
+        if not requests:
+            return []
+        now = timezone.now()
+        fields = ['status', 'approved_by', 'approved_date']
+        for blood_request in requests:
+            blood_request.status = status
+            blood_request.approved_by = user
+            blood_request.approved_date = now
+            if status == 'rejected':
+                blood_request.rejection_reason = rejection_reason
+        if status == 'rejected':
+            fields.append('rejection_reason')
+        BloodRequest.objects.bulk_update(requests, fields, batch_size=BATCH_SIZE)
+        apply_deltas({
+            stat: amount * len(requests)
+            for stat, amount in change_deltas(BloodRequest, ('pending',), (status,)).items()
+        })
+        bump_after_write(BloodRequest)
+        for blood_request in requests:
+            publish_on_commit('requests', request_event(blood_request))
+        queue_emails([status_email(blood_request) for blood_request in requests])
+    return requests
@@ -27,9 +27,16 @@ class BloodRequestUpdateForm(forms.ModelForm):
     """Form for admin to update blood request status"""
     class Meta:
         model = BloodRequest
-        fields = ['status', 'rejection_reason', 'notes']
+        fields = ['status', 'fulfilled_from', 'rejection_reason', 'notes']
         widgets = {
             'status': forms.Select(attrs={'class': 'form-control'}),
+            'fulfilled_from': forms.Select(attrs={'class': 'form-control'}),
             'rejection_reason': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
             'notes': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
         }
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('status') == 'fulfilled' and not cleaned_data.get('fulfilled_from'):
+            self.add_error('fulfilled_from', 'Choose the blood bank that supplied the units.')
+        return cleaned_data
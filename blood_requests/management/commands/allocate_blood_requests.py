@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+from blood_requests.allocation import apply_plan, plan_allocations
+
+
+class Command(BaseCommand):
+    help = 'Allocates bank stock to pending and approved blood requests, most urgent first'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Show the allocation plan without fulfilling anything')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        plans = plan_allocations()
+        elapsed = time.perf_counter() - started
+        planned = [plan for plan in plans if plan.fulfilled]
+        for plan in planned:
+            sources = ', '.join(
+                f'{allocation.units} {allocation.blood_group} from bank {allocation.blood_bank_id}'
+                for allocation in plan.allocations
+            )
+            self.stdout.write(f'  Request #{plan.request_id} ({plan.units_required} {plan.blood_group}): {sources}')
+        self.stdout.write(
+            f'Planned {len(planned)} of {len(plans)} open requests in {elapsed * 1000:.0f}ms'
+        )
+        if options['dry_run']:
+            return
+        fulfilled, skipped = apply_plan(planned)
+        if skipped:
+            self.stdout.write(self.style.WARNING(f'  Skipped (changed since planning): {", ".join(map(str, skipped))}'))
+        self.stdout.write(self.style.SUCCESS(f'✓ Fulfilled {len(fulfilled)} blood requests'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from blood_requests.triage import next_to_triage, refresh_priorities
+
+
+class Command(BaseCommand):
+    help = 'Recomputes triage priority scores of open blood requests as their deadlines approach (run daily)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--show', type=int, default=0, metavar='N',
+                            help='Also list the next N pending requests to triage')
+
+    def handle(self, *args, **options):
+        updated = refresh_priorities()
+        self.stdout.write(self.style.SUCCESS(f'✓ Updated {updated} request priorities'))
+        if not options['show']:
+            return
+        for blood_request in next_to_triage(options['show']):
+            self.stdout.write(
+                f'  {blood_request.priority_score:>5}  {blood_request.get_urgency_display():<8} '
+                f'{blood_request.blood_group:<3} {blood_request.units_required} units by {blood_request.required_by_date}  '
+                f'{blood_request.patient_name}'
+            )
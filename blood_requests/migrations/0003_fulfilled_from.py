@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blood_banks', '0007_inventory_ledger'),
+        ('blood_requests', '0002_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bloodrequest',
+            name='fulfilled_from',
+            field=models.ForeignKey(blank=True, help_text='Blood bank that supplied the units', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='fulfilled_requests', to='blood_banks.bloodbank'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:27
+
+import datetime
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Frozen copy of blood_requests.models.compute_priority_score
+URGENCY_POINTS = {'critical': 1000, 'high': 600, 'medium': 300, 'low': 100}
+
+
+def compute_priority_score(urgency, required_by_date, units_required, today):
+    days_left = min(max((required_by_date - today).days, 0), 14)
+    return URGENCY_POINTS.get(urgency, 0) + (14 - days_left) * 30 + min(int(units_required * 10), 100)
+
+
+def populate_priority_score(apps, schema_editor):
+    BloodRequest = apps.get_model('blood_requests', 'BloodRequest')
+    today = datetime.date.today()
+    requests = [
+        BloodRequest(pk=pk, priority_score=compute_priority_score(urgency, required_by_date, units_required, today))
+        for pk, urgency, required_by_date, units_required in BloodRequest.objects.values_list(
+            'pk', 'urgency', 'required_by_date', 'units_required'
+        ).iterator()
+    ]
+    BloodRequest.objects.bulk_update(requests, ['priority_score'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blood_banks', '0009_blood_units'),
+        ('blood_requests', '0003_fulfilled_from'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bloodrequest',
+            name='priority_score',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Triage priority, refreshed daily by refresh_request_priorities'),
+        ),
+        migrations.AddIndex(
+            model_name='bloodrequest',
+            index=models.Index(fields=['status', '-priority_score', 'required_by_date', 'id'], name='request_triage_idx'),
+        ),
+        migrations.RunPython(populate_priority_score, migrations.RunPython.noop),
+    ]
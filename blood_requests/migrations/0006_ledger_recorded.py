@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+def flag_fulfilled_requests(apps, schema_editor):
+    BloodRequest = apps.get_model('blood_requests', 'BloodRequest')
+    InventoryTransaction = apps.get_model('blood_banks', 'InventoryTransaction')
+    BloodRequest.objects.filter(
+        pk__in=InventoryTransaction.objects.filter(reason='fulfillment', blood_request__isnull=False).values('blood_request')
+    ).update(ledger_recorded=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blood_banks', '0009_blood_units'),
+        ('blood_requests', '0005_expired_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bloodrequest',
+            name='ledger_recorded',
+            field=models.BooleanField(default=False, editable=False, help_text='Fulfilled from the inventory ledger'),
+        ),
+        migrations.RunPython(flag_fulfilled_requests, migrations.RunPython.noop),
+    ]
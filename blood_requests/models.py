@@ -1,8 +1,28 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
+from blood_management.counters import MaintainedCountersMixin
 
 
-class BloodRequest(models.Model):
+# Triage priority: urgency dominates, a close deadline can lift a request by
+# about one urgency level, and larger requests break the remaining ties
+URGENCY_POINTS = {'critical': 1000, 'high': 600, 'medium': 300, 'low': 100}
+DEADLINE_WINDOW_DAYS = 14
+DEADLINE_POINTS_PER_DAY = 30
+UNIT_POINTS = 10
+MAX_UNIT_POINTS = 100
+
+
+def compute_priority_score(urgency, required_by_date, units_required, today=None):
+    """Higher is more urgent; changes only when a day passes or the request is edited"""
+    today = today or timezone.localdate()
+    days_left = min(max((required_by_date - today).days, 0), DEADLINE_WINDOW_DAYS)
+    deadline_points = (DEADLINE_WINDOW_DAYS - days_left) * DEADLINE_POINTS_PER_DAY
+    unit_points = min(int(units_required * UNIT_POINTS), MAX_UNIT_POINTS)
+    return URGENCY_POINTS.get(urgency, 0) + deadline_points + unit_points
+
+
+class BloodRequest(MaintainedCountersMixin, models.Model):
     """Blood Request model for managing blood requests"""
     BLOOD_GROUP_CHOICES = (
         ('A+', 'A+'),
@@ -20,6 +40,8 @@ class BloodRequest(models.Model):
         ('approved', 'Approved'),
         ('rejected', 'Rejected'),
         ('fulfilled', 'Fulfilled'),
+        # Still pending when the required-by date passed (expire_stale_records)
+        ('expired', 'Expired'),
     )
     
     URGENCY_CHOICES = (
@@ -44,14 +66,38 @@ class BloodRequest(models.Model):
     required_by_date = models.DateField()
     approved_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='approved_requests')
     approved_date = models.DateTimeField(null=True, blank=True)
+    fulfilled_from = models.ForeignKey('blood_banks.BloodBank', on_delete=models.SET_NULL, null=True, blank=True, related_name='fulfilled_requests', help_text="Blood bank that supplied the units")
     rejection_reason = models.TextField(blank=True)
     notes = models.TextField(blank=True)
+    priority_score = models.PositiveIntegerField(default=0, editable=False, help_text="Triage priority, refreshed daily by refresh_request_priorities")
+    ledger_recorded = models.BooleanField(default=False, editable=False, help_text="Fulfilled from the inventory ledger")
+    
+    # Set once by blood_banks.ledger with a conditional update
+    counter_fields = ('ledger_recorded',)
     
     def __str__(self):
         return f"{self.patient_name} - {self.blood_group} ({self.status})"
     
+    def save(self, *args, **kwargs):
+        self.priority_score = compute_priority_score(self.urgency, self.required_by_date, self.units_required)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & {'urgency', 'required_by_date', 'units_required'}:
+            kwargs['update_fields'] = set(update_fields) | {'priority_score'}
+        super().save(*args, **kwargs)
+    
     class Meta:
         db_table = 'blood_requests'
         verbose_name = 'Blood Request'
         verbose_name_plural = 'Blood Requests'
         ordering = ['-requested_date']
+        indexes = [
+            models.Index(fields=['status', 'requested_date'], name='request_status_idx'),
+            models.Index(fields=['requester', 'requested_date'], name='request_requester_idx'),
+            models.Index(fields=['requested_date', 'id'], name='request_date_idx'),
+            models.Index(fields=['requested_date', 'id'], condition=models.Q(status='pending'), name='request_pending_idx'),
+            # Triage queue: most urgent pending requests first (status leads
+            # rather than a partial index, so a bound status parameter still matches)
+            models.Index(fields=['status', '-priority_score', 'required_by_date', 'id'], name='request_triage_idx'),
+            # Expiry sweep: overdue pending requests, oldest deadline first
+            models.Index(fields=['status', 'required_by_date', 'id'], name='request_overdue_idx'),
+        ]
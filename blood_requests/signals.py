@@ -0,0 +1,25 @@
+from django.db.models.signals import post_save
+
+from blood_management.events import publish_on_commit
+from .models import BloodRequest
+
+
+def request_event(blood_request, created=False):
+    """Payload of a live "requests" event"""
+    return {
+        'id': blood_request.pk,
+        'created': created,
+        'status': blood_request.status,
+        'status_display': blood_request.get_status_display(),
+        'blood_group': blood_request.blood_group,
+        'urgency': blood_request.urgency,
+        'city': blood_request.city,
+    }
+
+
+def publish_request_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        publish_on_commit('requests', request_event(instance, created))
+
+
+post_save.connect(publish_request_saved, sender=BloodRequest, dispatch_uid='blood_request_live_event')
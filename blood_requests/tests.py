@@ -1,3 +1,240 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from accounts.models import User
+from blood_banks.ledger import ledger_mismatches, record_transaction
+from blood_banks.models import BloodBank, BloodInventory
+from blood_banks.stats import rebuild_stats
+from blood_management.testing import QueryPlanAssertionsMixin
+from donors.matching import BLOOD_GROUP_CODES
+from notifications.models import OutboxMessage
+from .allocation import apply_plan, plan_allocations
+from .models import BloodRequest
+from .triage import next_to_triage, refresh_priorities, triage_queue
+
+
+class BloodRequestQueryPlanTests(QueryPlanAssertionsMixin, TestCase):
+    """The main query of every blood request view must be answered from an index"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='admin123', user_type='admin'
+        )
+        cls.donor = User.objects.create_user(
+            username='donor', email='donor@example.com', password='donor123', user_type='donor'
+        )
+        cls.blood_request = BloodRequest.objects.create(
+            requester=cls.donor, patient_name='Jane Doe', blood_group='A+', units_required=2,
+            urgency='high', hospital_name='City Hospital', hospital_address='Shahbagh', city='Dhaka',
+            contact_number='0123456789', reason='Surgery', required_by_date=date.today()
+        )
+
+    def test_request_list_admin(self):
+        self.client.force_login(self.admin)
+        self.assertNoFullScans(self.client, '/requests/')
+
+    def test_request_list_donor(self):
+        self.client.force_login(self.donor)
+        self.assertNoFullScans(self.client, '/requests/')
+
+    def test_request_detail(self):
+        self.client.force_login(self.admin)
+        self.assertNoFullScans(self.client, f'/requests/{self.blood_request.pk}/')
+
+    def test_triage_queue(self):
+        self.client.force_login(self.admin)
+        self.assertNoFullScans(self.client, '/requests/?queue=triage')
+        sql, params = triage_queue()[:10].query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(row[3] for row in cursor.fetchall())
+        # One range read of the partial index, no sort step
+        self.assertIn('USING INDEX request_triage_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class AllocationTests(TestCase):
+    """Open requests are served most urgent first from compatible stock"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='admin123', user_type='admin'
+        )
+        self.dhaka = BloodBank.objects.create(
+            name='Dhaka Blood Bank', address='Shahbagh', city='Dhaka', phone_number='1', email='dhaka@example.com'
+        )
+        self.sylhet = BloodBank.objects.create(
+            name='Sylhet Blood Bank', address='Zindabazar', city='Sylhet', phone_number='2', email='sylhet@example.com'
+        )
+
+    def make_request(self, blood_group, units, urgency='medium', city='Dhaka', required_by=date(2025, 6, 1)):
+        return BloodRequest.objects.create(
+            requester=self.admin, patient_name='Patient', blood_group=blood_group, units_required=Decimal(units),
+            urgency=urgency, hospital_name='Hospital', hospital_address='Road', city=city,
+            contact_number='0123', reason='Surgery', required_by_date=required_by
+        )
+
+    def units(self, bank, blood_group):
+        return BloodInventory.objects.get(blood_bank=bank, blood_group=blood_group).units_available
+
+    def test_plan_orders_by_urgency_and_prefers_own_group_and_city(self):
+        record_transaction(self.dhaka.pk, 'A+', 2, 'adjustment')
+        record_transaction(self.sylhet.pk, 'A+', 5, 'adjustment')
+        record_transaction(self.dhaka.pk, 'O-', 10, 'adjustment')
+        low = self.make_request('A+', 4, urgency='low')
+        critical = self.make_request('A+', 3, urgency='critical')
+        too_big = self.make_request('AB-', 50, urgency='high')
+
+        plans = {plan.request_id: plan for plan in plan_allocations()}
+        self.assertEqual(
+            [(a.blood_bank_id, a.blood_group, a.units) for a in plans[critical.pk].allocations],
+            [(self.dhaka.pk, 'A+', 2), (self.sylhet.pk, 'A+', 1)],
+        )
+        self.assertEqual(
+            [(a.blood_bank_id, a.blood_group, a.units) for a in plans[low.pk].allocations],
+            [(self.sylhet.pk, 'A+', 4)],
+        )
+        self.assertFalse(plans[too_big.pk].fulfilled)
+        # A dry run writes nothing
+        self.assertEqual(self.units(self.dhaka, 'A+'), 2)
+
+    def test_apply_fulfils_through_the_ledger(self):
+        record_transaction(self.dhaka.pk, 'O-', 3, 'adjustment')
+        blood_request = self.make_request('B+', 2)
+        fulfilled, skipped = apply_plan(plan_allocations(), user=self.admin)
+        self.assertEqual((fulfilled, skipped), ([blood_request.pk], []))
+        blood_request.refresh_from_db()
+        self.assertEqual((blood_request.status, blood_request.fulfilled_from), ('fulfilled', self.dhaka))
+        self.assertEqual(self.units(self.dhaka, 'O-'), 1)
+        self.assertEqual(ledger_mismatches(), [])
+        # The requester hears about it as after a manual fulfillment
+        self.assertEqual(
+            list(OutboxMessage.objects.values_list('subject', 'body', 'recipient')),
+            [('Blood Request Fulfilled', 'Your blood request for B+ has been fulfilled.', 'admin@example.com')],
+        )
+
+    def test_stale_plan_is_skipped(self):
+        record_transaction(self.dhaka.pk, 'O+', 2, 'adjustment')
+        blood_request = self.make_request('O+', 2)
+        plans = plan_allocations()
+        record_transaction(self.dhaka.pk, 'O+', -1, 'adjustment')
+        self.assertEqual(apply_plan(plans), ([], [blood_request.pk]))
+        self.assertEqual(self.units(self.dhaka, 'O+'), 1)
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_planning_thousands_of_requests_takes_two_queries(self):
+        for bank in (self.dhaka, self.sylhet):
+            for group in BLOOD_GROUP_CODES:
+                BloodInventory.objects.create(blood_bank=bank, blood_group=group, units_available=500)
+        groups = list(BLOOD_GROUP_CODES)
+        BloodRequest.objects.bulk_create([
+            BloodRequest(
+                requester=self.admin, patient_name=f'Patient {i}', blood_group=groups[i % 8], units_required=1,
+                urgency=('low', 'medium', 'high', 'critical')[i % 4], hospital_name='Hospital',
+                hospital_address='Road', city=('Dhaka', 'Sylhet')[i % 2], contact_number='0123',
+                reason='Surgery', required_by_date=date(2025, 6, 1 + i % 28)
+            )
+            for i in range(3000)
+        ])
+        with self.assertNumQueries(2):
+            plans = plan_allocations()
+        self.assertEqual(sum(plan.fulfilled for plan in plans), 3000)
+
+    def test_dry_run_endpoint(self):
+        record_transaction(self.dhaka.pk, 'A-', 1, 'adjustment')
+        self.make_request('A-', 1)
+        self.client.force_login(self.admin)
+        response = self.client.get('/requests/allocate/')
+        self.assertTrue(response.json()['dry_run'])
+        self.assertTrue(response.json()['plans'][0]['fulfilled'])
+        self.assertEqual(self.units(self.dhaka, 'A-'), 1)
+
+
+class TriageTests(TestCase):
+    """Pending requests are queued by a stored score that rises as deadlines approach"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='admin123', user_type='admin'
+        )
+
+    def make_request(self, name, urgency, days_left, units=1, status='pending'):
+        return BloodRequest.objects.create(
+            requester=self.admin, patient_name=name, blood_group='O+', units_required=Decimal(units), urgency=urgency,
+            hospital_name='DMCH', hospital_address='Dhaka', city='Dhaka', contact_number='0123', reason='Surgery',
+            required_by_date=date.today() + timedelta(days=days_left), status=status,
+        )
+
+    def test_queue_order(self):
+        self.make_request('low later', 'low', 20, units=4)
+        self.make_request('critical today', 'critical', 0)
+        self.make_request('medium today', 'medium', 0)
+        self.make_request('high next month', 'high', 30)
+        self.make_request('critical done', 'critical', 0, status='fulfilled')
+        # A close deadline lifts a medium request above a high one weeks away
+        self.assertEqual(
+            [r.patient_name for r in next_to_triage(4)],
+            ['critical today', 'medium today', 'high next month', 'low later'],
+        )
+
+    def test_refresh_raises_scores_as_deadlines_approach(self):
+        blood_request = self.make_request('due in a week', 'medium', 7, units=2)
+        score = blood_request.priority_score
+        self.assertEqual(refresh_priorities(), 0)
+        self.assertEqual(refresh_priorities(today=date.today() + timedelta(days=3)), 1)
+        blood_request.refresh_from_db()
+        self.assertEqual(blood_request.priority_score, score + 90)
+
+        out = StringIO()
+        call_command('refresh_request_priorities', '--show', '1', stdout=out)
+        self.assertIn('Updated 1 request priorities', out.getvalue())
+        self.assertIn('due in a week', out.getvalue())
+
+
+class BulkRequestStatusTests(TestCase):
+    """Admins approve or reject many pending requests in one request"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='admin123', user_type='admin'
+        )
+        self.requester = User.objects.create_user(
+            username='requester', email='requester@example.com', password='requester123', user_type='donor'
+        )
+        self.requests = [
+            BloodRequest.objects.create(
+                requester=self.requester, patient_name=f'Patient {i}', blood_group='B+', units_required=1,
+                hospital_name='DMCH', hospital_address='Dhaka', city='Dhaka', contact_number='0123',
+                reason='Surgery', required_by_date=date.today(), status=status,
+            )
+            for i, status in enumerate(['pending', 'pending', 'pending', 'fulfilled'])
+        ]
+
+    def post(self, user, data):
+        self.client.force_login(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/requests/bulk/', data)
+
+    def test_only_pending_requests_change(self):
+        ids = [r.pk for r in self.requests]
+        self.post(self.admin, {'action': 'approve', 'requests': ids[:2]})
+        self.post(self.admin, {'action': 'reject', 'requests': ids, 'rejection_reason': 'No stock'})
+        statuses = dict(BloodRequest.objects.values_list('pk', 'status'))
+        self.assertEqual([statuses[pk] for pk in ids], ['approved', 'approved', 'rejected', 'fulfilled'])
+        rejected = BloodRequest.objects.get(pk=ids[2])
+        self.assertEqual((rejected.approved_by, rejected.rejection_reason), (self.admin, 'No stock'))
+        self.assertEqual(rebuild_stats(), {})
+        self.assertEqual(
+            list(OutboxMessage.objects.values_list('subject', flat=True)),
+            ['Blood Request Approved'] * 2 + ['Blood Request Rejected'],
+        )
 
-# Create your tests here.
+    def test_non_admins_are_turned_away(self):
+        response = self.post(self.requester, {'action': 'approve', 'requests': [self.requests[0].pk]})
+        self.assertRedirects(response, '/', fetch_redirect_response=False)
+        self.assertEqual(BloodRequest.objects.filter(status='pending').count(), 3)
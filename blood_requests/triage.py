@@ -0,0 +1,46 @@
+"""
+Triage queue for pending blood requests.
+
+Each request stores a ``priority_score`` (see ``compute_priority_score``)
+that is set on save and refreshed daily by ``refresh_priorities`` as
+deadlines come closer. Pending requests are indexed by score, so the next
+requests to review are one range read of ``request_triage_idx``.
+"""
+from django.utils import timezone
+
+from .models import BloodRequest, compute_priority_score
+
+
+TRIAGE_ORDERING = ('-priority_score', 'required_by_date', 'id')
+
+
+def triage_queue():
+    """Pending requests, most urgent first"""
+    return BloodRequest.objects.filter(status='pending').order_by(*TRIAGE_ORDERING)
+
+
+def next_to_triage(n=10):
+    return list(triage_queue()[:n])
+
+
+def refresh_priorities(today=None, batch_size=1000):
+    """
+    Recompute the score of every open request and write the ones that
+    changed. Returns the number of requests updated.
+    """
+    today = today or timezone.localdate()
+    rows = BloodRequest.objects.filter(status__in=('pending', 'approved')).values_list(
+        'pk', 'urgency', 'required_by_date', 'units_required', 'priority_score'
+    ).order_by('pk')
+    changed = []
+    updated = 0
+    for pk, urgency, required_by_date, units_required, current in rows.iterator(chunk_size=batch_size):
+        score = compute_priority_score(urgency, required_by_date, units_required, today)
+        if score != current:
+            changed.append(BloodRequest(pk=pk, priority_score=score))
+        if len(changed) == batch_size:
+            BloodRequest.objects.bulk_update(changed, ['priority_score'])
+            updated += len(changed)
+            changed = []
+    BloodRequest.objects.bulk_update(changed, ['priority_score'])
+    return updated + len(changed)
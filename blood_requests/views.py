@@ -1,11 +1,20 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db import transaction
 from django.utils import timezone
 from .models import BloodRequest
+from .approvals import set_request_status, status_email
+from .allocation import apply_plan, plan_allocations
+from .triage import TRIAGE_ORDERING, triage_queue
 from .forms import BloodRequestForm, BloodRequestUpdateForm
-from django.core.mail import send_mail
-from django.conf import settings
+from blood_banks.ledger import AlreadyRecorded, InsufficientInventory, fulfil_request
+from donors.matching import find_compatible_donors
+from blood_management.csv_export import stream_csv
+from blood_management.pagination import paginate
+from notifications.fanout import start_fanout
+from notifications.outbox import admin_email, queue_email
 
 
 @login_required
@@ -16,21 +25,17 @@ def blood_request_create(request):
         if form.is_valid():
             blood_request = form.save(commit=False)
             blood_request.requester = request.user
-            blood_request.save()
-            messages.success(request, 'Blood request submitted successfully! You will be notified once it is reviewed.')
-            
-            # Send email notification to admins (bonus feature)
-            # This will print to console in development
-            try:
-                send_mail(
+            with transaction.atomic():
+                blood_request.save()
+                # Email the admins once the request is committed (sent by send_outbox)
+                queue_email(
                     'New Blood Request',
                     f'A new blood request for {blood_request.blood_group} has been submitted by {request.user.username}.',
-                    settings.DEFAULT_FROM_EMAIL if hasattr(settings, 'DEFAULT_FROM_EMAIL') else 'noreply@bloodbank.com',
-                    [settings.ADMIN_EMAIL if hasattr(settings, 'ADMIN_EMAIL') else 'admin@bloodbank.com'],
-                    fail_silently=True,
+                    admin_email(),
                 )
-            except:
-                pass
+                # Critical and high urgency: alert compatible donors (fan_out_donor_alerts)
+                start_fanout(blood_request)
+            messages.success(request, 'Blood request submitted successfully! You will be notified once it is reviewed.')
             
             return redirect('blood_request_list')
     else:
@@ -42,14 +47,61 @@ def blood_request_create(request):
 @login_required
 def blood_request_list(request):
     """List blood requests"""
-    if request.user.user_type == 'admin':
+    triage = request.user.user_type == 'admin' and request.GET.get('queue') == 'triage'
+    if triage:
+        # Pending requests by stored priority: a range read of the triage index
+        requests = triage_queue()
+        ordering = TRIAGE_ORDERING
+    elif request.user.user_type == 'admin':
         # Admin sees all requests
-        requests = BloodRequest.objects.all().order_by('-requested_date')
+        requests = BloodRequest.objects.all()
+        ordering = ('-requested_date', '-id')
     else:
         # Donors see only their requests
-        requests = BloodRequest.objects.filter(requester=request.user).order_by('-requested_date')
+        requests = BloodRequest.objects.filter(requester=request.user)
+        ordering = ('-requested_date', '-id')
+    
+    page_obj = paginate(request, requests, ordering)
+    
+    return render(request, 'blood_requests/request_list.html', {'requests': page_obj, 'page_obj': page_obj, 'triage': triage})
+
+
+@login_required
+def blood_request_bulk_action(request):
+    """Approve or reject the selected pending requests in one go (Admin only)"""
+    if request.user.user_type != 'admin':
+        messages.error(request, 'Access denied. Admins only.')
+        return redirect('home')
+    
+    if request.method != 'POST':
+        return redirect('blood_request_list')
     
-    return render(request, 'blood_requests/request_list.html', {'requests': requests})
+    ids = [pk for pk in request.POST.getlist('requests') if pk.isdigit()]
+    status = {'approve': 'approved', 'reject': 'rejected'}.get(request.POST.get('action'))
+    if not ids or status is None:
+        messages.error(request, 'Select at least one request and an action.')
+        return redirect('blood_request_list')
+    
+    updated = set_request_status(ids, status, request.user, rejection_reason=request.POST.get('rejection_reason', ''))
+    messages.success(request, f'{len(updated)} blood request(s) {status}.')
+    
+    return redirect('blood_request_list')
+
+
+@login_required
+def blood_request_export(request):
+    """Download blood requests as CSV (all for admins, own requests otherwise)"""
+    if request.user.user_type == 'admin':
+        requests = BloodRequest.objects.all()
+    else:
+        requests = BloodRequest.objects.filter(requester=request.user)
+    
+    header = [
+        'id', 'patient_name', 'blood_group', 'units_required', 'urgency', 'hospital_name', 'city',
+        'status', 'requested_date', 'required_by_date', 'fulfilled_from_id',
+    ]
+    rows = requests.values_list(*header).order_by('id')
+    return stream_csv('blood_requests.csv', header, rows)
 
 
 @login_required
@@ -62,7 +114,15 @@ def blood_request_detail(request, pk):
         messages.error(request, 'You do not have permission to view this request.')
         return redirect('blood_request_list')
     
-    return render(request, 'blood_requests/request_detail.html', {'blood_request': blood_request})
+    context = {'blood_request': blood_request}
+    
+    # Show admins the donors in the same city who can give to this patient
+    if request.user.user_type == 'admin':
+        context['compatible_donors'] = find_compatible_donors(
+            blood_request.blood_group, city=blood_request.city
+        ).select_related('user')[:10]
+    
+    return render(request, 'blood_requests/request_detail.html', context)
 
 
 @login_required
@@ -73,6 +133,7 @@ def blood_request_update(request, pk):
         return redirect('home')
     
     blood_request = get_object_or_404(BloodRequest, pk=pk)
+    previous_status = blood_request.status
     
     if request.method == 'POST':
         form = BloodRequestUpdateForm(request.POST, instance=blood_request)
@@ -81,22 +142,24 @@ def blood_request_update(request, pk):
             if updated_request.status in ['approved', 'rejected']:
                 updated_request.approved_by = request.user
                 updated_request.approved_date = timezone.now()
-            updated_request.save()
+            try:
+                with transaction.atomic():
+                    updated_request.save()
+                    # Take the units out of the supplying bank's stock in the same transaction
+                    if updated_request.status == 'fulfilled' and previous_status != 'fulfilled':
+                        fulfil_request(updated_request, updated_request.fulfilled_from, user=request.user)
+                    # Notify the requester (sent by send_outbox)
+                    queue_email(*status_email(updated_request))
+            except InsufficientInventory:
+                form.add_error('fulfilled_from', 'This blood bank does not have enough units in stock.')
+            except AlreadyRecorded:
+                form.add_error('status', 'This request has already been fulfilled from inventory.')
+            if form.errors:
+                blood_request.status = previous_status
+                return render(request, 'blood_requests/request_update.html', {'form': form, 'blood_request': blood_request})
             
             messages.success(request, f'Blood request status updated to {updated_request.get_status_display()}.')
             
-            # Send email notification to requester (bonus feature)
-            try:
-                send_mail(
-                    f'Blood Request {updated_request.get_status_display()}',
-                    f'Your blood request for {blood_request.blood_group} has been {updated_request.get_status_display().lower()}.',
-                    settings.DEFAULT_FROM_EMAIL if hasattr(settings, 'DEFAULT_FROM_EMAIL') else 'noreply@bloodbank.com',
-                    [blood_request.requester.email],
-                    fail_silently=True,
-                )
-            except:
-                pass
-            
             return redirect('blood_request_detail', pk=pk)
     else:
         form = BloodRequestUpdateForm(instance=blood_request)
@@ -120,3 +183,26 @@ def blood_request_delete(request, pk):
         return redirect('blood_request_list')
     
     return render(request, 'blood_requests/request_confirm_delete.html', {'blood_request': blood_request})
+
+
+@login_required
+def blood_request_allocate(request):
+    """
+    Allocate bank stock to open requests (Admin only).
+    
+    GET returns the allocation plan as a dry run; POST fulfils it.
+    """
+    if request.user.user_type != 'admin':
+        return JsonResponse({'error': 'Admins only.'}, status=403)
+    
+    plans = plan_allocations()
+    result = {
+        'dry_run': request.method != 'POST',
+        'open_requests': len(plans),
+        'plans': [plan.as_dict() for plan in plans],
+    }
+    if request.method == 'POST':
+        fulfilled, skipped = apply_plan([plan for plan in plans if plan.fulfilled], user=request.user)
+        result.update(fulfilled=fulfilled, skipped=skipped)
+    
+    return JsonResponse(result)
@@ -1,13 +1,16 @@
-from django.contrib import admin
-from .models import DonorProfile, DonationHistory
+from django.contrib import admin, messages
+from blood_banks.approvals import approve_donations, reject_donations
+from blood_banks.ledger import AlreadyRecorded
+from search.admin import FullTextSearchAdminMixin
+from .models import City, DonorProfile, DonationHistory
 
 
 @admin.register(DonorProfile)
-class DonorProfileAdmin(admin.ModelAdmin):
-    list_display = ['user', 'blood_group', 'city', 'is_available', 'last_donation_date']
+class DonorProfileAdmin(FullTextSearchAdminMixin, admin.ModelAdmin):
+    list_display = ['user', 'blood_group', 'city', 'is_available', 'last_donation_date', 'next_eligible_date', 'donation_count']
     list_filter = ['blood_group', 'is_available', 'city', 'gender']
-    search_fields = ['user__username', 'user__email', 'user__first_name', 'user__last_name', 'city']
-    readonly_fields = ['created_at', 'updated_at']
+    search_fields = ['user__username', 'user__email', 'user__first_name', 'user__last_name', 'city', 'address']
+    readonly_fields = ['next_eligible_date', 'donation_count', 'approved_units', 'last_approved_date', 'created_at', 'updated_at']
     
     fieldsets = (
         ('User Information', {
@@ -17,10 +20,13 @@ class DonorProfileAdmin(admin.ModelAdmin):
             'fields': ('blood_group', 'date_of_birth', 'gender', 'is_available')
         }),
         ('Contact Information', {
-            'fields': ('address', 'city', 'state', 'zip_code')
+            'fields': ('address', 'city', 'state', 'zip_code', 'latitude', 'longitude')
         }),
         ('Medical Information', {
-            'fields': ('medical_conditions', 'last_donation_date')
+            'fields': ('medical_conditions', 'last_donation_date', 'next_eligible_date')
+        }),
+        ('Donations', {
+            'fields': ('donation_count', 'approved_units', 'last_approved_date')
         }),
         ('Profile', {
             'fields': ('profile_photo',)
@@ -38,6 +44,7 @@ class DonationHistoryAdmin(admin.ModelAdmin):
     list_filter = ['status', 'donation_date', 'blood_bank']
     search_fields = ['donor__user__username', 'donor__user__email']
     readonly_fields = ['created_at', 'updated_at']
+    actions = ['approve_selected', 'reject_selected']
     
     fieldsets = (
         ('Donor Information', {
@@ -71,3 +78,24 @@ class DonationHistoryAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+    
+    @admin.action(description='Approve selected donations')
+    def approve_selected(self, request, queryset):
+        try:
+            donations = approve_donations(queryset.values_list('pk', flat=True), request.user)
+        except AlreadyRecorded:
+            self.message_user(request, 'Some of these donations were already credited. Nothing was changed.', messages.ERROR)
+            return
+        self.message_user(request, f'{len(donations)} donation(s) approved.', messages.SUCCESS)
+    
+    @admin.action(description='Reject selected pending donations')
+    def reject_selected(self, request, queryset):
+        donations = reject_donations(queryset.values_list('pk', flat=True), request.user)
+        self.message_user(request, f'{len(donations)} donation(s) rejected.', messages.SUCCESS)
+
+
+@admin.register(City)
+class CityAdmin(admin.ModelAdmin):
+    list_display = ['name', 'donor_count', 'available_donor_count']
+    search_fields = ['name']
+    readonly_fields = ['key', 'donor_count', 'available_donor_count']
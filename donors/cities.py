@@ -0,0 +1,58 @@
+"""
+Incremental maintenance of the City dictionary table.
+
+Donor profiles keep ``city`` as free text; every save and delete moves the
+per-city donor counts by the difference, so filter dropdowns and
+autocomplete read a few City rows instead of sorting the donor table.
+"""
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import Greatest
+
+from .models import City, DonorProfile, normalize_city
+
+
+def adjust_city_counts(city_name, donors=0, available=0):
+    """
+    Add ``donors`` and ``available`` (which may be negative) to a city's
+    counts. Counts that drifted low stop at zero instead of failing the
+    save; ``rebuild_city_counts`` puts them right.
+    """
+    key = normalize_city(city_name)
+    if not key or (donors == 0 and available == 0):
+        return
+    city, _ = City.objects.get_or_create(key=key, defaults={'name': ' '.join(city_name.split())})
+    City.objects.filter(pk=city.pk).update(
+        donor_count=Greatest(F('donor_count') + donors, 0),
+        available_donor_count=Greatest(F('available_donor_count') + available, 0),
+    )
+
+
+def rebuild_city_counts():
+    """Recompute every city's counts from the donor table; returns the number of cities"""
+    totals = {}
+    rows = DonorProfile.objects.values('city').annotate(
+        donors=Count('id'), available=Count('id', filter=Q(is_available=True))
+    ).order_by()
+    for row in rows:
+        key = normalize_city(row['city'])
+        if not key:
+            continue
+        name, donors, available = totals.get(key, (' '.join(row['city'].split()), 0, 0))
+        totals[key] = (name, donors + row['donors'], available + row['available'])
+
+    with transaction.atomic():
+        existing = {city.key: city for city in City.objects.all()}
+        for key, city in existing.items():
+            if key not in totals:
+                city.donor_count = city.available_donor_count = 0
+        new = []
+        for key, (name, donors, available) in totals.items():
+            city = existing.get(key)
+            if city is None:
+                new.append(City(key=key, name=name, donor_count=donors, available_donor_count=available))
+            else:
+                city.donor_count, city.available_donor_count = donors, available
+        City.objects.bulk_update(existing.values(), ['donor_count', 'available_donor_count'], batch_size=1000)
+        City.objects.bulk_create(new, batch_size=1000)
+    return len(totals)
@@ -0,0 +1,144 @@
+"""
+Denormalized donation totals on donor profiles and blood banks.
+
+``donation_count``, ``approved_units`` and ``last_approved_date`` cover the
+donations whose status is one of ``DonationHistory.COUNTED_STATUSES``. Signals
+apply each status change with single-statement ``F()`` updates, so concurrent
+approvals never lose an increment; ``recompute_donation_counters`` rebuilds
+the totals from donation history to fix drift from bulk writes.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DateField, F, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from blood_banks.models import BloodBank
+from .models import DonorProfile, DonationHistory
+
+
+COUNTER_FIELDS = ('donation_count', 'approved_units', 'last_approved_date')
+
+# Counter owner -> DonationHistory foreign key that points at it
+OWNERS = ((DonorProfile, 'donor'), (BloodBank, 'blood_bank'))
+
+
+def counted_values(donation):
+    """``(donor_id, blood_bank_id, units, donation_date)`` if the donation counts, else None"""
+    if donation.status not in DonationHistory.COUNTED_STATUSES:
+        return None
+    return donation.donor_id, donation.blood_bank_id, Decimal(donation.units), donation.donation_date
+
+
+# Stored columns ``stored_counted_values`` reads, in order
+STORED_FIELDS = ('status', 'donor_id', 'blood_bank_id', 'units', 'donation_date')
+
+
+def stored_counted_values(row):
+    """The counted values of a stored ``STORED_FIELDS`` row (None for no row)"""
+    if row is None or row[0] not in DonationHistory.COUNTED_STATUSES:
+        return None
+    return row[1], row[2], Decimal(row[3]), row[4]
+
+
+def _latest_counted_date(fk_field):
+    return Subquery(
+        DonationHistory.objects.filter(
+            **{fk_field: OuterRef('pk')}, status__in=DonationHistory.COUNTED_STATUSES
+        ).order_by('-donation_date').values('donation_date')[:1]
+    )
+
+
+def add_donation(owner_ids, units, donation_date):
+    """Count one donation for each owner in ``(donor_id, blood_bank_id)``"""
+    for (model, _), pk in zip(OWNERS, owner_ids):
+        if pk is None:
+            continue
+        model.objects.filter(pk=pk).update(
+            donation_count=F('donation_count') + 1,
+            approved_units=F('approved_units') + units,
+            last_approved_date=Greatest(
+                Coalesce('last_approved_date', Value(donation_date)), Value(donation_date),
+                output_field=DateField(),
+            ),
+        )
+
+
+def add_donations(rows):
+    """
+    Count many donations at once from ``(donor_id, blood_bank_id, units,
+    donation_date)`` rows. Owners that gain the same totals share one
+    ``F()`` update, so a batch costs a handful of statements rather than one
+    per donation.
+    """
+    for index, (model, _) in enumerate(OWNERS):
+        totals = defaultdict(lambda: (0, Decimal(0), None))
+        for row in rows:
+            pk = row[index]
+            if pk is None:
+                continue
+            count, units, latest = totals[pk]
+            totals[pk] = (count + 1, units + Decimal(row[2]), max(latest or row[3], row[3]))
+        owners = defaultdict(list)
+        for pk, total in totals.items():
+            owners[total].append(pk)
+        for (count, units, latest), pks in owners.items():
+            model.objects.filter(pk__in=pks).update(
+                donation_count=F('donation_count') + count,
+                approved_units=F('approved_units') + units,
+                last_approved_date=Greatest(
+                    Coalesce('last_approved_date', Value(latest)), Value(latest), output_field=DateField(),
+                ),
+            )
+
+
+def remove_donation(owner_ids, units):
+    """Stop counting one donation; the latest date is re-read from donation history"""
+    for (model, fk_field), pk in zip(OWNERS, owner_ids):
+        if pk is None:
+            continue
+        model.objects.filter(pk=pk).update(
+            donation_count=F('donation_count') - 1,
+            approved_units=F('approved_units') - units,
+            last_approved_date=_latest_counted_date(fk_field),
+        )
+
+
+def apply_donation_change(old, new):
+    """Move the counters from the ``old`` counted values to the ``new`` ones"""
+    if old == new:
+        return
+    if old is not None:
+        remove_donation(old[:2], old[2])
+    if new is not None:
+        add_donation(new[:2], new[2], new[3])
+
+
+def recompute_donation_counters():
+    """
+    Rebuild every donor's and blood bank's totals from donation history.
+
+    Returns the number of rows whose stored totals were wrong.
+    """
+    corrected = 0
+    with transaction.atomic():
+        for model, fk_field in OWNERS:
+            totals = defaultdict(lambda: (0, Decimal(0), None))
+            rows = DonationHistory.objects.filter(
+                status__in=DonationHistory.COUNTED_STATUSES, **{f'{fk_field}__isnull': False}
+            ).values(fk_field).annotate(
+                count=Count('id'), units=Sum('units'), latest=Max('donation_date')
+            ).order_by()
+            for row in rows:
+                # SQLite sums decimals as floats; round back to the column's precision
+                totals[row[fk_field]] = (row['count'], row['units'].quantize(Decimal('0.01')), row['latest'])
+
+            stale = []
+            for pk, *stored in model.objects.values_list('pk', *COUNTER_FIELDS).iterator(chunk_size=2000):
+                count, units, latest = totals[pk]
+                if (stored[0], stored[1], stored[2]) != (count, units, latest):
+                    stale.append(model(pk=pk, donation_count=count, approved_units=units, last_approved_date=latest))
+            model.objects.bulk_update(stale, COUNTER_FIELDS, batch_size=1000)
+            corrected += len(stale)
+    return corrected
@@ -7,7 +7,7 @@ class DonorProfileForm(forms.ModelForm):
     class Meta:
         model = DonorProfile
         fields = ['blood_group', 'date_of_birth', 'gender', 'address', 'city', 'state', 'zip_code', 
-                  'is_available', 'medical_conditions', 'profile_photo']
+                  'latitude', 'longitude', 'is_available', 'medical_conditions', 'profile_photo']
         widgets = {
             'blood_group': forms.Select(attrs={'class': 'form-control'}),
             'date_of_birth': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
@@ -16,6 +16,8 @@ class DonorProfileForm(forms.ModelForm):
             'city': forms.TextInput(attrs={'class': 'form-control'}),
             'state': forms.TextInput(attrs={'class': 'form-control'}),
             'zip_code': forms.TextInput(attrs={'class': 'form-control'}),
+            'latitude': forms.NumberInput(attrs={'class': 'form-control', 'step': 'any'}),
+            'longitude': forms.NumberInput(attrs={'class': 'form-control', 'step': 'any'}),
             'is_available': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
             'medical_conditions': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
             'profile_photo': forms.FileInput(attrs={'class': 'form-control'}),
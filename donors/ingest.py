@@ -0,0 +1,215 @@
+"""
+Bulk ingestion of partner donation records.
+
+Partner hospitals send donations as JSON lines, one object per line::
+
+    {"donor_email": "a@example.com", "donation_date": "2026-10-01", "units": "1.00", "blood_bank": 3}
+
+``donor`` (a donor profile id) may be given instead of ``donor_email``;
+``blood_bank`` and ``notes`` are optional and other keys are ignored. The
+input is read as a stream and handled ``chunk_size`` lines at a time: each
+chunk is parsed and checked, its donors, blood banks and already recorded
+donations are looked up with one query each, and its valid rows are saved
+with ``bulk_create`` in a transaction of their own. Unlike the inventory CSV
+import, a bad line does not stop the ingest: it is reported with its line
+number and the other lines are kept. A record matching an existing donation
+(same donor, date and blood bank) is counted as a duplicate and skipped, so
+a file sent twice is only recorded once. Records arrive pending, like
+donations entered by donors, and are reviewed through the usual approval.
+"""
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from blood_banks.models import BloodBank
+from blood_banks.stats import apply_deltas, change_deltas
+from blood_management.fragment_cache import bump_after_write
+from .models import DonorProfile, DonationHistory
+
+
+CHUNK_SIZE = 2000
+# Errors kept in the report; later ones are only counted
+MAX_ERRORS = 1000
+
+# Rows per INSERT statement (bulk_create lowers it to the database's parameter limit)
+BATCH_SIZE = 500
+
+_date_field = DonationHistory._meta.get_field('donation_date')
+_units_field = DonationHistory._meta.get_field('units')
+_notes_field = DonationHistory._meta.get_field('notes')
+
+
+@dataclass
+class IngestResult:
+    lines: int = 0
+    created: int = 0
+    # Records already on file, skipped
+    duplicates: int = 0
+    failed: int = 0
+    # {'line': number, 'errors': {field: message}} for the first MAX_ERRORS bad lines
+    errors: list = field(default_factory=list)
+
+
+def _clean(model_field, value):
+    try:
+        return model_field.clean(value, None), None
+    except ValidationError as e:
+        return None, ' '.join(e.messages)
+    except TypeError:
+        # A JSON number or list where text was expected
+        return None, model_field.error_messages['invalid'] % {'value': value}
+
+
+def _id(value):
+    # JSON true/false are ints to Python but never valid ids
+    if isinstance(value, bool):
+        raise ValueError(value)
+    return int(value)
+
+
+def _parse_line(text):
+    """``(fields, errors)`` for one line; ``fields`` is None when ``errors`` is not empty"""
+    try:
+        record = json.loads(text)
+    except ValueError as e:
+        return None, {'line': f'Invalid JSON: {e}'}
+    if not isinstance(record, dict):
+        return None, {'line': 'Expected a JSON object.'}
+
+    fields, errors = {}, {}
+    if record.get('donor') is not None:
+        try:
+            fields['donor'] = _id(record['donor'])
+        except (TypeError, ValueError):
+            errors['donor'] = 'A donor profile id is required.'
+    elif isinstance(record.get('donor_email'), str) and record['donor_email'].strip():
+        fields['donor_email'] = record['donor_email'].strip()
+    else:
+        errors['donor'] = 'Give donor or donor_email.'
+
+    fields['donation_date'], error = _clean(_date_field, record.get('donation_date'))
+    if error:
+        errors['donation_date'] = error
+    units = record.get('units')
+    fields['units'], error = _clean(_units_field, str(units) if isinstance(units, float) else units)
+    if error:
+        errors['units'] = error
+    elif fields['units'] <= 0:
+        errors['units'] = 'Units must be greater than zero.'
+
+    if record.get('blood_bank') is not None:
+        try:
+            fields['blood_bank'] = _id(record['blood_bank'])
+        except (TypeError, ValueError):
+            errors['blood_bank'] = 'A blood bank id is required.'
+    notes = record.get('notes')
+    fields['notes'], error = _clean(_notes_field, '' if notes is None else notes)
+    if error:
+        errors['notes'] = error
+
+    if errors:
+        return None, errors
+    return fields, None
+
+
+def _ingest_chunk(rows, report):
+    """
+    Look up the donors and banks of ``(line, fields)`` rows and save the valid
+    ones that are not on file yet. Returns ``(created, duplicates)``.
+    """
+    emails = {fields['donor_email'] for _, fields in rows if 'donor_email' in fields}
+    donor_ids = {fields['donor'] for _, fields in rows if 'donor' in fields}
+    bank_ids = {fields['blood_bank'] for _, fields in rows if 'blood_bank' in fields}
+    by_email = known_donors = known_banks = {}
+    if emails:
+        by_email = dict(DonorProfile.objects.filter(user__email__in=emails).values_list('user__email', 'pk').order_by())
+    if donor_ids:
+        known_donors = set(DonorProfile.objects.filter(pk__in=donor_ids).values_list('pk', flat=True).order_by())
+    if bank_ids:
+        known_banks = set(BloodBank.objects.filter(pk__in=bank_ids).values_list('pk', flat=True).order_by())
+
+    donations = []
+    for line, fields in rows:
+        errors = {}
+        if 'donor_email' in fields:
+            donor_id = by_email.get(fields['donor_email'])
+            if donor_id is None:
+                errors['donor_email'] = f'No donor profile for {fields["donor_email"]}.'
+        else:
+            donor_id = fields['donor']
+            if donor_id not in known_donors:
+                errors['donor'] = f'Unknown donor profile {donor_id}.'
+        bank_id = fields.get('blood_bank')
+        if bank_id is not None and bank_id not in known_banks:
+            errors['blood_bank'] = f'Unknown blood bank {bank_id}.'
+        if errors:
+            report(line, errors)
+            continue
+        donations.append(DonationHistory(
+            donor_id=donor_id, blood_bank_id=bank_id, donation_date=fields['donation_date'],
+            units=fields['units'], notes=fields['notes'], status='pending',
+        ))
+    if not donations:
+        return 0, 0
+
+    # Skip donations already recorded (through the (donor, donation_date) index)
+    # and repeats within the chunk
+    seen = set(DonationHistory.objects.filter(
+        donor_id__in={donation.donor_id for donation in donations},
+        donation_date__in={donation.donation_date for donation in donations},
+    ).values_list('donor_id', 'donation_date', 'blood_bank_id').order_by())
+    new = []
+    for donation in donations:
+        key = (donation.donor_id, donation.donation_date, donation.blood_bank_id)
+        if key not in seen:
+            seen.add(key)
+            new.append(donation)
+
+    if new:
+        with transaction.atomic():
+            DonationHistory.objects.bulk_create(new, batch_size=BATCH_SIZE)
+            # bulk_create sends no signals: pending donations do not move the
+            # donor or bank totals or the ledger, only the dashboard counts
+            apply_deltas({
+                stat: amount * len(new)
+                for stat, amount in change_deltas(DonationHistory, None, ('pending',)).items()
+            })
+            bump_after_write(DonationHistory)
+    return len(new), len(donations) - len(new)
+
+
+def ingest_donations(lines, chunk_size=CHUNK_SIZE, max_errors=MAX_ERRORS):
+    """
+    Insert the donation records in ``lines`` (an iterable of JSON text or
+    bytes lines, such as an open file or request). Blank lines are skipped.
+    Returns an ``IngestResult`` with the per-line errors.
+    """
+    result = IngestResult()
+
+    def report(line, errors):
+        result.failed += 1
+        if max_errors is None or len(result.errors) < max_errors:
+            result.errors.append({'line': line, 'errors': errors})
+
+    lines = iter(lines)
+    while True:
+        chunk = list(islice(lines, chunk_size))
+        if not chunk:
+            break
+        rows = []
+        for text in chunk:
+            result.lines += 1
+            if not text.strip():
+                continue
+            fields, errors = _parse_line(text)
+            if errors:
+                report(result.lines, errors)
+            else:
+                rows.append((result.lines, fields))
+        created, duplicates = _ingest_chunk(rows, report)
+        result.created += created
+        result.duplicates += duplicates
+    return result
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from donors.models import DonorProfile, compute_next_eligible_date
+
+
+class Command(BaseCommand):
+    help = 'Recomputes DonorProfile.next_eligible_date from the last donation date'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        profiles = DonorProfile.objects.only('id', 'last_donation_date', 'next_eligible_date')
+        
+        updated = 0
+        batch = []
+        for profile in profiles.order_by('pk').iterator(chunk_size=batch_size):
+            eligible = compute_next_eligible_date(profile.last_donation_date)
+            if profile.next_eligible_date != eligible:
+                profile.next_eligible_date = eligible
+                batch.append(profile)
+            if len(batch) >= batch_size:
+                updated += self.flush(batch)
+                batch = []
+        updated += self.flush(batch)
+        
+        self.stdout.write(self.style.SUCCESS(f'✓ Updated next eligible date for {updated} donor(s)'))
+
+    def flush(self, batch):
+        if batch:
+            with transaction.atomic():
+                DonorProfile.objects.bulk_update(batch, ['next_eligible_date'])
+        return len(batch)
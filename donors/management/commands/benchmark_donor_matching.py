@@ -0,0 +1,97 @@
+import random
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from accounts.models import User
+from donors.models import DonorProfile, normalize_city
+from donors.matching import BLOOD_GROUP_CODES, compatible_donor_groups, find_compatible_donors
+
+
+CITIES = ['Dhaka', 'Chittagong', 'Khulna', 'Rajshahi', 'Sylhet', 'Barisal', 'Rangpur', 'Mymensingh',
+          'Comilla', 'Gazipur', 'Narayanganj', 'Bogra', 'Jessore', 'Dinajpur', 'Cox\'s Bazar', 'Tangail']
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks compatible donor matching against the per-group search loop on a throwaway database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Number of donor profiles to generate')
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per recipient group')
+        parser.add_argument('--city', default='Dhaka')
+
+    def handle(self, *args, **options):
+        # Never touch the real database: run everything in a fresh test database
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.populate(options['rows'], options['batch_size'])
+            self.run_benchmark(options['city'], options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def populate(self, rows, batch_size):
+        self.stdout.write(f'Generating {rows:,} donor profiles...')
+        rng = random.Random(42)
+        groups = list(BLOOD_GROUP_CODES)
+        started = time.perf_counter()
+        for offset in range(0, rows, batch_size):
+            count = min(batch_size, rows - offset)
+            users = User.objects.bulk_create([
+                User(username=f'bench{i}', email=f'bench{i}@example.com', password='!', user_type='donor')
+                for i in range(offset, offset + count)
+            ])
+            profiles = []
+            for user in users:
+                blood_group = rng.choice(groups)
+                city = rng.choice(CITIES)
+                profiles.append(DonorProfile(
+                    user=user,
+                    blood_group=blood_group,
+                    blood_group_code=BLOOD_GROUP_CODES[blood_group],
+                    date_of_birth=date(1990, 1, 1),
+                    next_eligible_date=date(2008, 1, 1),
+                    gender='other',
+                    address='-',
+                    city=city,
+                    city_key=normalize_city(city),
+                    is_available=rng.random() < 0.7,
+                ))
+            DonorProfile.objects.bulk_create(profiles)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.stdout.write(f'  done in {time.perf_counter() - started:.1f}s')
+
+    def run_benchmark(self, city, repeat):
+        self.stdout.write(f'\n{"Recipient":<10}{"Donors":>10}{"Per-group loop":>18}{"Matching engine":>18}{"Speedup":>10}')
+        for recipient in BLOOD_GROUP_CODES:
+            loop_time, loop_count = self.time_it(repeat, lambda: self.per_group_loop(recipient, city))
+            engine_time, engine_count = self.time_it(
+                repeat, lambda: len(list(find_compatible_donors(recipient, city=city).values_list('id', flat=True)))
+            )
+            if loop_count != engine_count:
+                self.stdout.write(self.style.ERROR(f'Result mismatch for {recipient}: {loop_count} != {engine_count}'))
+            self.stdout.write(
+                f'{recipient:<10}{engine_count:>10,}{loop_time * 1000:>16.1f}ms{engine_time * 1000:>16.1f}ms'
+                f'{loop_time / engine_time:>9.1f}x'
+            )
+
+    def per_group_loop(self, recipient, city):
+        """What donor_search required before: one search per compatible group"""
+        count = 0
+        for blood_group in compatible_donor_groups(recipient):
+            donors = DonorProfile.objects.filter(is_available=True, blood_group=blood_group, city__icontains=city)
+            count += len(list(donors.values_list('id', flat=True)))
+        return count
+
+    def time_it(self, repeat, func):
+        best = None
+        result = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
@@ -0,0 +1,34 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from donors.ingest import CHUNK_SIZE, MAX_ERRORS, ingest_donations
+
+
+class Command(BaseCommand):
+    help = 'Adds pending donation records from a JSON lines file of partner donations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='JSON lines file to ingest, or - for standard input')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                            help='Lines validated and inserted per batch')
+        parser.add_argument('--max-errors', type=int, default=MAX_ERRORS,
+                            help='Bad lines listed in the report (all are counted)')
+
+    def handle(self, *args, **options):
+        kwargs = {'chunk_size': options['chunk_size'], 'max_errors': options['max_errors']}
+        if options['path'] == '-':
+            result = ingest_donations(sys.stdin, **kwargs)
+        else:
+            try:
+                with open(options['path'], encoding='utf-8-sig') as jsonl_file:
+                    result = ingest_donations(jsonl_file, **kwargs)
+            except OSError as e:
+                raise CommandError(f'Cannot read {options["path"]}: {e}')
+        # The per-line report, one JSON object per bad line
+        for error in result.errors:
+            self.stderr.write(json.dumps(error))
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Ingested {result.created} of {result.lines} lines, '
+            f'{result.duplicates} already recorded, {result.failed} rejected'
+        ))
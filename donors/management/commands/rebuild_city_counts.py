@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from donors.cities import rebuild_city_counts
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the City table and its donor counts from donor profiles'
+
+    def handle(self, *args, **options):
+        count = rebuild_city_counts()
+        self.stdout.write(self.style.SUCCESS(f'✓ Rebuilt donor counts for {count} cities'))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from donors.counters import recompute_donation_counters
+
+
+class Command(BaseCommand):
+    help = 'Recomputes donor and blood bank donation totals from donation history'
+
+    def handle(self, *args, **options):
+        corrected = recompute_donation_counters()
+        self.stdout.write(self.style.SUCCESS(f'✓ Donation counters recomputed ({corrected} rows corrected)'))
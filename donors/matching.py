@@ -0,0 +1,86 @@
+"""
+Blood group compatibility and donor matching.
+
+Blood groups are stored on ``DonorProfile`` as a small integer code so that
+"every donor who can give to X" becomes a single ``IN`` lookup on an indexed
+column instead of one query per compatible group.
+"""
+
+# Compact codes for each ABO/Rh group (stored in DonorProfile.blood_group_code)
+BLOOD_GROUP_CODES = {
+    'O-': 0,
+    'O+': 1,
+    'A-': 2,
+    'A+': 3,
+    'B-': 4,
+    'B+': 5,
+    'AB-': 6,
+    'AB+': 7,
+}
+
+CODE_BLOOD_GROUPS = {code: group for group, code in BLOOD_GROUP_CODES.items()}
+
+# Red cell compatibility: recipient group -> donor groups that can give to it
+COMPATIBLE_DONOR_GROUPS = {
+    'O-': ('O-',),
+    'O+': ('O-', 'O+'),
+    'A-': ('O-', 'A-'),
+    'A+': ('O-', 'O+', 'A-', 'A+'),
+    'B-': ('O-', 'B-'),
+    'B+': ('O-', 'O+', 'B-', 'B+'),
+    'AB-': ('O-', 'A-', 'B-', 'AB-'),
+    'AB+': ('O-', 'O+', 'A-', 'A+', 'B-', 'B+', 'AB-', 'AB+'),
+}
+
+
+def blood_group_code(blood_group):
+    """Return the compact code for a blood group such as 'AB+'"""
+    return BLOOD_GROUP_CODES[blood_group]
+
+
+def compatible_donor_groups(recipient_group):
+    """Blood groups that can donate to the given recipient group"""
+    return COMPATIBLE_DONOR_GROUPS[recipient_group]
+
+
+def compatible_donor_codes(recipient_group):
+    """Compact codes of the blood groups that can donate to the recipient"""
+    return [BLOOD_GROUP_CODES[group] for group in COMPATIBLE_DONOR_GROUPS[recipient_group]]
+
+
+def compatible_recipient_groups(donor_group):
+    """Blood groups that can receive from the given donor group"""
+    return tuple(
+        recipient for recipient, donors in COMPATIBLE_DONOR_GROUPS.items()
+        if donor_group in donors
+    )
+
+
+def is_compatible(donor_group, recipient_group):
+    """Check whether a donor group can give to a recipient group"""
+    return donor_group in COMPATIBLE_DONOR_GROUPS.get(recipient_group, ())
+
+
+def find_compatible_donors(recipient_group, city=None, available_only=True, queryset=None, on_date=None):
+    """
+    Return donors whose blood can be given to ``recipient_group``.
+
+    All compatible groups are fetched in one query through the
+    ``(is_available, city_key, blood_group_code)`` index. ``city`` matches
+    donors whose city has the same ``normalize_city`` key, so case and
+    spacing do not matter. With ``available_only`` donors must also be
+    eligible to donate on ``on_date`` (default today).
+    """
+    from django.utils import timezone
+    from .models import DonorProfile, normalize_city
+
+    if recipient_group not in COMPATIBLE_DONOR_GROUPS:
+        raise ValueError(f'Unknown blood group: {recipient_group}')
+
+    donors = queryset if queryset is not None else DonorProfile.objects.all()
+    if available_only:
+        on_date = on_date or timezone.localdate()
+        donors = donors.filter(is_available=True, next_eligible_date__lte=on_date)
+    if city:
+        donors = donors.filter(city_key=normalize_city(city))
+    return donors.filter(blood_group_code__in=compatible_donor_codes(recipient_group))
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+BLOOD_GROUP_CODES = {
+    'O-': 0,
+    'O+': 1,
+    'A-': 2,
+    'A+': 3,
+    'B-': 4,
+    'B+': 5,
+    'AB-': 6,
+    'AB+': 7,
+}
+
+
+def populate_blood_group_code(apps, schema_editor):
+    DonorProfile = apps.get_model('donors', 'DonorProfile')
+    for blood_group, code in BLOOD_GROUP_CODES.items():
+        DonorProfile.objects.filter(blood_group=blood_group).update(blood_group_code=code)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('donors', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='donorprofile',
+            name='blood_group_code',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, help_text='Compact blood group code used for compatibility matching'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(populate_blood_group_code, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blood_banks', '0003_hot_filter_indexes'),
+        ('donors', '0003_location'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='donationhistory',
+            index=models.Index(fields=['status', 'created_at'], name='donation_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donationhistory',
+            index=models.Index(fields=['created_at', 'id'], name='donation_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donationhistory',
+            index=models.Index(fields=['donor', 'donation_date'], name='donation_donor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donationhistory',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['created_at', 'id'], name='donation_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donorprofile',
+            index=models.Index(fields=['is_available', 'blood_group', 'city'], name='donor_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donorprofile',
+            index=models.Index(fields=['created_at', 'id'], name='donor_created_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:05
+
+import datetime
+
+from django.db import migrations, models
+
+
+DONATION_INTERVAL_DAYS = 56
+ALWAYS_ELIGIBLE = datetime.date(1900, 1, 1)
+
+
+def compute_next_eligible_date(last_donation_date):
+    if last_donation_date:
+        return last_donation_date + datetime.timedelta(days=DONATION_INTERVAL_DAYS)
+    return ALWAYS_ELIGIBLE
+
+
+def populate_next_eligible_date(apps, schema_editor):
+    DonorProfile = apps.get_model('donors', 'DonorProfile')
+    batch = []
+    for profile in DonorProfile.objects.only('id', 'last_donation_date').iterator(chunk_size=2000):
+        profile.next_eligible_date = compute_next_eligible_date(profile.last_donation_date)
+        batch.append(profile)
+        if len(batch) >= 2000:
+            DonorProfile.objects.bulk_update(batch, ['next_eligible_date'])
+            batch = []
+    DonorProfile.objects.bulk_update(batch, ['next_eligible_date'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('donors', '0004_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='donorprofile',
+            name='next_eligible_date',
+            field=models.DateField(default=datetime.date(1900, 1, 1), editable=False, help_text='Earliest date the donor may donate again'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(populate_next_eligible_date, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='donorprofile',
+            index=models.Index(fields=['is_available', 'next_eligible_date'], name='donor_eligible_idx'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:14
+
+from django.db import migrations, models
+
+
+def populate_cities(apps, schema_editor):
+    City = apps.get_model('donors', 'City')
+    DonorProfile = apps.get_model('donors', 'DonorProfile')
+    cities = {}
+    batch = []
+    for profile in DonorProfile.objects.only('id', 'city', 'is_available').iterator(chunk_size=2000):
+        key = ' '.join((profile.city or '').split()).lower()
+        profile.city_key = key
+        batch.append(profile)
+        if len(batch) >= 2000:
+            DonorProfile.objects.bulk_update(batch, ['city_key'])
+            batch = []
+        if not key:
+            continue
+        city = cities.setdefault(key, City(key=key, name=' '.join(profile.city.split())))
+        city.donor_count += 1
+        city.available_donor_count += int(profile.is_available)
+    DonorProfile.objects.bulk_update(batch, ['city_key'])
+    City.objects.bulk_create(cities.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('donors', '0005_next_eligible_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='City',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('key', models.CharField(help_text='Normalized name used for lookups', max_length=100, unique=True)),
+                ('donor_count', models.PositiveIntegerField(default=0)),
+                ('available_donor_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'City',
+                'verbose_name_plural': 'Cities',
+                'db_table': 'donor_cities',
+                'ordering': ['name'],
+                'indexes': [models.Index(fields=['name'], name='city_name_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='donorprofile',
+            name='city_key',
+            field=models.CharField(default='', editable=False, help_text='Normalized city used for matching, as City.key', max_length=100),
+            preserve_default=False,
+        ),
+        migrations.RunPython(populate_cities, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='donorprofile',
+            index=models.Index(fields=['is_available', 'city_key', 'blood_group_code'], name='donor_match_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:20
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+
+
+def populate_counters(apps, schema_editor):
+    DonationHistory = apps.get_model('donors', 'DonationHistory')
+    owners = ((apps.get_model('donors', 'DonorProfile'), 'donor'), (apps.get_model('blood_banks', 'BloodBank'), 'blood_bank'))
+    for model, fk_field in owners:
+        rows = DonationHistory.objects.filter(
+            status__in=('approved', 'completed'), **{f'{fk_field}__isnull': False}
+        ).values(fk_field).annotate(count=Count('id'), units=Sum('units'), latest=Max('donation_date')).order_by()
+        model.objects.bulk_update(
+            [model(pk=row[fk_field], donation_count=row['count'], approved_units=row['units'],
+                   last_approved_date=row['latest']) for row in rows],
+            ['donation_count', 'approved_units', 'last_approved_date'],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blood_banks', '0005_donation_counters'),
+        ('donors', '0006_city'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='donorprofile',
+            name='approved_units',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=8),
+        ),
+        migrations.AddField(
+            model_name='donorprofile',
+            name='donation_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Approved donations'),
+        ),
+        migrations.AddField(
+            model_name='donorprofile',
+            name='last_approved_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+def flag_credited_donations(apps, schema_editor):
+    DonationHistory = apps.get_model('donors', 'DonationHistory')
+    InventoryTransaction = apps.get_model('blood_banks', 'InventoryTransaction')
+    DonationHistory.objects.filter(
+        pk__in=InventoryTransaction.objects.filter(reason='donation', donation__isnull=False).values('donation')
+    ).update(ledger_recorded=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blood_banks', '0009_blood_units'),
+        ('donors', '0008_expired_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='donationhistory',
+            name='ledger_recorded',
+            field=models.BooleanField(default=False, editable=False, help_text='Credited to the inventory ledger'),
+        ),
+        migrations.RunPython(flag_credited_donations, migrations.RunPython.noop),
+    ]
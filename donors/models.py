@@ -1,9 +1,26 @@
 from django.db import models
 from django.conf import settings
-from django.core.validators import RegexValidator
+from django.core.validators import RegexValidator, MinValueValidator, MaxValueValidator
+from blood_management.counters import MaintainedCountersMixin
+from blood_management.geo import encode_geohash
+from .matching import BLOOD_GROUP_CODES
+from datetime import date, timedelta
 
 
-class DonorProfile(models.Model):
+# Whole blood deferral window between donations
+DONATION_INTERVAL_DAYS = 56
+# Stored for donors who have never donated: eligible on any date
+ALWAYS_ELIGIBLE = date(1900, 1, 1)
+
+
+def compute_next_eligible_date(last_donation_date=None):
+    """Earliest date a donor may give blood again after their last donation"""
+    if last_donation_date:
+        return last_donation_date + timedelta(days=DONATION_INTERVAL_DAYS)
+    return ALWAYS_ELIGIBLE
+
+
+class DonorProfile(MaintainedCountersMixin, models.Model):
     """Donor Profile model with personal and medical information"""
     BLOOD_GROUP_CHOICES = (
         ('A+', 'A+'),
@@ -24,37 +41,83 @@ class DonorProfile(models.Model):
     
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='donor_profile')
     blood_group = models.CharField(max_length=3, choices=BLOOD_GROUP_CHOICES)
+    blood_group_code = models.PositiveSmallIntegerField(editable=False, help_text="Compact blood group code used for compatibility matching")
     date_of_birth = models.DateField()
     gender = models.CharField(max_length=10, choices=GENDER_CHOICES)
     address = models.TextField()
     city = models.CharField(max_length=100)
+    city_key = models.CharField(max_length=100, editable=False, help_text="Normalized city used for matching, as City.key")
     state = models.CharField(max_length=100, blank=True)
     zip_code = models.CharField(max_length=10, blank=True)
+    latitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)])
+    geohash = models.CharField(max_length=12, blank=True, db_index=True, editable=False)
     is_available = models.BooleanField(default=True, help_text="Available for donation")
     last_donation_date = models.DateField(null=True, blank=True)
+    next_eligible_date = models.DateField(editable=False, help_text="Earliest date the donor may donate again")
+    donation_count = models.PositiveIntegerField(default=0, editable=False, help_text="Approved donations")
+    approved_units = models.DecimalField(max_digits=8, decimal_places=2, default=0, editable=False)
+    last_approved_date = models.DateField(null=True, blank=True, editable=False)
     medical_conditions = models.TextField(blank=True, help_text="Any medical conditions or allergies")
     profile_photo = models.ImageField(upload_to='donor_photos/', null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Maintained by donors.counters from donation history
+    counter_fields = ('donation_count', 'approved_units', 'last_approved_date')
+    
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.blood_group}"
     
+    def save(self, *args, **kwargs):
+        # Keep the compact code in sync with the display blood group
+        self.blood_group_code = BLOOD_GROUP_CODES[self.blood_group]
+        self.city_key = normalize_city(self.city)
+        self.geohash = encode_geohash(self.latitude, self.longitude) if self.has_location else ''
+        self.next_eligible_date = compute_next_eligible_date(self.last_donation_date)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'blood_group' in update_fields:
+                update_fields.add('blood_group_code')
+            if 'city' in update_fields:
+                update_fields.add('city_key')
+            if 'last_donation_date' in update_fields:
+                update_fields.add('next_eligible_date')
+            if update_fields & {'latitude', 'longitude'}:
+                update_fields.add('geohash')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+    
+    @property
+    def has_location(self):
+        return self.latitude is not None and self.longitude is not None
+    
     class Meta:
         db_table = 'donor_profiles'
         verbose_name = 'Donor Profile'
         verbose_name_plural = 'Donor Profiles'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['is_available', 'city_key', 'blood_group_code'], name='donor_match_idx'),
+            models.Index(fields=['is_available', 'blood_group', 'city'], name='donor_search_idx'),
+            models.Index(fields=['created_at', 'id'], name='donor_created_idx'),
+            models.Index(fields=['is_available', 'next_eligible_date'], name='donor_eligible_idx'),
+        ]
 
 
-class DonationHistory(models.Model):
+class DonationHistory(MaintainedCountersMixin, models.Model):
     """Donation history for tracking donor's donations"""
     STATUS_CHOICES = (
         ('pending', 'Pending'),
         ('approved', 'Approved'),
         ('rejected', 'Rejected'),
         ('completed', 'Completed'),
+        # Never approved within the shelf life of the blood (expire_stale_records)
+        ('expired', 'Expired'),
     )
+    # Statuses that count towards the donor and blood bank totals
+    COUNTED_STATUSES = ('approved', 'completed')
     
     donor = models.ForeignKey(DonorProfile, on_delete=models.CASCADE, related_name='donations')
     blood_bank = models.ForeignKey('blood_banks.BloodBank', on_delete=models.SET_NULL, null=True, blank=True)
@@ -63,9 +126,13 @@ class DonationHistory(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     notes = models.TextField(blank=True)
     approved_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='approved_donations')
+    ledger_recorded = models.BooleanField(default=False, editable=False, help_text="Credited to the inventory ledger")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Set once by blood_banks.ledger with a conditional update
+    counter_fields = ('ledger_recorded',)
+    
     def __str__(self):
         return f"{self.donor.user.username} - {self.donation_date} ({self.status})"
     
@@ -74,3 +141,36 @@ class DonationHistory(models.Model):
         verbose_name = 'Donation History'
         verbose_name_plural = 'Donation Histories'
         ordering = ['-donation_date']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='donation_status_idx'),
+            models.Index(fields=['created_at', 'id'], name='donation_created_idx'),
+            models.Index(fields=['donor', 'donation_date'], name='donation_donor_idx'),
+            models.Index(fields=['created_at', 'id'], condition=models.Q(status='pending'), name='donation_pending_idx'),
+            # Expiry sweep: stale pending donations, oldest first
+            models.Index(fields=['status', 'donation_date', 'id'], name='donation_overdue_idx'),
+        ]
+
+
+def normalize_city(name):
+    """Lookup key for a free-text city name: trimmed, single-spaced, lower case"""
+    return ' '.join((name or '').split()).lower()
+
+
+class City(models.Model):
+    """Cities that donors live in, with donor counts kept up to date by signals"""
+    name = models.CharField(max_length=100)
+    key = models.CharField(max_length=100, unique=True, help_text="Normalized name used for lookups")
+    donor_count = models.PositiveIntegerField(default=0)
+    available_donor_count = models.PositiveIntegerField(default=0)
+    
+    def __str__(self):
+        return self.name
+    
+    class Meta:
+        db_table = 'donor_cities'
+        verbose_name = 'City'
+        verbose_name_plural = 'Cities'
+        ordering = ['name']
+        indexes = [
+            models.Index(fields=['name'], name='city_name_idx'),
+        ]
@@ -0,0 +1,53 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from blood_management.stored_rows import on_pre_save
+from .cities import adjust_city_counts
+from .counters import STORED_FIELDS, apply_donation_change, counted_values, stored_counted_values
+from .models import DonorProfile, DonationHistory
+
+
+def remember_previous_city(instance, stored):
+    """Keep the stored city and availability so post_save can apply the difference"""
+    instance._previous_city = stored
+
+
+on_pre_save(DonorProfile, ('city', 'is_available'), remember_previous_city)
+
+
+@receiver(post_save, sender=DonorProfile)
+def update_city_counts_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_city', None)
+    if previous is not None:
+        old_city, old_available = previous
+        if old_city == instance.city and old_available == instance.is_available:
+            return
+        adjust_city_counts(old_city, donors=-1, available=-int(old_available))
+    adjust_city_counts(instance.city, donors=1, available=int(instance.is_available))
+
+
+@receiver(post_delete, sender=DonorProfile)
+def update_city_counts_on_delete(sender, instance, **kwargs):
+    adjust_city_counts(instance.city, donors=-1, available=-int(instance.is_available))
+
+
+def remember_previous_donation(instance, stored):
+    """Keep the stored counted values so post_save can apply the difference"""
+    instance._previous_counted = stored_counted_values(stored)
+
+
+on_pre_save(DonationHistory, STORED_FIELDS, remember_previous_donation)
+
+
+@receiver(post_save, sender=DonationHistory)
+def update_donation_counters_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    apply_donation_change(getattr(instance, '_previous_counted', None), counted_values(instance))
+
+
+@receiver(post_delete, sender=DonationHistory)
+def update_donation_counters_on_delete(sender, instance, **kwargs):
+    apply_donation_change(counted_values(instance), None)
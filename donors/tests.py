@@ -1,3 +1,431 @@
+import json
+import tempfile
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from accounts.models import User
+from blood_banks.models import BloodBank
+from blood_banks.stats import get_dashboard_stats, rebuild_stats
+from blood_management.testing import QueryPlanAssertionsMixin
+from .cities import rebuild_city_counts
+from .counters import recompute_donation_counters
+from .ingest import ingest_donations
+from .matching import (
+    BLOOD_GROUP_CODES, COMPATIBLE_DONOR_GROUPS, compatible_donor_codes, compatible_donor_groups,
+    compatible_recipient_groups, find_compatible_donors, is_compatible,
+)
+from .models import ALWAYS_ELIGIBLE, City, DonorProfile, DonationHistory, compute_next_eligible_date
+
+
+class DonorQueryPlanTests(QueryPlanAssertionsMixin, TestCase):
+    """The main query of every donor view must be answered from an index"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='donor', email='donor@example.com', password='donor123',
+            first_name='Test', last_name='Donor', user_type='donor'
+        )
+        cls.profile = DonorProfile.objects.create(
+            user=cls.user, blood_group='O+', date_of_birth=date(1990, 1, 1), gender='male',
+            address='12 Green Road', city='Dhaka', latitude=23.81, longitude=90.41
+        )
+        bank = BloodBank.objects.create(
+            name='Central Blood Bank', address='Shahbagh', city='Dhaka',
+            phone_number='0123456789', email='central@example.com'
+        )
+        DonationHistory.objects.create(donor=cls.profile, blood_bank=bank, donation_date=date.today(), units=1)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_donor_search(self):
+        for url in [
+            '/donors/search/',
+            '/donors/search/?blood_group=O%2B',
+            '/donors/search/?blood_group=AB%2B&compatible=on',
+            '/donors/search/?city=dhaka',
+            '/donors/search/?q=green',
+            '/donors/search/?near=23.8,90.4&radius_km=5',
+        ]:
+            # The city dropdown reads the small City dictionary table whole
+            self.assertNoFullScans(self.client, url, allow=['donor_cities'])
+
+    def test_donor_dashboard(self):
+        # The inventory matrix is built from the whole table, once per inventory version
+        self.assertNoFullScans(self.client, '/donors/dashboard/', allow=['blood_inventory', 'blood_banks'])
+
+    def test_donation_history_list(self):
+        self.assertNoFullScans(self.client, '/donors/donations/')
+
+    def test_city_autocomplete(self):
+        response = self.assertNoFullScans(self.client, '/donors/cities/autocomplete/?q=dh')
+        self.assertEqual(response.json()['results'][0]['name'], 'Dhaka')
+
+
+class DonationCounterTests(TestCase):
+    """Donor and blood bank totals follow donation status changes"""
+
+    def setUp(self):
+        user = User.objects.create_user(
+            username='donor', email='donor@example.com', password='donor123', user_type='donor'
+        )
+        self.profile = DonorProfile.objects.create(
+            user=user, blood_group='B+', date_of_birth=date(1990, 1, 1), gender='female',
+            address='7 Lake Circus', city='Dhaka'
+        )
+        self.bank = BloodBank.objects.create(
+            name='Central Blood Bank', address='Shahbagh', city='Dhaka',
+            phone_number='0123456789', email='central@example.com'
+        )
+
+    def donate(self, donation_date, units='1.00', status='pending'):
+        return DonationHistory.objects.create(
+            donor=self.profile, blood_bank=self.bank, donation_date=donation_date, units=Decimal(units), status=status
+        )
+
+    def assertTotals(self, count, units, latest):
+        for owner in (DonorProfile.objects.get(pk=self.profile.pk), BloodBank.objects.get(pk=self.bank.pk)):
+            self.assertEqual((owner.donation_count, owner.approved_units, owner.last_approved_date),
+                             (count, Decimal(units), latest))
+
+    def test_counters_follow_status_changes(self):
+        first = self.donate(date(2025, 1, 10))
+        second = self.donate(date(2025, 5, 2), units='0.50')
+        self.assertTotals(0, '0', None)
+
+        first.status = 'approved'
+        first.save()
+        second.status = 'completed'
+        second.save()
+        self.assertTotals(2, '1.50', date(2025, 5, 2))
+
+        second.status = 'rejected'
+        second.save()
+        self.assertTotals(1, '1.00', date(2025, 1, 10))
+
+        first.delete()
+        self.assertTotals(0, '0', None)
+
+    def test_profile_save_keeps_concurrent_increments(self):
+        stale = DonorProfile.objects.get(pk=self.profile.pk)
+        self.donate(date(2025, 3, 1), status='approved')
+        stale.city = 'Sylhet'
+        stale.save()
+        self.assertTotals(1, '1.00', date(2025, 3, 1))
+
+    def test_recompute_fixes_drift(self):
+        self.donate(date(2025, 3, 1), status='approved')
+        DonorProfile.objects.filter(pk=self.profile.pk).update(donation_count=9)
+        self.assertEqual(recompute_donation_counters(), 1)
+        self.assertTotals(1, '1.00', date(2025, 3, 1))
+        self.assertEqual(recompute_donation_counters(), 0)
+
+    def test_dashboard_total_donations(self):
+        for day in range(1, 8):
+            self.donate(date(2025, 1, day), status='approved')
+        self.client.force_login(self.profile.user)
+        response = self.client.get('/donors/dashboard/')
+        self.assertEqual(response.context['total_donations'], 7)
+
+
+class DonationIngestTests(TestCase):
+    """Partner donation records arrive as JSON lines and are inserted in chunks"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.bank = BloodBank.objects.create(
+            name='Central Blood Bank', address='Shahbagh', city='Dhaka',
+            phone_number='0123456789', email='central@example.com'
+        )
+        cls.profiles = []
+        for i in range(20):
+            user = User.objects.create_user(username=f'donor{i}', email=f'donor{i}@example.com', user_type='donor')
+            cls.profiles.append(DonorProfile.objects.create(
+                user=user, blood_group='O+', date_of_birth=date(1990, 1, 1), gender='male',
+                address='7 Lake Circus', city='Dhaka'
+            ))
+
+    def record(self, i, **fields):
+        # A new day for every round of the 20 donors, so each record is a distinct donation
+        day = date(2026, 10, 1) - timedelta(days=i // 20)
+        return json.dumps({
+            'donor_email': f'donor{i % 20}@example.com', 'donation_date': day.isoformat(), 'units': '1.00',
+            'blood_bank': self.bank.pk, **fields,
+        })
+
+    def test_valid_lines_are_inserted_pending(self):
+        lines = [self.record(0, units=1.5, notes='Camp'), '', json.dumps({
+            'donor': self.profiles[1].pk, 'donation_date': '2026-09-30', 'units': 1,
+        })]
+        result = ingest_donations(lines)
+        self.assertEqual(
+            (result.lines, result.created, result.duplicates, result.failed, result.errors), (3, 2, 0, 0, []),
+        )
+        first, second = DonationHistory.objects.order_by('pk')
+        self.assertEqual(
+            (first.donor, first.blood_bank, first.donation_date, first.units, first.status, first.notes),
+            (self.profiles[0], self.bank, date(2026, 10, 1), Decimal('1.50'), 'pending', 'Camp'),
+        )
+        self.assertEqual((second.donor, second.blood_bank, second.units), (self.profiles[1], None, Decimal('1.00')))
+        self.assertIsNotNone(first.created_at)
+
+    def test_rows_match_those_the_orm_saves(self):
+        # Fails when a DonationHistory column is added that the ingest writes differently from save()
+        ingest_donations([self.record(0, notes='Camp')])
+        ingested = DonationHistory.objects.get()
+        saved = DonationHistory.objects.create(
+            donor=self.profiles[0], blood_bank=self.bank, donation_date=date(2026, 10, 1), units=Decimal('1.00'),
+            notes='Camp',
+        )
+        saved.refresh_from_db()
+        for field in DonationHistory._meta.concrete_fields:
+            if field.name not in ('id', 'created_at', 'updated_at'):
+                self.assertEqual(field.value_from_object(ingested), field.value_from_object(saved), field.name)
+
+    def test_bad_lines_are_reported_and_the_rest_kept(self):
+        lines = [
+            self.record(0),
+            'not json',
+            '[1, 2]',
+            json.dumps({'donation_date': '2026-13-01', 'units': '1.005'}),
+            self.record(1, units=0),
+            self.record(2, donor_email='nobody@example.com', blood_bank=999999),
+            self.record(3, status='approved'),
+        ]
+        result = ingest_donations(lines, chunk_size=3)
+        self.assertEqual((result.lines, result.created, result.failed), (7, 2, 5))
+        errors = {error['line']: error['errors'] for error in result.errors}
+        self.assertEqual(sorted(errors), [2, 3, 4, 5, 6])
+        self.assertIn('Invalid JSON', errors[2]['line'])
+        self.assertEqual(set(errors[4]), {'donor', 'donation_date', 'units'})
+        self.assertEqual(errors[5], {'units': 'Units must be greater than zero.'})
+        self.assertEqual(set(errors[6]), {'donor_email', 'blood_bank'})
+        # Status is never taken from the partner
+        self.assertEqual(set(DonationHistory.objects.values_list('status', flat=True)), {'pending'})
+
+    def test_error_report_is_capped_but_all_are_counted(self):
+        result = ingest_donations(['{}'] * 30, max_errors=10)
+        self.assertEqual((result.failed, len(result.errors)), (30, 10))
+
+    def test_dashboard_stats_follow_the_ingest(self):
+        ingest_donations([self.record(i) for i in range(50)], chunk_size=20)
+        self.assertEqual(get_dashboard_stats()['donations']['pending'], 50)
+        self.assertEqual(rebuild_stats(), {})
+
+    def test_a_resent_file_is_not_recorded_twice(self):
+        lines = [self.record(i) for i in range(50)]
+        ingest_donations(lines[:30], chunk_size=20)
+        # The same donation twice in one chunk, and the whole file again
+        result = ingest_donations(lines + [lines[40]], chunk_size=20)
+        self.assertEqual((result.lines, result.created, result.duplicates, result.failed), (51, 20, 31, 0))
+        self.assertEqual(DonationHistory.objects.count(), 50)
+        self.assertEqual(get_dashboard_stats()['donations']['pending'], 50)
+        # The same donor and day at another bank is another donation
+        result = ingest_donations([self.record(0, blood_bank=None)])
+        self.assertEqual((result.created, result.duplicates), (1, 0))
+
+    def test_chunks_take_a_fixed_number_of_queries(self):
+        ingest_donations([self.record(0)])
+        lines = [self.record(i) for i in range(1000)]
+        # Per chunk: donor, bank and existing donation lookups, savepoint, six inserts
+        # (SQLite takes 999 parameters, 99 rows of ten columns), stats update, release
+        with self.assertNumQueries(24):
+            ingest_donations(lines, chunk_size=500)
+
+    def test_throughput(self):
+        lines = [self.record(i, notes='Camp') for i in range(20000)]
+        started = time.perf_counter()
+        result = ingest_donations(lines)
+        elapsed = time.perf_counter() - started
+        self.assertEqual(result.created, 20000)
+        # About 6k a second here; the floor leaves room for slower machines
+        self.assertGreater(result.created / elapsed, 1500)
+
+    def test_command_prints_the_report(self):
+        path = self.enterContext(tempfile.NamedTemporaryFile('w', suffix='.jsonl'))
+        path.write(self.record(0) + '\n{"units": 1}\n')
+        path.flush()
+        out, err = StringIO(), StringIO()
+        call_command('ingest_donations', path.name, stdout=out, stderr=err)
+        self.assertIn('Ingested 1 of 2 lines, 0 already recorded, 1 rejected', out.getvalue())
+        self.assertEqual(json.loads(err.getvalue())['line'], 2)
+
+
+class CompatibleDonorTests(TestCase):
+    """Red cell compatibility and the compatible donor search"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.profiles = {}
+        for i, group in enumerate(BLOOD_GROUP_CODES):
+            user = User.objects.create_user(username=f'donor{i}', email=f'donor{i}@example.com', user_type='donor')
+            cls.profiles[group] = DonorProfile.objects.create(
+                user=user, blood_group=group, date_of_birth=date(1990, 1, 1), gender='male',
+                address='7 Lake Circus', city='Dhaka'
+            )
+
+    def test_matrix(self):
+        self.assertEqual(compatible_donor_groups('O-'), ('O-',))
+        self.assertEqual(set(compatible_donor_groups('AB+')), set(BLOOD_GROUP_CODES))
+        self.assertEqual(set(compatible_recipient_groups('O-')), set(BLOOD_GROUP_CODES))
+        self.assertEqual(compatible_recipient_groups('AB+'), ('AB+',))
+        self.assertTrue(is_compatible('A-', 'AB+'))
+        self.assertFalse(is_compatible('A+', 'A-'))
+        self.assertFalse(is_compatible('B+', 'A+'))
+        self.assertFalse(is_compatible('O-', 'XX'))
+        for recipient, donors in COMPATIBLE_DONOR_GROUPS.items():
+            # Every group can receive its own blood and O-
+            self.assertIn(recipient, donors)
+            self.assertIn('O-', donors)
+            self.assertEqual(
+                sorted(compatible_donor_codes(recipient)), sorted(BLOOD_GROUP_CODES[group] for group in donors)
+            )
+
+    def test_find_compatible_donors(self):
+        found = {profile.blood_group for profile in find_compatible_donors('A+')}
+        self.assertEqual(found, {'O-', 'O+', 'A-', 'A+'})
+        self.assertEqual(list(find_compatible_donors('O-', city='Sylhet')), [])
+        DonorProfile.objects.filter(pk=self.profiles['O-'].pk).update(is_available=False)
+        self.assertEqual([profile.blood_group for profile in find_compatible_donors('O-')], [])
+        self.assertEqual(find_compatible_donors('O-', available_only=False).get(), self.profiles['O-'])
+        with self.assertRaises(ValueError):
+            find_compatible_donors('XX')
+
+    def test_compatible_search(self):
+        response = self.client.get('/donors/search/', {'blood_group': 'B-', 'compatible': 'on'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({profile.blood_group for profile in response.context['donors']}, {'O-', 'B-'})
+
+    def test_unknown_blood_group_is_ignored(self):
+        for params in ({'blood_group': 'XX', 'compatible': 'on'}, {'blood_group': 'XX'}):
+            response = self.client.get('/donors/search/', params)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['selected_blood_group'], '')
+            self.assertEqual(len(response.context['donors']), len(BLOOD_GROUP_CODES))
+
+
+class NextEligibleDateTests(TestCase):
+    """The stored deferral window behind the eligible donor searches"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', email='admin@example.com', user_type='admin')
+        user = User.objects.create_user(username='donor', email='donor@example.com', user_type='donor')
+        self.profile = DonorProfile.objects.create(
+            user=user, blood_group='O+', date_of_birth=date(2007, 6, 1), gender='male',
+            address='7 Lake Circus', city='Dhaka'
+        )
+        self.bank = BloodBank.objects.create(
+            name='Central Blood Bank', address='Shahbagh', city='Dhaka',
+            phone_number='0123456789', email='central@example.com'
+        )
+
+    def eligible_donors(self):
+        return list(self.client.get('/donors/search/').context['donors'])
+
+    def test_compute_next_eligible_date(self):
+        self.assertEqual(compute_next_eligible_date(None), ALWAYS_ELIGIBLE)
+        self.assertEqual(compute_next_eligible_date(date(2026, 1, 1)), date(2026, 2, 26))
+        self.assertEqual(compute_next_eligible_date(date(2024, 2, 29)), date(2024, 4, 25))
+
+    def test_save_keeps_the_date_in_step(self):
+        self.assertEqual(self.profile.next_eligible_date, ALWAYS_ELIGIBLE)
+        self.assertEqual(self.eligible_donors(), [self.profile])
+        self.profile.last_donation_date = date.today() - timedelta(days=10)
+        self.profile.save(update_fields=['last_donation_date'])
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.next_eligible_date, date.today() + timedelta(days=46))
+        self.assertEqual(self.eligible_donors(), [])
+
+    def test_approval_refreshes_the_date(self):
+        donation = DonationHistory.objects.create(
+            donor=self.profile, blood_bank=self.bank, donation_date=date.today() - timedelta(days=3), units=Decimal('0.45')
+        )
+        self.client.force_login(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/admin/donations/{donation.pk}/approve/')
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.last_donation_date, donation.donation_date)
+        self.assertEqual(self.profile.next_eligible_date, donation.donation_date + timedelta(days=56))
+        self.assertEqual(self.eligible_donors(), [])
+
+    def test_backfill_command(self):
+        self.profile.last_donation_date = date(2026, 1, 1)
+        self.profile.save()
+        DonorProfile.objects.filter(pk=self.profile.pk).update(next_eligible_date=date(2030, 1, 1))
+        out = StringIO()
+        call_command('backfill_next_eligible_date', stdout=out)
+        self.assertIn('Updated next eligible date for 1 donor(s)', out.getvalue())
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.next_eligible_date, date(2026, 2, 26))
+        out = StringIO()
+        call_command('backfill_next_eligible_date', '--batch-size', '1', stdout=out)
+        self.assertIn('Updated next eligible date for 0 donor(s)', out.getvalue())
+
+
+class CityCountTests(TestCase):
+    """Per-city donor counts follow profile saves and deletes"""
+
+    def make_donor(self, username, city, is_available=True):
+        user = User.objects.create_user(username=username, email=f'{username}@example.com', user_type='donor')
+        return DonorProfile.objects.create(
+            user=user, blood_group='A+', date_of_birth=date(1990, 1, 1), gender='female',
+            address='7 Lake Circus', city=city, is_available=is_available
+        )
+
+    def counts(self):
+        return {city.key: (city.donor_count, city.available_donor_count) for city in City.objects.all()}
+
+    def test_counts_follow_profile_changes(self):
+        first = self.make_donor('first', 'Dhaka')
+        self.make_donor('second', '  dhaka ', is_available=False)
+        self.make_donor('third', 'Sylhet')
+        self.assertEqual(self.counts(), {'dhaka': (2, 1), 'sylhet': (1, 1)})
+        self.assertEqual(City.objects.get(key='dhaka').name, 'Dhaka')
+
+        first.city = 'Sylhet'
+        first.save()
+        self.assertEqual(self.counts(), {'dhaka': (1, 0), 'sylhet': (2, 2)})
+        first.is_available = False
+        first.save()
+        self.assertEqual(self.counts(), {'dhaka': (1, 0), 'sylhet': (2, 1)})
+        first.address = 'Zindabazar'
+        first.save()
+        self.assertEqual(self.counts(), {'dhaka': (1, 0), 'sylhet': (2, 1)})
+        first.delete()
+        self.assertEqual(self.counts(), {'dhaka': (1, 0), 'sylhet': (1, 1)})
+        self.assertEqual(rebuild_city_counts(), 2)
+        self.assertEqual(self.counts(), {'dhaka': (1, 0), 'sylhet': (1, 1)})
+
+    def test_save_reads_the_stored_row_once(self):
+        donor = self.make_donor('first', 'Dhaka')
+        donor.city = 'Sylhet'
+        donor.is_available = False
+        with CaptureQueriesContext(connection) as context:
+            donor.save()
+        # The dashboard stats and the city counts share one pre_save lookup
+        reads = [query['sql'] for query in context.captured_queries if query['sql'].startswith('SELECT')]
+        self.assertEqual(len([sql for sql in reads if 'FROM "donor_profiles"' in sql]), 1, reads)
+        self.assertEqual(self.counts(), {'dhaka': (0, 0), 'sylhet': (1, 0)})
+        # Both still apply the right difference
+        self.assertEqual(rebuild_stats(), {})
+
+    def test_drifted_counts_stop_at_zero(self):
+        donor = self.make_donor('first', 'Dhaka')
+        City.objects.update(donor_count=0, available_donor_count=0)
+        donor.delete()
+        self.assertEqual(self.counts(), {'dhaka': (0, 0)})
 
-# Create your tests here.
+    def test_autocomplete_lists_most_donors_first(self):
+        self.make_donor('first', 'Dhaka')
+        for i in range(3):
+            self.make_donor(f'dhamrai{i}', 'Dhamrai')
+        self.make_donor('sylhet', 'Sylhet')
+        results = self.client.get('/donors/cities/autocomplete/', {'q': 'dh'}).json()['results']
+        self.assertEqual([(city['name'], city['donors']) for city in results], [('Dhamrai', 3), ('Dhaka', 1)])
@@ -9,4 +9,5 @@ urlpatterns = [
     path('donations/', views.donation_history_list, name='donation_history_list'),
     path('donations/create/', views.donation_create, name='donation_create'),
     path('search/', views.donor_search, name='donor_search'),
+    path('cities/autocomplete/', views.city_autocomplete, name='city_autocomplete'),
 ]
@@ -1,11 +1,17 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db.models import Q, Count
-from .models import DonorProfile, DonationHistory
+from django.utils import timezone
+from .models import City, DonorProfile, DonationHistory, normalize_city
 from .forms import DonorProfileForm, DonationHistoryForm
+from .matching import find_compatible_donors
+from blood_management.geo import MAX_RADIUS_KM, parse_point, parse_radius, within_radius
+from search.services import filter_queryset, ranked_search
+from blood_management.pagination import paginate
 from blood_requests.models import BloodRequest
-from blood_banks.models import BloodInventory
+from blood_banks.inventory_matrix import get_inventory_matrix
 
 
 @login_required
@@ -28,15 +34,18 @@ def donor_dashboard(request):
     # Get blood requests made by this user
     my_requests = BloodRequest.objects.filter(requester=request.user).order_by('-requested_date')[:5]
     
-    # Get available blood inventory
-    blood_inventory = BloodInventory.objects.all().order_by('blood_group')
+    # Available blood per group across banks, from this process's cached matrix
+    blood_inventory = [
+        {'blood_group': blood_group, 'units_available': units}
+        for blood_group, units in get_inventory_matrix().totals.items()
+    ]
     
     context = {
         'donor_profile': donor_profile,
         'donations': donations,
         'my_requests': my_requests,
         'blood_inventory': blood_inventory,
-        'total_donations': donations.count(),
+        'total_donations': donor_profile.donation_count,
     }
     
     return render(request, 'donors/dashboard.html', context)
@@ -122,9 +131,10 @@ def donation_history_list(request):
         messages.error(request, 'Please create your profile first.')
         return redirect('donor_profile_create')
     
-    donations = DonationHistory.objects.filter(donor=donor_profile).order_by('-donation_date')
+    donations = DonationHistory.objects.filter(donor=donor_profile).select_related('blood_bank')
+    page_obj = paginate(request, donations, ('-donation_date', '-id'))
     
-    return render(request, 'donors/donation_history.html', {'donations': donations})
+    return render(request, 'donors/donation_history.html', {'donations': page_obj, 'page_obj': page_obj})
 
 
 @login_required
@@ -156,30 +166,80 @@ def donation_create(request):
 
 def donor_search(request):
     """Search donors by blood group, city, and availability"""
-    donors = DonorProfile.objects.filter(is_available=True)
+    # Only donors who are available and past their deferral window
+    donors = DonorProfile.objects.filter(is_available=True, next_eligible_date__lte=timezone.localdate())
     
     # Get filter parameters
     blood_group = request.GET.get('blood_group', '')
+    if blood_group not in dict(DonorProfile.BLOOD_GROUP_CHOICES):
+        # Unknown groups (hand-edited URLs) are ignored rather than matched
+        blood_group = ''
     city = request.GET.get('city', '')
+    compatible = request.GET.get('compatible', '') == 'on'
     
-    if blood_group:
+    if blood_group and compatible:
+        # All donor groups that can give to the selected recipient group
+        donors = find_compatible_donors(blood_group, queryset=donors)
+    elif blood_group:
         donors = donors.filter(blood_group=blood_group)
     
     if city:
-        donors = donors.filter(city__icontains=city)
+        donors = filter_queryset(donors, city, columns=['city'])
+    
+    # Newest donors first unless a search gives a better order
+    donors = donors.select_related('user')
+    ordering = ('-created_at', '-id')
+    
+    # Free-text search over name, email, city and address
+    query = request.GET.get('q', '')
+    if query:
+        donors = ranked_search(donors, query)
+        ordering = ('search_rank', 'id')
+    
+    # Radius search around a point, e.g. ?near=23.81,90.41&radius_km=25
+    near = request.GET.get('near', '')
+    radius_km = parse_radius(request.GET.get('radius_km'))
+    point = parse_point(near)
+    if point:
+        donors = within_radius(donors, point[0], point[1], radius_km)
+        ordering = ('distance_km', 'id')
+    
+    page_obj = paginate(request, donors, ordering)
     
     # Get all blood groups for filter
     blood_groups = DonorProfile.BLOOD_GROUP_CHOICES
     
-    # Get all cities for filter
-    cities = DonorProfile.objects.values_list('city', flat=True).distinct().order_by('city')
+    # Cities with available donors for the filter, from the maintained City table
+    cities = City.objects.filter(available_donor_count__gt=0).values_list('name', flat=True)
     
     context = {
-        'donors': donors,
+        'donors': page_obj,
+        'page_obj': page_obj,
         'blood_groups': blood_groups,
         'cities': cities,
         'selected_blood_group': blood_group,
         'selected_city': city,
+        'query': query,
+        'compatible': compatible,
+        'near': near,
+        'radius_km': radius_km,
+        'max_radius_km': MAX_RADIUS_KM,
     }
     
     return render(request, 'donors/donor_search.html', context)
+
+
+def city_autocomplete(request):
+    """City names starting with ?q=, most donors first, as JSON"""
+    key = normalize_city(request.GET.get('q', ''))
+    cities = City.objects.filter(donor_count__gt=0)
+    if key:
+        # Range on the unique key index instead of a LIKE
+        cities = cities.filter(key__gte=key, key__lt=key + '\uffff')
+    cities = cities.order_by('-donor_count', 'key')[:10]
+    
+    results = [
+        {'name': city.name, 'donors': city.donor_count, 'available_donors': city.available_donor_count}
+        for city in cities
+    ]
+    return JsonResponse({'results': results})
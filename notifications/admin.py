@@ -0,0 +1,29 @@
+from django.contrib import admin, messages
+from django.utils import timezone
+from .models import DonorFanout, OutboxMessage
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ['id', 'subject', 'recipient', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['status']
+    search_fields = ['recipient', 'subject']
+    readonly_fields = ['subject', 'body', 'from_email', 'recipient', 'status', 'attempts', 'next_attempt_at', 'last_error', 'created_at', 'sent_at']
+    actions = ['retry_now']
+    
+    @admin.action(description='Retry selected unsent messages now')
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status='sent').update(status='pending', attempts=0, next_attempt_at=timezone.now())
+        self.message_user(request, f'{updated} message(s) queued for the next send_outbox run.', messages.SUCCESS)
+    
+    # Messages are written by the application and sent by send_outbox
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(DonorFanout)
+class DonorFanoutAdmin(admin.ModelAdmin):
+    list_display = ['blood_request', 'status', 'queued', 'last_donor_id', 'created_at', 'finished_at']
+    list_filter = ['status']
+    raw_id_fields = ['blood_request']
+    readonly_fields = ['status', 'queued', 'last_donor_id', 'created_at', 'started_at', 'finished_at']
@@ -0,0 +1,133 @@
+"""
+Compatible-donor alerts for urgent blood requests.
+
+Creating a ``critical`` or ``high`` urgency request only writes a
+``DonorFanout`` row in the same transaction, so the HTTP response never
+waits on the donor table. The ``fan_out_donor_alerts`` command then walks the
+available, eligible, compatible donors in the request's city in donor id
+order, ``chunk_size`` at a time. Each chunk records one ``DonorAlert`` per
+donor (unique per request, so nobody is alerted twice even if a chunk is
+retried) and writes the emails to the outbox. The cursor is saved with each
+chunk, so memory stays flat however many donors match and an interrupted
+run resumes where it stopped.
+
+Alert emails are spread into rate-limited slots: at most
+``DONOR_ALERT_BATCH_SIZE`` become due every ``DONOR_ALERT_BATCH_INTERVAL``
+seconds, counted from the fan-out's first run. ``send_outbox`` then sends
+them as they come due, between other transactional mail.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from donors.matching import find_compatible_donors
+from .models import DonorAlert, DonorFanout
+from .outbox import queue_emails
+
+
+FANOUT_URGENCIES = ('critical', 'high')
+# Requests in these statuses still need donors
+OPEN_STATUSES = ('pending', 'approved')
+CHUNK_SIZE = 1000
+
+
+def rate_limit():
+    """``(alerts per slot, seconds between slots)``"""
+    return (
+        getattr(settings, 'DONOR_ALERT_BATCH_SIZE', 500),
+        getattr(settings, 'DONOR_ALERT_BATCH_INTERVAL', 60),
+    )
+
+
+def start_fanout(blood_request):
+    """Schedule donor alerts for an urgent request; returns None for other urgencies"""
+    if blood_request.urgency not in FANOUT_URGENCIES:
+        return None
+    fanout, _ = DonorFanout.objects.get_or_create(blood_request=blood_request)
+    return fanout
+
+
+def candidate_donors(blood_request, on_date=None):
+    """Donors who can give to the request today, in its city, other than the requester"""
+    donors = find_compatible_donors(blood_request.blood_group, city=blood_request.city, on_date=on_date)
+    return donors.exclude(user_id=blood_request.requester_id)
+
+
+def alert_message(blood_request):
+    """Subject and body of the alert sent to each donor"""
+    subject = f'Urgent: {blood_request.blood_group} blood needed in {blood_request.city}'
+    body = (
+        f'{blood_request.hospital_name} needs {blood_request.units_required} unit(s) of '
+        f'{blood_request.blood_group} blood by {blood_request.required_by_date:%b %d, %Y} '
+        f'({blood_request.get_urgency_display()} urgency). Your blood group is compatible. '
+        f'If you can donate, please contact {blood_request.contact_number}.'
+    )
+    return subject, body
+
+
+def _finish(fanout, now):
+    fanout.status = 'done'
+    fanout.finished_at = now
+    fanout.save(update_fields=['status', 'finished_at'])
+
+
+def advance_fanout(fanout_id, chunk_size=CHUNK_SIZE, on_date=None):
+    """
+    Alert the next ``chunk_size`` candidate donors of one fan-out. Marks it
+    done once no candidates are left or the request was closed. Returns the
+    number of alerts queued.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        fanout = DonorFanout.objects.select_for_update().select_related('blood_request').get(pk=fanout_id)
+        if fanout.status == 'done':
+            return 0
+        blood_request = fanout.blood_request
+        if blood_request.status not in OPEN_STATUSES:
+            _finish(fanout, now)
+            return 0
+        rows = list(
+            candidate_donors(blood_request, on_date).filter(pk__gt=fanout.last_donor_id)
+            .order_by('pk').values_list('pk', 'user__email')[:chunk_size]
+        )
+        if not rows:
+            _finish(fanout, now)
+            return 0
+
+        alerted = set(DonorAlert.objects.filter(
+            blood_request=blood_request, donor_id__in=[pk for pk, _ in rows]
+        ).values_list('donor_id', flat=True))
+        new = [(pk, email) for pk, email in rows if pk not in alerted]
+        DonorAlert.objects.bulk_create(
+            [DonorAlert(blood_request=blood_request, donor_id=pk) for pk, _ in new], ignore_conflicts=True,
+        )
+
+        fanout.started_at = fanout.started_at or now
+        per_slot, interval = rate_limit()
+        subject, body = alert_message(blood_request)
+        slots = defaultdict(list)
+        queued = fanout.queued
+        for _, email in new:
+            if email:
+                slots[queued // per_slot].append((subject, body, email))
+                queued += 1
+        for slot, messages in slots.items():
+            queue_emails(messages, send_after=fanout.started_at + timedelta(seconds=slot * interval))
+
+        fanout.last_donor_id = rows[-1][0]
+        fanout.queued = queued
+        fanout.save(update_fields=['last_donor_id', 'queued', 'started_at'])
+        return sum(len(messages) for messages in slots.values())
+
+
+def run_fanouts(chunk_size=CHUNK_SIZE, on_date=None):
+    """Work every pending fan-out to the end; returns ``(fan-outs finished, alerts queued)``"""
+    finished = queued = 0
+    for fanout_id in DonorFanout.objects.filter(status='pending').order_by('id').values_list('pk', flat=True):
+        while DonorFanout.objects.filter(pk=fanout_id, status='pending').exists():
+            queued += advance_fanout(fanout_id, chunk_size=chunk_size, on_date=on_date)
+        finished += 1
+    return finished, queued
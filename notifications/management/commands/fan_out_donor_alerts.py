@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+from notifications.fanout import CHUNK_SIZE, run_fanouts
+
+
+class Command(BaseCommand):
+    help = 'Queues alert emails to compatible donors for new critical and high urgency blood requests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                            help='Donors read and alerted per transaction')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running, polling for new requests every --interval seconds')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            finished, queued = run_fanouts(chunk_size=options['chunk_size'])
+            if finished or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f'✓ Queued {queued} donor alerts for {finished} requests'))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+from notifications.outbox import BATCH_SIZE, send_outbox
+
+
+class Command(BaseCommand):
+    help = 'Sends due outbox emails in batches over one mail connection, retrying failures with backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Messages claimed and sent per batch')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running, polling for new messages every --interval seconds')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            result = send_outbox(batch_size=options['batch_size'])
+            if result.sent or result.retried or result.failed or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(
+                    f'✓ Sent {result.sent} emails ({result.retried} to retry, {result.failed} failed)'
+                ))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blood_requests', '0004_priority_score'),
+        ('donors', '0007_donation_counters'),
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DonorAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('blood_request', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='donor_alerts', to='blood_requests.bloodrequest')),
+                ('donor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='donors.donorprofile')),
+            ],
+            options={
+                'verbose_name': 'Donor Alert',
+                'verbose_name_plural': 'Donor Alerts',
+                'db_table': 'donor_alerts',
+                'constraints': [models.UniqueConstraint(fields=('blood_request', 'donor'), name='donor_alert_once')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DonorFanout',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('done', 'Done')], default='pending', max_length=10)),
+                ('last_donor_id', models.BigIntegerField(default=0, help_text='Donors up to this id have been considered')),
+                ('queued', models.PositiveIntegerField(default=0, help_text='Alerts queued so far')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, help_text='First run; alert send times are spaced from here', null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('blood_request', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='donor_fanout', to='blood_requests.bloodrequest')),
+            ],
+            options={
+                'verbose_name': 'Donor Fan-out',
+                'verbose_name_plural': 'Donor Fan-outs',
+                'db_table': 'donor_fanouts',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'id'], name='fanout_status_idx')],
+            },
+        ),
+    ]
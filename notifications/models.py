@@ -0,0 +1,85 @@
+from django.db import models
+from django.utils import timezone
+
+
+class OutboxMessage(models.Model):
+    """An email written with the state change it reports, sent later by ``send_outbox``"""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    )
+    
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipient = models.CharField(max_length=254)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now, help_text="Not sent before this time; pushed back after each failure")
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"{self.subject} -> {self.recipient} ({self.status})"
+    
+    class Meta:
+        db_table = 'outbox_messages'
+        verbose_name = 'Outbox Message'
+        verbose_name_plural = 'Outbox Messages'
+        ordering = ['id']
+        indexes = [
+            # The sender's scan for due messages
+            models.Index(fields=['status', 'next_attempt_at', 'id'], name='outbox_due_idx'),
+        ]
+
+
+class DonorFanout(models.Model):
+    """
+    Alerting the compatible donors near an urgent blood request. Written with
+    the request and worked through by ``fan_out_donor_alerts`` in donor id
+    order, so a run can stop anywhere and the next one resumes at ``last_donor_id``.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+    )
+    
+    blood_request = models.OneToOneField('blood_requests.BloodRequest', on_delete=models.CASCADE, related_name='donor_fanout')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    last_donor_id = models.BigIntegerField(default=0, help_text="Donors up to this id have been considered")
+    queued = models.PositiveIntegerField(default=0, help_text="Alerts queued so far")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True, help_text="First run; alert send times are spaced from here")
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"Donor alerts for request {self.blood_request_id} ({self.status})"
+    
+    class Meta:
+        db_table = 'donor_fanouts'
+        verbose_name = 'Donor Fan-out'
+        verbose_name_plural = 'Donor Fan-outs'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'id'], name='fanout_status_idx'),
+        ]
+
+
+class DonorAlert(models.Model):
+    """One donor alerted about one blood request; never sent twice"""
+    blood_request = models.ForeignKey('blood_requests.BloodRequest', on_delete=models.CASCADE, related_name='donor_alerts')
+    donor = models.ForeignKey('donors.DonorProfile', on_delete=models.CASCADE, related_name='alerts')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"Request {self.blood_request_id} -> donor {self.donor_id}"
+    
+    class Meta:
+        db_table = 'donor_alerts'
+        verbose_name = 'Donor Alert'
+        verbose_name_plural = 'Donor Alerts'
+        constraints = [
+            models.UniqueConstraint(fields=['blood_request', 'donor'], name='donor_alert_once'),
+        ]
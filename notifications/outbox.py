@@ -0,0 +1,148 @@
+"""
+Transactional email outbox.
+
+Views and bulk actions never talk to the mail server. ``queue_email`` and
+``queue_emails`` write ``OutboxMessage`` rows in the caller's transaction,
+so a notification exists exactly when the change it reports was committed.
+``send_outbox`` (run by the ``send_outbox`` command) drains due messages in
+batches over one reused backend connection. A failed message is retried
+with exponential backoff until ``OUTBOX_MAX_ATTEMPTS`` is reached and is
+then marked failed.
+"""
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection as db_connection, transaction
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+
+BATCH_SIZE = 100
+# A claimed batch is not handed to another worker for this long
+LEASE_SECONDS = 300
+
+
+@dataclass
+class SendResult:
+    sent: int = 0
+    retried: int = 0
+    failed: int = 0
+
+
+def from_email():
+    return getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@bloodbank.com')
+
+
+def admin_email():
+    return getattr(settings, 'ADMIN_EMAIL', 'admin@bloodbank.com')
+
+
+def max_attempts():
+    return getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 5)
+
+
+def retry_delay(attempts):
+    """Wait before the next try after ``attempts`` failures: base, 2 x base, 4 x base..."""
+    return timedelta(seconds=getattr(settings, 'OUTBOX_RETRY_BASE_SECONDS', 60) * 2 ** (attempts - 1))
+
+
+def queue_email(subject, body, recipient):
+    """Write one message to the outbox; returns None when there is no recipient"""
+    if not recipient:
+        return None
+    return OutboxMessage.objects.create(subject=subject, body=body, from_email=from_email(), recipient=recipient)
+
+
+def queue_emails(messages, send_after=None):
+    """
+    Write ``(subject, body, recipient)`` messages to the outbox with one
+    ``bulk_create``; ``send_after`` holds them back until that time.
+    """
+    send_after = send_after or timezone.now()
+    return OutboxMessage.objects.bulk_create([
+        OutboxMessage(
+            subject=subject, body=body, from_email=from_email(), recipient=recipient, next_attempt_at=send_after,
+        )
+        for subject, body, recipient in messages if recipient
+    ], batch_size=500)
+
+
+def _claim_batch(now, batch_size):
+    """Due messages, leased to this worker so a concurrent one skips them"""
+    with transaction.atomic():
+        due = OutboxMessage.objects.filter(status='pending', next_attempt_at__lte=now).order_by('next_attempt_at', 'id')
+        if db_connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        batch = list(due[:batch_size])
+        OutboxMessage.objects.filter(pk__in=[message.pk for message in batch]).update(
+            next_attempt_at=now + timedelta(seconds=LEASE_SECONDS)
+        )
+    return batch
+
+
+def _open(backend):
+    # Keep the connection open across sends; a backend that finds it closed
+    # opens and closes one per message. Failures surface on the next send.
+    try:
+        backend.open()
+    except Exception:
+        pass
+
+
+def _reopen(backend):
+    try:
+        backend.close()
+    except Exception:
+        pass
+    _open(backend)
+
+
+def send_outbox(batch_size=BATCH_SIZE, max_batches=None):
+    """
+    Send due messages ``batch_size`` at a time until none are left (or
+    ``max_batches`` were handled) over a single mail backend connection.
+    Returns a ``SendResult``.
+    """
+    result = SendResult()
+    limit = max_attempts()
+    backend = get_connection()
+    _open(backend)
+    try:
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            now = timezone.now()
+            batch = _claim_batch(now, batch_size)
+            if not batch:
+                break
+            batches += 1
+            for message in batch:
+                email = EmailMessage(
+                    message.subject, message.body, message.from_email, [message.recipient], connection=backend,
+                )
+                message.attempts += 1
+                try:
+                    email.send()
+                except Exception as exc:
+                    message.last_error = f'{type(exc).__name__}: {exc}'
+                    if message.attempts >= limit:
+                        message.status = 'failed'
+                        result.failed += 1
+                    else:
+                        message.next_attempt_at = timezone.now() + retry_delay(message.attempts)
+                        result.retried += 1
+                    # The connection may be broken: start a fresh one
+                    _reopen(backend)
+                else:
+                    message.status = 'sent'
+                    message.sent_at = timezone.now()
+                    message.next_attempt_at = message.sent_at
+                    result.sent += 1
+            OutboxMessage.objects.bulk_update(
+                batch, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at'], batch_size=BATCH_SIZE
+            )
+    finally:
+        backend.close()
+    return result
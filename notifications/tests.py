@@ -0,0 +1,176 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from accounts.models import User
+from blood_banks.models import BloodBank
+from donors.models import DonorProfile, DonationHistory
+from blood_requests.models import BloodRequest
+from .fanout import advance_fanout, candidate_donors, run_fanouts
+from .models import DonorAlert, DonorFanout, OutboxMessage
+from .outbox import queue_email, send_outbox
+
+
+class CountingBackend(EmailBackend):
+    """locmem backend that counts connections and refuses one address"""
+    opened = 0
+
+    def open(self):
+        CountingBackend.opened += 1
+        return super().open()
+
+    def send_messages(self, messages):
+        for message in messages:
+            if 'bounce@example.com' in message.to:
+                raise ConnectionError('mailbox unavailable')
+        return super().send_messages(messages)
+
+
+class OutboxTests(TestCase):
+    """State changes write their emails to the outbox; send_outbox delivers them in batches"""
+
+    def setUp(self):
+        CountingBackend.opened = 0
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='admin123', user_type='admin'
+        )
+        donor = User.objects.create_user(
+            username='donor', email='donor@example.com', password='donor123', user_type='donor'
+        )
+        self.profile = DonorProfile.objects.create(
+            user=donor, blood_group='O+', date_of_birth=date(1990, 1, 1), gender='male',
+            address='12 Green Road', city='Dhaka'
+        )
+        self.bank = BloodBank.objects.create(
+            name='Central Blood Bank', address='Shahbagh', city='Dhaka',
+            phone_number='0123456789', email='central@example.com'
+        )
+
+    def test_views_queue_instead_of_sending(self):
+        donation = DonationHistory.objects.create(
+            donor=self.profile, blood_bank=self.bank, donation_date=date.today(), units=Decimal('1')
+        )
+        self.client.force_login(self.admin)
+        self.client.post(f'/admin/donations/{donation.pk}/approve/')
+        self.assertEqual(mail.outbox, [])
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.subject, message.recipient, message.status), ('Donation Approved', 'donor@example.com', 'pending'))
+
+        call_command('send_outbox', stdout=StringIO())
+        self.assertEqual([m.to for m in mail.outbox], [['donor@example.com']])
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ('sent', 1))
+
+    def test_failed_view_writes_no_email(self):
+        self.client.force_login(self.admin)
+        self.client.post('/requests/create/', {
+            'patient_name': 'Patient', 'blood_group': 'A+', 'units_required': '2', 'urgency': 'high',
+            'hospital_name': 'DMCH', 'hospital_address': 'Dhaka', 'city': 'Dhaka', 'contact_number': '0123',
+            'reason': 'Surgery', 'required_by_date': 'not a date',
+        })
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    @override_settings(EMAIL_BACKEND='notifications.tests.CountingBackend', OUTBOX_MAX_ATTEMPTS=2, OUTBOX_RETRY_BASE_SECONDS=60)
+    def test_batches_share_a_connection_and_failures_back_off(self):
+        for i in range(5):
+            queue_email('Hello', 'Body', f'donor{i}@example.com')
+        bounce = queue_email('Hello', 'Body', 'bounce@example.com')
+        result = send_outbox(batch_size=2)
+        self.assertEqual((result.sent, result.retried, result.failed), (5, 1, 0))
+        self.assertEqual(len(mail.outbox), 5)
+        # One connection for the run, one more after the failure
+        self.assertEqual(CountingBackend.opened, 2)
+
+        bounce.refresh_from_db()
+        self.assertEqual((bounce.status, bounce.attempts), ('pending', 1))
+        self.assertIn('mailbox unavailable', bounce.last_error)
+        self.assertGreater(bounce.next_attempt_at, timezone.now() + timedelta(seconds=50))
+        # Not due yet
+        self.assertEqual(send_outbox().retried, 0)
+
+        OutboxMessage.objects.filter(pk=bounce.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(send_outbox().failed, 1)
+        bounce.refresh_from_db()
+        self.assertEqual((bounce.status, bounce.attempts), ('failed', 2))
+
+
+@override_settings(DONOR_ALERT_BATCH_SIZE=2, DONOR_ALERT_BATCH_INTERVAL=60)
+class DonorFanoutTests(TestCase):
+    """Urgent requests alert each compatible, eligible donor in the city once, in paced batches"""
+
+    def setUp(self):
+        self.requester = User.objects.create_user(
+            username='requester', email='requester@example.com', password='requester123', user_type='donor'
+        )
+        self.n = 0
+        self.alertable = [self.make_donor(group) for group in ('O-', 'O+', 'A-', 'A+', 'O+')]
+        self.make_donor('B+')                               # incompatible
+        self.make_donor('O+', city='Chittagong')            # elsewhere
+        self.make_donor('O+', is_available=False)           # unavailable
+        self.make_donor('O+', last_donation_date=date.today() - timedelta(days=10))  # not eligible yet
+
+    def make_donor(self, blood_group, city='Dhaka', **fields):
+        self.n += 1
+        user = User.objects.create_user(username=f'donor{self.n}', email=f'donor{self.n}@example.com', user_type='donor')
+        return DonorProfile.objects.create(
+            user=user, blood_group=blood_group, date_of_birth=date(1990, 1, 1), gender='male',
+            address='12 Green Road', city=city, **fields
+        )
+
+    def create_request(self, urgency):
+        self.client.force_login(self.requester)
+        self.client.post('/requests/create/', {
+            'patient_name': 'Patient', 'blood_group': 'A+', 'units_required': '2', 'urgency': urgency,
+            'hospital_name': 'DMCH', 'hospital_address': 'Dhaka', 'city': 'Dhaka', 'contact_number': '0123',
+            'reason': 'Surgery', 'required_by_date': date.today().isoformat(),
+        })
+        return BloodRequest.objects.latest('id')
+
+    def test_only_urgent_requests_fan_out(self):
+        self.create_request('medium')
+        self.assertFalse(DonorFanout.objects.exists())
+        blood_request = self.create_request('critical')
+        fanout = DonorFanout.objects.get()
+        self.assertEqual((fanout.blood_request, fanout.status), (blood_request, 'pending'))
+        # Creating the request queued nothing but the admin notice
+        self.assertFalse(DonorAlert.objects.exists())
+
+    def test_alerts_are_chunked_paced_and_deduplicated(self):
+        blood_request = self.create_request('high')
+        fanout = DonorFanout.objects.get()
+        self.assertEqual(advance_fanout(fanout.pk, chunk_size=3), 3)
+        self.assertEqual(run_fanouts(chunk_size=3), (1, 2))
+        fanout.refresh_from_db()
+        self.assertEqual((fanout.status, fanout.queued), ('done', 5))
+        self.assertEqual(
+            set(DonorAlert.objects.values_list('donor_id', flat=True)), {donor.pk for donor in self.alertable}
+        )
+
+        alerts = OutboxMessage.objects.filter(subject__startswith='Urgent').order_by('next_attempt_at', 'id')
+        offsets = [(message.next_attempt_at - fanout.started_at).total_seconds() for message in alerts]
+        self.assertEqual(offsets, [0, 0, 60, 60, 120])
+        self.assertIn('DMCH', alerts[0].body)
+
+        # Running the same fan-out again never alerts a donor twice
+        DonorFanout.objects.filter(pk=fanout.pk).update(status='pending', last_donor_id=0)
+        self.assertEqual(run_fanouts(), (1, 0))
+        self.assertEqual(DonorAlert.objects.filter(blood_request=blood_request).count(), 5)
+
+    def test_city_matches_whatever_the_case_and_spacing(self):
+        shouting = self.make_donor('O-', city='  DHAKA ')
+        blood_request = self.create_request('critical')
+        BloodRequest.objects.filter(pk=blood_request.pk).update(city='dhaka  ')
+        blood_request.refresh_from_db()
+        self.assertEqual(set(candidate_donors(blood_request)), set(self.alertable) | {shouting})
+        self.assertEqual(run_fanouts(), (1, 6))
+
+    def test_closed_requests_stop_fanning_out(self):
+        blood_request = self.create_request('critical')
+        BloodRequest.objects.filter(pk=blood_request.pk).update(status='fulfilled')
+        self.assertEqual(run_fanouts(), (1, 0))
+        self.assertEqual(DonorFanout.objects.get().status, 'done')
@@ -0,0 +1,101 @@
+import random
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+from accounts.models import User
+from donors.models import DonorProfile, normalize_city
+from donors.matching import BLOOD_GROUP_CODES
+from search.services import filter_queryset
+
+
+FIRST_NAMES = ['Rahim', 'Karim', 'Fatema', 'Ayesha', 'Nusrat', 'Tanvir', 'Sabbir', 'Mitu', 'Arif', 'Sumaiya',
+               'Hasan', 'Jannat', 'Rafiq', 'Shirin', 'Imran', 'Farhana', 'Mahmud', 'Rumana', 'Sohel', 'Tania']
+LAST_NAMES = ['Ahmed', 'Hossain', 'Islam', 'Rahman', 'Khan', 'Chowdhury', 'Sarkar', 'Das', 'Uddin', 'Akter']
+CITIES = ['Dhaka', 'Chittagong', 'Khulna', 'Rajshahi', 'Sylhet', 'Barisal', 'Rangpur', 'Mymensingh']
+STREETS = ['Green Road', 'Gulshan Avenue', 'Banani Road', 'Dhanmondi Road', 'Mirpur Road', 'Station Road',
+           'College Road', 'Lake Circus', 'Airport Road', 'Court Para']
+
+
+class Command(BaseCommand):
+    help = 'Measures donor search latency (FTS5 vs icontains) as the donor table grows, on a throwaway database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 500_000],
+                            help='Table sizes at which to measure')
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        # Never touch the real database: run everything in a fresh test database
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.run(sorted(options['sizes']), options['batch_size'], options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run(self, sizes, batch_size, repeat):
+        queries = ['Rumana Chowdhury', 'Lake Circus', 'sylhet']
+        rng = random.Random(7)
+        rows = 0
+        self.stdout.write(f'{"Rows":>10}  {"Query":<18}{"Matches":>9}{"icontains":>14}{"FTS5":>12}')
+        for size in sizes:
+            self.populate(rng, rows, size, batch_size)
+            rows = size
+            for query in queries:
+                scan_time, scan_count = self.time_it(repeat, lambda: self.icontains_search(query))
+                fts_time, fts_count = self.time_it(
+                    repeat, lambda: len(filter_queryset(DonorProfile.objects.all(), query).values_list('id', flat=True)[:50])
+                )
+                self.stdout.write(
+                    f'{rows:>10,}  {query:<18}{scan_count:>9}{scan_time * 1000:>12.1f}ms{fts_time * 1000:>10.1f}ms'
+                )
+
+    def populate(self, rng, start, stop, batch_size):
+        groups = list(BLOOD_GROUP_CODES)
+        for offset in range(start, stop, batch_size):
+            count = min(batch_size, stop - offset)
+            users = User.objects.bulk_create([
+                User(username=f'bench{i}', email=f'bench{i}@example.com', password='!', user_type='donor',
+                     first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES))
+                for i in range(offset, offset + count)
+            ])
+            profiles = []
+            for user in users:
+                blood_group = rng.choice(groups)
+                city = rng.choice(CITIES)
+                profiles.append(DonorProfile(
+                    user=user,
+                    blood_group=blood_group,
+                    blood_group_code=BLOOD_GROUP_CODES[blood_group],
+                    date_of_birth=date(1990, 1, 1),
+                    next_eligible_date=date(2008, 1, 1),
+                    gender='other',
+                    address=f'{rng.randint(1, 200)} {rng.choice(STREETS)}',
+                    city=city,
+                    city_key=normalize_city(city),
+                ))
+            DonorProfile.objects.bulk_create(profiles)
+
+    def icontains_search(self, query):
+        """The ORM search the admin used before: every word against every field"""
+        donors = DonorProfile.objects.all()
+        for word in query.split():
+            condition = Q()
+            for field in ['user__first_name', 'user__last_name', 'user__username', 'user__email', 'city', 'address']:
+                condition |= Q(**{f'{field}__icontains': word})
+            donors = donors.filter(condition)
+        return len(donors.values_list('id', flat=True)[:50])
+
+    def time_it(self, repeat, func):
+        best = None
+        result = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
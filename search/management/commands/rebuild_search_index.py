@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from search.services import INDEXES, fts_enabled, rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search indexes for donors, blood requests and blood banks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tables', nargs='*', help=f'Only rebuild these indexes: {", ".join(INDEXES)} (default: all)')
+
+    def handle(self, *args, **options):
+        if not fts_enabled():
+            self.stdout.write(self.style.WARNING('Full-text indexes are only available on SQLite.'))
+            return
+        
+        unknown = set(options['tables']) - set(INDEXES)
+        if unknown:
+            raise CommandError(f'Unknown index: {", ".join(sorted(unknown))}')
+        
+        with transaction.atomic():
+            counts = rebuild(options['tables'] or None)
+        
+        for table, count in counts.items():
+            self.stdout.write(self.style.SUCCESS(f'✓ Indexed {count} rows from {table}'))
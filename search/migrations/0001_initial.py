@@ -0,0 +1,117 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:30
+
+from django.db import migrations
+
+
+FTS_TOKENIZE = "tokenize='unicode61 remove_diacritics 2', prefix='2 3'"
+
+DONOR_ROW = (
+    "SELECT d.id, u.first_name || ' ' || u.last_name || ' ' || u.username, u.email, d.city, d.address "
+    "FROM donor_profiles d JOIN users u ON u.id = d.user_id"
+)
+REQUEST_ROW = (
+    "SELECT r.id, r.patient_name, r.hospital_name, r.city, r.reason, u.username || ' ' || u.email "
+    "FROM blood_requests r JOIN users u ON u.id = r.requester_id"
+)
+BANK_ROW = "SELECT b.id, b.name, b.city, b.address, b.email FROM blood_banks b"
+
+DONOR_COLUMNS = 'rowid, name, email, city, address'
+REQUEST_COLUMNS = 'rowid, patient_name, hospital_name, city, reason, requester'
+BANK_COLUMNS = 'rowid, name, city, address, email'
+
+CREATE_SQL = [
+    f"CREATE VIRTUAL TABLE donor_profiles_fts USING fts5(name, email, city, address, {FTS_TOKENIZE})",
+    f"CREATE VIRTUAL TABLE blood_requests_fts USING fts5(patient_name, hospital_name, city, reason, requester, {FTS_TOKENIZE})",
+    f"CREATE VIRTUAL TABLE blood_banks_fts USING fts5(name, city, address, email, {FTS_TOKENIZE})",
+
+    # Donor profiles
+    f"""CREATE TRIGGER donor_profiles_fts_ai AFTER INSERT ON donor_profiles BEGIN
+        INSERT INTO donor_profiles_fts({DONOR_COLUMNS}) {DONOR_ROW} WHERE d.id = new.id;
+    END""",
+    f"""CREATE TRIGGER donor_profiles_fts_au AFTER UPDATE OF user_id, city, address ON donor_profiles BEGIN
+        DELETE FROM donor_profiles_fts WHERE rowid = old.id;
+        INSERT INTO donor_profiles_fts({DONOR_COLUMNS}) {DONOR_ROW} WHERE d.id = new.id;
+    END""",
+    """CREATE TRIGGER donor_profiles_fts_ad AFTER DELETE ON donor_profiles BEGIN
+        DELETE FROM donor_profiles_fts WHERE rowid = old.id;
+    END""",
+
+    # Blood requests
+    f"""CREATE TRIGGER blood_requests_fts_ai AFTER INSERT ON blood_requests BEGIN
+        INSERT INTO blood_requests_fts({REQUEST_COLUMNS}) {REQUEST_ROW} WHERE r.id = new.id;
+    END""",
+    f"""CREATE TRIGGER blood_requests_fts_au AFTER UPDATE OF requester_id, patient_name, hospital_name, city, reason ON blood_requests BEGIN
+        DELETE FROM blood_requests_fts WHERE rowid = old.id;
+        INSERT INTO blood_requests_fts({REQUEST_COLUMNS}) {REQUEST_ROW} WHERE r.id = new.id;
+    END""",
+    """CREATE TRIGGER blood_requests_fts_ad AFTER DELETE ON blood_requests BEGIN
+        DELETE FROM blood_requests_fts WHERE rowid = old.id;
+    END""",
+
+    # Blood banks
+    f"""CREATE TRIGGER blood_banks_fts_ai AFTER INSERT ON blood_banks BEGIN
+        INSERT INTO blood_banks_fts({BANK_COLUMNS}) {BANK_ROW} WHERE b.id = new.id;
+    END""",
+    f"""CREATE TRIGGER blood_banks_fts_au AFTER UPDATE OF name, city, address, email ON blood_banks BEGIN
+        DELETE FROM blood_banks_fts WHERE rowid = old.id;
+        INSERT INTO blood_banks_fts({BANK_COLUMNS}) {BANK_ROW} WHERE b.id = new.id;
+    END""",
+    """CREATE TRIGGER blood_banks_fts_ad AFTER DELETE ON blood_banks BEGIN
+        DELETE FROM blood_banks_fts WHERE rowid = old.id;
+    END""",
+
+    # Names and emails live on the user row
+    f"""CREATE TRIGGER users_fts_au AFTER UPDATE OF first_name, last_name, username, email ON users BEGIN
+        DELETE FROM donor_profiles_fts WHERE rowid IN (SELECT id FROM donor_profiles WHERE user_id = new.id);
+        INSERT INTO donor_profiles_fts({DONOR_COLUMNS}) {DONOR_ROW} WHERE d.user_id = new.id;
+        DELETE FROM blood_requests_fts WHERE rowid IN (SELECT id FROM blood_requests WHERE requester_id = new.id);
+        INSERT INTO blood_requests_fts({REQUEST_COLUMNS}) {REQUEST_ROW} WHERE r.requester_id = new.id;
+    END""",
+
+    # Index existing rows
+    f"INSERT INTO donor_profiles_fts({DONOR_COLUMNS}) {DONOR_ROW}",
+    f"INSERT INTO blood_requests_fts({REQUEST_COLUMNS}) {REQUEST_ROW}",
+    f"INSERT INTO blood_banks_fts({BANK_COLUMNS}) {BANK_ROW}",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS users_fts_au",
+    "DROP TRIGGER IF EXISTS blood_banks_fts_ad",
+    "DROP TRIGGER IF EXISTS blood_banks_fts_au",
+    "DROP TRIGGER IF EXISTS blood_banks_fts_ai",
+    "DROP TRIGGER IF EXISTS blood_requests_fts_ad",
+    "DROP TRIGGER IF EXISTS blood_requests_fts_au",
+    "DROP TRIGGER IF EXISTS blood_requests_fts_ai",
+    "DROP TRIGGER IF EXISTS donor_profiles_fts_ad",
+    "DROP TRIGGER IF EXISTS donor_profiles_fts_au",
+    "DROP TRIGGER IF EXISTS donor_profiles_fts_ai",
+    "DROP TABLE IF EXISTS blood_banks_fts",
+    "DROP TABLE IF EXISTS blood_requests_fts",
+    "DROP TABLE IF EXISTS donor_profiles_fts",
+]
+
+
+def run_statements(statements):
+    def apply(apps, schema_editor):
+        # FTS5 virtual tables and triggers are SQLite specific
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return apply
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('blood_banks', '0002_location'),
+        ('blood_requests', '0001_initial'),
+        ('donors', '0003_location'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_statements(CREATE_SQL), run_statements(DROP_SQL)),
+    ]
@@ -0,0 +1,3 @@
+from django.db import models
+
+# Full-text indexes are SQLite FTS5 virtual tables created in migrations.
@@ -0,0 +1,147 @@
+"""
+Full-text search over donors, blood requests and blood banks.
+
+Each searchable table has an SQLite FTS5 shadow table (created in this app's
+migrations) that triggers keep in sync on insert, update and delete. Queries
+are run against the FTS index and joined back to the ORM through a rowid
+subquery, so searches never scan the base tables.
+"""
+import re
+from dataclasses import dataclass
+
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+
+@dataclass(frozen=True)
+class FullTextIndex:
+    """Description of one FTS5 table and the rows it indexes"""
+    table: str
+    columns: tuple
+    source_sql: str
+    fallback_fields: tuple
+
+
+INDEXES = {
+    'donor_profiles': FullTextIndex(
+        table='donor_profiles_fts',
+        columns=('name', 'email', 'city', 'address'),
+        source_sql=(
+            "SELECT d.id, u.first_name || ' ' || u.last_name || ' ' || u.username, u.email, d.city, d.address "
+            "FROM donor_profiles d JOIN users u ON u.id = d.user_id"
+        ),
+        fallback_fields=('user__first_name', 'user__last_name', 'user__username', 'user__email', 'city', 'address'),
+    ),
+    'blood_requests': FullTextIndex(
+        table='blood_requests_fts',
+        columns=('patient_name', 'hospital_name', 'city', 'reason', 'requester'),
+        source_sql=(
+            "SELECT r.id, r.patient_name, r.hospital_name, r.city, r.reason, u.username || ' ' || u.email "
+            "FROM blood_requests r JOIN users u ON u.id = r.requester_id"
+        ),
+        fallback_fields=('patient_name', 'hospital_name', 'city', 'reason', 'requester__username', 'requester__email'),
+    ),
+    'blood_banks': FullTextIndex(
+        table='blood_banks_fts',
+        columns=('name', 'city', 'address', 'email'),
+        source_sql="SELECT b.id, b.name, b.city, b.address, b.email FROM blood_banks b",
+        fallback_fields=('name', 'city', 'address', 'email'),
+    ),
+}
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_enabled():
+    """FTS5 tables only exist on SQLite"""
+    return connection.vendor == 'sqlite'
+
+
+def get_index(model):
+    return INDEXES[model._meta.db_table]
+
+
+def build_match_query(text, columns=None):
+    """
+    Turn free text into a safe FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix term, so user input can never produce
+    an FTS syntax error, and all words must match. ``columns`` restricts the
+    match to those FTS columns.
+    """
+    tokens = TOKEN_RE.findall(text or '')
+    if not tokens:
+        return ''
+    column_filter = '{%s} : ' % ' '.join(columns) if columns else ''
+    return ' '.join(f'{column_filter}"{token}"*' for token in tokens)
+
+
+def search_ids(model, text, columns=None, limit=50):
+    """Primary keys of the best matching rows, best first"""
+    match = build_match_query(text, columns)
+    if not match:
+        return []
+    index = get_index(model)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {index.table} WHERE {index.table} MATCH %s ORDER BY rank LIMIT %s',
+            [match, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def filter_queryset(queryset, text, columns=None):
+    """Restrict a queryset to rows matching ``text`` in the full-text index"""
+    model = queryset.model
+    index = get_index(model)
+    match = build_match_query(text, columns)
+    if not match:
+        return queryset
+    if not fts_enabled():
+        fields = [field for field in index.fallback_fields if columns is None or field.split('__')[-1] in columns]
+        for token in TOKEN_RE.findall(text):
+            condition = Q()
+            for field in fields:
+                condition |= Q(**{f'{field}__icontains': token})
+            queryset = queryset.filter(condition)
+        return queryset
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT rowid FROM {index.table} WHERE {index.table} MATCH %s', [match]
+    ))
+
+
+def ranked_search(queryset, text, columns=None):
+    """Matching rows annotated with ``search_rank`` and ordered best first"""
+    queryset = filter_queryset(queryset, text, columns)
+    match = build_match_query(text, columns)
+    if not match or not fts_enabled():
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField())).order_by('search_rank', 'pk')
+    model = queryset.model
+    index = get_index(model)
+    rank = RawSQL(
+        f'SELECT rank FROM {index.table} WHERE {index.table} MATCH %s '
+        f'AND rowid = {connection.ops.quote_name(model._meta.db_table)}.{connection.ops.quote_name(model._meta.pk.column)}',
+        [match],
+        output_field=FloatField(),
+    )
+    return queryset.annotate(search_rank=rank).order_by('search_rank', 'pk')
+
+
+def rebuild(tables=None):
+    """Repopulate FTS tables from their base tables; returns rows indexed per table"""
+    counts = {}
+    if not fts_enabled():
+        return counts
+    with connection.cursor() as cursor:
+        for name, index in INDEXES.items():
+            if tables and name not in tables:
+                continue
+            cursor.execute(f'DELETE FROM {index.table}')
+            cursor.execute(
+                f'INSERT INTO {index.table}(rowid, {", ".join(index.columns)}) {index.source_sql}'
+            )
+            cursor.execute(f"INSERT INTO {index.table}({index.table}) VALUES ('optimize')")
+            cursor.execute(f'SELECT count(*) FROM {index.table}')
+            counts[name] = cursor.fetchone()[0]
+    return counts
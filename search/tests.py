@@ -0,0 +1,111 @@
+from datetime import date
+
+from django.db import connection
+from django.test import TestCase
+from accounts.models import User
+from blood_banks.models import BloodBank
+from blood_requests.models import BloodRequest
+from donors.models import DonorProfile
+from .services import build_match_query, filter_queryset, ranked_search, rebuild, search_ids
+
+
+def make_bank(name, city='Dhaka', address='Shahbagh'):
+    return BloodBank.objects.create(
+        name=name, address=address, city=city, phone_number='0123456789', email='bank@example.com'
+    )
+
+
+class BuildMatchQueryTests(TestCase):
+    def test_words_become_quoted_prefix_terms(self):
+        self.assertEqual(build_match_query('green road'), '"green"* "road"*')
+
+    def test_quotes_operators_and_stars_are_stripped(self):
+        self.assertEqual(build_match_query('"green" OR road* -NOT (x)'), '"green"* "OR"* "road"* "NOT"* "x"*')
+        self.assertEqual(build_match_query('a"b'), '"a"* "b"*')
+        self.assertEqual(build_match_query('*'), '')
+        self.assertEqual(build_match_query('  ""  '), '')
+        self.assertEqual(build_match_query(None), '')
+
+    def test_column_filter(self):
+        self.assertEqual(build_match_query('dhaka', columns=['city']), '{city} : "dhaka"*')
+
+    def test_hostile_input_runs(self):
+        make_bank('Central Blood Bank')
+        for text in ['"', 'NEAR(a b)', 'central AND', '^central', 'col:central', "'; DROP TABLE blood_banks; --"]:
+            search_ids(BloodBank, text)
+        self.assertEqual(search_ids(BloodBank, 'central"*'), list(BloodBank.objects.values_list('pk', flat=True)))
+
+
+class FullTextSyncTests(TestCase):
+    """Triggers keep the FTS tables in step with the base tables"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='rahim', email='rahim@example.com', first_name='Rahim', last_name='Uddin', user_type='donor'
+        )
+        self.profile = DonorProfile.objects.create(
+            user=self.user, blood_group='O+', date_of_birth=date(1990, 1, 1), gender='male',
+            address='12 Green Road', city='Dhaka'
+        )
+
+    def donors(self, text):
+        return list(filter_queryset(DonorProfile.objects.all(), text))
+
+    def test_insert_update_delete(self):
+        bank = make_bank('Central Blood Bank')
+        self.assertEqual(search_ids(BloodBank, 'central'), [bank.pk])
+        bank.name = 'Northern Blood Bank'
+        bank.save()
+        self.assertEqual(search_ids(BloodBank, 'central'), [])
+        self.assertEqual(search_ids(BloodBank, 'northern'), [bank.pk])
+        bank.delete()
+        self.assertEqual(search_ids(BloodBank, 'northern'), [])
+
+        self.assertEqual(self.donors('green'), [self.profile])
+        self.profile.city = 'Sylhet'
+        self.profile.save()
+        self.assertEqual(self.donors('sylhet'), [self.profile])
+        self.profile.delete()
+        self.assertEqual(self.donors('sylhet'), [])
+
+    def test_user_rename_reaches_donor_and_request_indexes(self):
+        blood_request = BloodRequest.objects.create(
+            requester=self.user, patient_name='Karim', blood_group='O+', units_required=1, hospital_name='DMCH',
+            hospital_address='Dhaka', city='Dhaka', contact_number='0123', reason='Surgery',
+            required_by_date=date.today(),
+        )
+        self.user.first_name = 'Abdul'
+        self.user.email = 'abdul@example.com'
+        self.user.save()
+        self.assertEqual(self.donors('abdul'), [self.profile])
+        self.assertEqual(self.donors('rahim@example'), [self.profile])  # username is still rahim
+        self.assertEqual(search_ids(BloodRequest, 'abdul'), [blood_request.pk])
+
+    def test_rebuild(self):
+        make_bank('Central Blood Bank')
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM blood_banks_fts')
+            cursor.execute('DELETE FROM donor_profiles_fts')
+        self.assertEqual(search_ids(BloodBank, 'central'), [])
+        self.assertEqual(rebuild(['blood_banks']), {'blood_banks': 1})
+        self.assertEqual(len(search_ids(BloodBank, 'central')), 1)
+        self.assertEqual(self.donors('green'), [])
+        counts = rebuild()
+        self.assertEqual((counts['donor_profiles'], counts['blood_requests']), (1, 0))
+        self.assertEqual(self.donors('green'), [self.profile])
+
+
+class RankedSearchTests(TestCase):
+    def test_best_match_first(self):
+        weak = make_bank('General Hospital Blood Bank', address='Road 4, near the old Sylhet bus stand, Mirpur')
+        strong = make_bank('Sylhet Blood Bank', city='Sylhet', address='Sylhet')
+        make_bank('Central Blood Bank')
+        results = list(ranked_search(BloodBank.objects.all(), 'sylhet'))
+        self.assertEqual(results, [strong, weak])
+        self.assertLess(results[0].search_rank, results[1].search_rank)
+
+    def test_all_words_must_match(self):
+        make_bank('Sylhet Blood Bank', city='Sylhet')
+        mirpur = make_bank('Mirpur Blood Bank', address='Mirpur 10')
+        self.assertEqual(list(ranked_search(BloodBank.objects.all(), 'mirpur bank')), [mirpur])
+        self.assertEqual(list(ranked_search(BloodBank.objects.all(), 'mirpur sylhet')), [])